@@ -0,0 +1,67 @@
+"""Compare sync (threadpool) and async (aiosqlite) request paths under load.
+
+python -m benchmarks.async_throughput --clients 200 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import closed_loop, running_server
+
+
+def _seed(base_url: str, groceries: int) -> None:
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        item_ids = [item["id"] for item in client.get("/api/v1/items").json()]
+        for index in range(groceries):
+            client.post(
+                "/api/v1/groceries",
+                json={
+                    "family_id": 1 + index % 10,
+                    "grocery_date": (
+                        date(2024, 1, 1) + timedelta(days=index)
+                    ).isoformat(),
+                    "grocery_items": [
+                        {"item_id": item_id, "quantity": 1, "purchased": False}
+                        for item_id in item_ids[index % 5 :: 5]
+                    ],
+                },
+            )
+
+
+async def _request(client: httpx.AsyncClient, worker_id: int) -> httpx.Response:
+    if worker_id % 4 == 0:
+        return await client.get("/api/v1/items")
+    return await client.get(
+        "/api/v1/groceries", params={"limit": 20, "family_id": 1 + worker_id % 10}
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--groceries", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        results = {}
+        for mode, driver in (("sync", "sqlite"), ("async", "sqlite+aiosqlite")):
+            with running_server(f"{driver}:///{db_path}") as base_url:
+                if mode == "sync":
+                    _seed(base_url, args.groceries)
+                results[mode] = asyncio.run(
+                    closed_loop(base_url, args.clients, args.duration, _request)
+                )
+        results["clients"] = args.clients
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
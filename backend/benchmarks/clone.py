@@ -0,0 +1,112 @@
+"""Copying a list: server-side clone vs the client re-posting every line.
+
+python -m benchmarks.clone --lines 100 --repeat 100 --output clone.json
+
+Starts the app under uvicorn on a scratch SQLite file, creates one template
+list with `--lines` lines, then copies it `--repeat` times each way, timed end
+to end from the client:
+
+- `client_repost`: what the frontend did before, `GET /groceries/{id}` then
+  `POST /groceries` with every line (validated and inserted one by one);
+- `server_clone`: `POST /groceries/{id}/clone`, one INSERT ... SELECT per table.
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from benchmarks.common import add_report_arguments, percentile, report, running_server
+
+
+def _timed(copy: Callable[[], httpx.Response], repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        copy().raise_for_status()
+        samples.append(time.perf_counter() - started)
+    median = statistics.median(samples)
+    return {
+        "median_ms": round(median * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "ops_per_s": round(1 / median, 1),
+    }
+
+
+def run_clone(lines: int, repeat: int = 100) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'clone.db'}"
+        with running_server(database_url) as base_url:
+            with httpx.Client(base_url=f"{base_url}/api/v1", timeout=60) as client:
+                item_ids = [item["id"] for item in client.get("/items").json()]
+                template = client.post(
+                    "/groceries",
+                    json={
+                        "family_id": 1,
+                        "grocery_date": date.today().isoformat(),
+                        "grocery_items": [
+                            {"item_id": item_ids[n % len(item_ids)], "quantity": 2}
+                            for n in range(lines)
+                        ],
+                    },
+                ).json()
+                next_week = date.fromordinal(date.today().toordinal() + 7)
+
+                def client_repost() -> httpx.Response:
+                    source = client.get(f"/groceries/{template['id']}").json()
+                    return client.post(
+                        "/groceries",
+                        json={
+                            "family_id": source["family_id"],
+                            "grocery_date": next_week.isoformat(),
+                            "grocery_items": [
+                                {
+                                    "item_id": line["item_id"],
+                                    "quantity": line["quantity"],
+                                }
+                                for line in source["grocery_items"]
+                            ],
+                        },
+                    )
+
+                def server_clone() -> httpx.Response:
+                    return client.post(
+                        f"/groceries/{template['id']}/clone",
+                        json={"grocery_date": next_week.isoformat()},
+                    )
+
+                # Warm both paths before timing either
+                client_repost()
+                server_clone()
+                results = {
+                    "client_repost": _timed(client_repost, repeat),
+                    "server_clone": _timed(server_clone, repeat),
+                }
+    return {
+        "lines": lines,
+        "repeat": repeat,
+        **results,
+        "speedup": round(
+            results["client_repost"]["median_ms"]
+            / results["server_clone"]["median_ms"],
+            2,
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=100)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    report(run_clone(args.lines, args.repeat), args)
+
+
+if __name__ == "__main__":
+    main()
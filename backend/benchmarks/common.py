@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server(
+    database_url: str,
+    env: Optional[Dict[str, str]] = None,
+    args: Sequence[str] = (),
+    ready_timeout: float = 30.0,
+) -> Iterator[str]:
+    """Run `main:app` under uvicorn in a subprocess and yield its base URL."""
+    port = free_port()
+    process_env = {**os.environ, "DATABASE_URL": database_url, **(env or {})}
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            *args,
+        ],
+        cwd=BACKEND_DIR,
+        env=process_env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + ready_timeout
+        while True:
+            try:
+                if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"uvicorn did not start (exit={process.poll()})")
+            time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def closed_loop(
+    base_url: str,
+    clients: int,
+    duration: float,
+    request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+) -> Dict[str, float]:
+    """Keep `clients` requests in flight for `duration` seconds and summarize."""
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60.0
+    ) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id: int) -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await request(client, worker_id)
+                    ok = response.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors, elapsed)
+
+
+# --------------------------------------------------------------------
+# RESULTS AND BASELINES
+# --------------------------------------------------------------------
+# Metric direction by key suffix; anything else (counts, settings) is context.
+LOWER_IS_BETTER = ("_ms", "_us", "_mb")
+HIGHER_IS_BETTER = ("_rps", "ops_per_s")
+# Error rates are compared in absolute terms: 0 -> 0.2% is a regression even
+# though no relative tolerance applies to a zero baseline.
+ERROR_RATE_SLACK = 0.005
+
+
+def add_report_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--output", type=Path, help="Also write the JSON here.")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="Earlier --output to compare with; exits 1 on regressions.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Allowed relative slowdown before a metric counts as regressed.",
+    )
+
+
+def compare(current: Any, baseline: Any, tolerance: float, path: str = "") -> List[str]:
+    """Metrics in `current` that are worse than in `baseline` by more than
+    `tolerance`, as readable lines. Keys missing on either side are skipped."""
+    if isinstance(current, dict) and isinstance(baseline, dict):
+        regressions = []
+        for key in current.keys() & baseline.keys():
+            regressions += compare(
+                current[key], baseline[key], tolerance, f"{path}.{key}".lstrip(".")
+            )
+        return sorted(regressions)
+    if not isinstance(current, (int, float)) or not isinstance(baseline, (int, float)):
+        return []
+    if path.endswith("error_rate"):
+        worse = current > baseline + ERROR_RATE_SLACK
+    elif path.endswith(LOWER_IS_BETTER):
+        worse = current > baseline * (1 + tolerance)
+    elif path.endswith(HIGHER_IS_BETTER):
+        worse = current < baseline * (1 - tolerance)
+    else:
+        return []
+    return [f"{path}: {baseline} -> {current}"] if worse else []
+
+
+def report(results: Dict[str, Any], args: argparse.Namespace) -> None:
+    """Print `results` as JSON, save them, and fail on baseline regressions."""
+    regressions: List[str] = []
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        results = {**results, "regressions": regressions}
+    encoded = json.dumps(results, indent=2, default=str)
+    print(encoded)
+    if args.output is not None:
+        args.output.write_text(encoded + "\n")
+    if regressions:
+        print(
+            f"{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr
+        )
+        sys.exit(1)
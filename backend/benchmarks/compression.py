@@ -0,0 +1,148 @@
+"""Bytes on the wire and server CPU per request for each content coding.
+
+python -m benchmarks.compression --families 50 --repeat 200 --output compression.json
+
+Generates a scratch database with the synthetic generator (`--items` in the
+catalog), then, in a child process bound to it, sends each request `--repeat`
+times through the app in process for every available coding (identity, gzip,
+and br/zstd when their packages are installed). Bodies are read raw, never decoded, so the CPU
+measured (process time per request) is the server's plus a constant client
+overhead. Per coding it reports the response size and CPU per request for:
+
+- `groceries_100`: a page of 100 lists with their lines, items and types,
+  compressed on every request by the middleware;
+- `items_100` and `item_types`: catalog pages, compressed once and then
+  served from the precompressed cache.
+
+`compress_us` is the bare compressor at its per-request level on each body,
+outside the app: what every request pays without a cache, and what a catalog
+request no longer pays with one.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from benchmarks.common import BACKEND_DIR, add_report_arguments, report
+
+GROCERIES_PER_FAMILY = 20
+LINES_PER_LIST = 8
+
+URLS = {
+    "groceries_100": "/api/v1/groceries?limit=100",
+    "items_100": "/api/v1/items?limit=100",
+    "item_types": "/api/v1/item_types",
+}
+
+
+def _measure(repeat: int) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+
+    from grocery_api import compression
+    from main import app
+
+    codings = ["identity", *compression.CODECS]
+    results: Dict[str, Any] = {"codings": codings}
+
+    with TestClient(app) as client:
+
+        def raw_size(url: str, coding: str) -> int:
+            with client.stream(
+                "GET", url, headers={"Accept-Encoding": coding}
+            ) as response:
+                return len(b"".join(response.iter_raw()))
+
+        def timed(url: str, coding: str) -> Dict[str, float]:
+            size = raw_size(url, coding)  # warm up, and fill the cache
+            started = time.process_time()
+            for _ in range(repeat):
+                raw_size(url, coding)
+            return {
+                "bytes": size,
+                "cpu_us": round((time.process_time() - started) / repeat * 1e6, 1),
+            }
+
+        def compress_us(body: bytes, codec: compression.Codec) -> float:
+            started = time.process_time()
+            for _ in range(repeat):
+                codec.compress(body)
+            return round((time.process_time() - started) / repeat * 1e6, 1)
+
+        results["compress_us"] = {}
+        for name, url in URLS.items():
+            results[name] = {coding: timed(url, coding) for coding in codings}
+            body = client.get(url, headers={"Accept-Encoding": "identity"}).content
+            results["compress_us"][name] = {
+                coding: compress_us(body, codec)
+                for coding, codec in compression.CODECS.items()
+            }
+    return results
+
+
+def run_compression(
+    families: int, items: int = 2000, repeat: int = 200, seed: int = 1
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'compression.db'}",
+            "METRICS_ENABLED": "0",
+        }
+        seeded = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "grocery_api.seed",
+                "--families",
+                str(families),
+                "--groceries-per-family",
+                str(GROCERIES_PER_FAMILY),
+                "--lines",
+                str(LINES_PER_LIST),
+                "--items",
+                str(items),
+                "--seed",
+                str(seed),
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        measured = subprocess.run(
+            [sys.executable, "-m", "benchmarks.compression", "--measure", str(repeat)],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    return {"data": json.loads(seeded.stdout), **json.loads(measured.stdout)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--families", type=int, default=50)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--measure", type=int, help=argparse.SUPPRESS)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        # Child process: DATABASE_URL already points at the generated database
+        print(json.dumps(_measure(args.measure)))
+        return
+    report(run_compression(args.families, args.items, args.repeat, args.seed), args)
+
+
+if __name__ == "__main__":
+    main()
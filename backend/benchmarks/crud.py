@@ -0,0 +1,282 @@
+"""Microbenchmarks for every `grocery_api.crud` function at several data sizes.
+
+python -m benchmarks.crud --sizes small,medium --repeat 50 --output crud.json
+python -m benchmarks.crud --baseline crud.json    # exits 1 on regressions
+
+Each size gets a scratch SQLite file filled by the synthetic generator and is
+measured in its own subprocess (the database module binds DATABASE_URL at
+import time). Every call uses a fresh session, as a request would, and writes
+commit. Rows for the delete cases are created before timing starts.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import BACKEND_DIR, add_report_arguments, percentile, report
+
+# (families, groceries per family); lines per list come from the generator
+SIZES = {
+    "small": (10, 20),
+    "medium": (200, 50),
+    "large": (2000, 100),
+}
+
+Case = Callable[[Any, int], Any]
+
+
+WARMUP = 3
+
+
+def build_cases(db: Any, repeat: int) -> Dict[str, Case]:
+    """One callable per crud function, taking `(session, iteration)`.
+
+    `db` is a setup session used to pick ids that exist in the database and to
+    create the `repeat` (plus warm-up) rows the delete cases remove.
+    """
+    from sqlalchemy import func, select
+
+    from grocery_api import crud, models, schemas
+
+    snapshot = crud.catalog.get(db)
+    item_ids = sorted(snapshot.items_by_id)
+    type_id = snapshot.item_types[0].id
+    family_id = db.execute(select(func.min(models.Grocery.family_id))).scalar()
+    grocery_id, line_id = db.execute(
+        select(models.GroceryItem.grocery_id, func.min(models.GroceryItem.id))
+        .group_by(models.GroceryItem.grocery_id)
+        .order_by(models.GroceryItem.grocery_id.desc())
+        .limit(1)
+    ).one()
+    filters = schemas.GroceryFilters(family_id=family_id)
+    today = date(2024, 6, 1)
+    lines = [
+        schemas.GroceryItemCreate(item_id=item_id, quantity=1)
+        for item_id in item_ids[:8]
+    ]
+
+    new_grocery = schemas.GroceryCreate(
+        family_id=family_id, grocery_date=today, grocery_items=lines
+    )
+    doomed = [
+        crud.create_grocery(db, new_grocery)["id"] for _ in range(repeat + WARMUP)
+    ]
+    doomed_lines = [
+        line["id"]
+        for line in crud.create_grocery(
+            db,
+            new_grocery.model_copy(
+                update={"grocery_items": lines[:1] * (repeat + WARMUP)}
+            ),
+        )["grocery_items"]
+    ]
+
+    # A weekly template cloned once per call, and schedules to delete
+    template_id = crud.create_grocery(db, new_grocery)["id"]
+    weekly = schemas.GroceryRecurrenceSet(every_days=7, next_date=today)
+    crud.set_grocery_recurrence(db, template_id, weekly)
+    unscheduled = [
+        crud.create_grocery(db, new_grocery.model_copy(update={"grocery_items": []}))[
+            "id"
+        ]
+        for _ in range(repeat + WARMUP)
+    ]
+    someday = schemas.GroceryRecurrenceSet(next_date=date(2100, 1, 1))
+    for unscheduled_id in unscheduled:
+        crud.set_grocery_recurrence(db, unscheduled_id, someday)
+
+    def batch(session: Any, n: int) -> Any:
+        return crud.apply_grocery_item_batch(
+            session,
+            schemas.GroceryItemBatch(
+                create=lines[:4],
+                update=[schemas.GroceryItemBatchUpdate(id=line_id, quantity=1 + n % 5)],
+            ),
+            grocery_id,
+        )
+
+    return {
+        "catalog_stamp": lambda s, n: crud.catalog_stamp(s),
+        "get_item_types": lambda s, n: crud.get_item_types(s),
+        "create_item_type": lambda s, n: crud.create_item_type(
+            s, schemas.ItemTypeCreate(name=f"bench-{uuid.uuid4()}")
+        ),
+        "get_items": lambda s, n: crud.get_items(s, limit=50),
+        "search_items": lambda s, n: crud.search_items(s, "ch", limit=10),
+        "create_item": lambda s, n: crud.create_item(
+            s, schemas.ItemCreate(name=f"bench-{uuid.uuid4()}", item_type_id=type_id)
+        ),
+        "get_groceries": lambda s, n: crud.get_groceries(s, limit=20),
+        "get_grocery_rows": lambda s, n: crud.get_grocery_rows(s, limit=20),
+        "get_grocery_rows_filtered": lambda s, n: crud.get_grocery_rows(
+            s, limit=20, filters=filters
+        ),
+        "groceries_validator": lambda s, n: crud.groceries_validator(s, limit=20),
+        "grocery_version": lambda s, n: crud.grocery_version(s, grocery_id),
+        "get_grocery_by_id": lambda s, n: crud.get_grocery_by_id(s, grocery_id),
+        "create_grocery": lambda s, n: crud.create_grocery(s, new_grocery),
+        "update_grocery": lambda s, n: crud.update_grocery(
+            s, grocery_id, schemas.GroceryUpdate(family_id=family_id + n % 2)
+        ),
+        "delete_grocery": lambda s, n: crud.delete_grocery(s, doomed[n]),
+        "clone_grocery": lambda s, n: crud.clone_grocery(
+            s, grocery_id, schemas.GroceryClone(grocery_date=today)
+        ),
+        "get_grocery_items": lambda s, n: crud.get_grocery_items(s, limit=20),
+        "get_grocery_item_rows": lambda s, n: crud.get_grocery_item_rows(s, limit=20),
+        "grocery_items_validator": lambda s, n: crud.grocery_items_validator(
+            s, limit=20
+        ),
+        "get_grocery_item_by_id": lambda s, n: crud.get_grocery_item_by_id(s, line_id),
+        "get_grocery_items_by_grocery": lambda s, n: crud.get_grocery_items_by_grocery(
+            s, grocery_id
+        ),
+        "create_grocery_item": lambda s, n: crud.create_grocery_item(
+            s,
+            grocery_id,
+            schemas.GroceryItemCreate(item_id=item_ids[n % len(item_ids)]),
+        ),
+        "update_grocery_item": lambda s, n: crud.update_grocery_item(
+            s, line_id, schemas.GroceryItemUpdate(purchased=n % 2 == 0)
+        ),
+        "delete_grocery_item": lambda s, n: crud.delete_grocery_item(
+            s, doomed_lines[n]
+        ),
+        "apply_grocery_item_batch": batch,
+        "get_family_summary": lambda s, n: crud.get_family_summary(s, family_id),
+        "get_grocery_suggestions": lambda s, n: crud.get_grocery_suggestions(
+            s, grocery_id
+        ),
+        "get_grocery_recurrence": lambda s, n: crud.get_grocery_recurrence(
+            s, template_id
+        ),
+        "set_grocery_recurrence": lambda s, n: crud.set_grocery_recurrence(
+            s, template_id, weekly
+        ),
+        "delete_grocery_recurrence": lambda s, n: crud.delete_grocery_recurrence(
+            s, unscheduled[n]
+        ),
+        # Due exactly once per call: `weekly` starts on `today`
+        "run_due_recurrences": lambda s, n: crud.run_due_recurrences(
+            s, today + timedelta(days=7 * n)
+        ),
+        "import_groceries": lambda s, n: crud.import_groceries(s, [new_grocery] * 50),
+        "iter_grocery_export": lambda s, n: sum(
+            len(batch) for batch in crud.iter_grocery_export(s, filters)
+        ),
+    }
+
+
+def missing_cases(cases: Dict[str, Case]) -> List[str]:
+    """Public crud functions without a case, so new ones are not forgotten."""
+    import inspect
+
+    from grocery_api import crud
+
+    public = {
+        name
+        for name, fn in inspect.getmembers(crud, inspect.isfunction)
+        if not name.startswith("_") and fn.__module__ == crud.__name__
+    }
+    return sorted(public - cases.keys())
+
+
+def _measure(repeat: int) -> Dict[str, Dict[str, float]]:
+    from grocery_api import database
+
+    with database.SessionLocal() as db:
+        cases = build_cases(db, repeat)
+    missing = missing_cases(cases)
+    if missing:
+        raise SystemExit(f"No benchmark case for: {', '.join(missing)}")
+
+    results = {}
+    for name, case in cases.items():
+        samples = []
+        for n in range(repeat + WARMUP):
+            with database.SessionLocal() as session:
+                started = time.perf_counter()
+                case(session, n)
+                elapsed = time.perf_counter() - started
+            if n >= WARMUP:  # the first calls warm caches and are not counted
+                samples.append(elapsed)
+        median = statistics.median(samples)
+        results[name] = {
+            "median_us": round(median * 1e6, 1),
+            "p95_us": round(percentile(samples, 0.95) * 1e6, 1),
+            "ops_per_s": round(1 / median, 1) if median else 0.0,
+        }
+    return results
+
+
+def _run_size(size: str, repeat: int, seed: int) -> Dict[str, Any]:
+    families, per_family = SIZES[size]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{Path(tmp) / 'bench.db'}"}
+        seeded = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "grocery_api.seed",
+                "--families",
+                str(families),
+                "--groceries-per-family",
+                str(per_family),
+                "--seed",
+                str(seed),
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        measured = subprocess.run(
+            [sys.executable, "-m", "benchmarks.crud", "--measure", str(repeat)],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    return {
+        "data": json.loads(seeded.stdout),
+        "functions": json.loads(measured.stdout),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="small,medium,large")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--measure", type=int, help=argparse.SUPPRESS)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        # Child process: DATABASE_URL already points at the seeded database
+        print(json.dumps(_measure(args.measure)))
+        return
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = set(sizes) - SIZES.keys()
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(sorted(unknown))}")
+    results: Dict[str, Any] = {"repeat": args.repeat}
+    for size in sizes:
+        results[size] = _run_size(size, args.repeat, args.seed)
+    report(results, args)
+
+
+if __name__ == "__main__":
+    main()
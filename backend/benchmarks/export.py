@@ -0,0 +1,103 @@
+"""Export throughput and server memory on one long household history.
+
+python -m benchmarks.export --lines 1000000 --format csv --output export.json
+
+One family with `--lines` grocery lines (8 per list) is generated, the app is
+started under uvicorn and `/export/groceries` is streamed to the end. The
+server's anonymous (heap) RSS is sampled while the response is read;
+`peak_growth_mb` is its peak over the level before the export, which should
+not depend on `--lines`. File-backed pages (SQLite's mmap of the database) are
+left out, as they grow with the database and the kernel reclaims them at will.
+Linux only.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, add_report_arguments, report, running_server
+
+LINES_PER_LIST = 8
+
+
+def anon_rss_mb(pid: int) -> float:
+    """Resident anonymous memory of a process, from /proc."""
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("RssAnon:"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError("RssAnon not reported")
+
+
+def run_export(lines: int, fmt: str, seed: int = 1) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'export.db'}"
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "grocery_api.seed",
+                "--families",
+                "1",
+                "--groceries-per-family",
+                str(max(1, lines // LINES_PER_LIST)),
+                "--lines",
+                str(LINES_PER_LIST),
+                "--seed",
+                str(seed),
+            ],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "DATABASE_URL": database_url},
+            check=True,
+            capture_output=True,
+        )
+        with running_server(database_url) as base_url:
+            with httpx.Client(base_url=base_url, timeout=None) as client:
+                pid = client.get("/ready").json()["worker"]
+                url = "/api/v1/export/groceries"
+                # Warm the catalog and code paths so only the export is measured
+                client.get(url, params={"family_id": 2, "format": fmt})
+                before = peak = anon_rss_mb(pid)
+                started = time.perf_counter()
+                size = records = 0
+                with client.stream(
+                    "GET", url, params={"family_id": 1, "format": fmt}
+                ) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes():
+                        size += len(chunk)
+                        records += chunk.count(b"\n")
+                        peak = max(peak, anon_rss_mb(pid))
+                elapsed = time.perf_counter() - started
+    if fmt == "csv":
+        records -= 1  # header
+    return {
+        "format": fmt,
+        "records": records,
+        "megabytes": round(size / 2**20, 1),
+        "seconds": round(elapsed, 2),
+        "records_rps": round(records / elapsed, 1),
+        "rss_before_mb": round(before, 1),
+        "peak_rss_mb": round(peak, 1),
+        "peak_growth_mb": round(peak - before, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="csv")
+    parser.add_argument("--seed", type=int, default=1)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    report(run_export(args.lines, args.format, args.seed), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Mixed read/write load against the real app on a local uvicorn.
+
+python -m benchmarks.load --clients 50 --duration 20 --output load.json
+python -m benchmarks.load --baseline load.json     # exits 1 on regressions
+python -m benchmarks.load --mix check_off_trip=1 --uvicorn-arg=--workers=4
+
+A scratch database is filled by the synthetic generator, then every client
+runs scenarios picked by weight from `--mix`, back to back, until the time is
+up. Latency is recorded per scenario (all of its requests) and per request
+kind; any 5xx or transport error counts as an error for both.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import (
+    BACKEND_DIR,
+    add_report_arguments,
+    report,
+    running_server,
+    summarize,
+)
+
+
+class Recorder:
+    """Latencies and error counts by name, shared by every client."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, name: str, elapsed: Optional[float]) -> None:
+        if elapsed is None:
+            self.errors[name] += 1
+        else:
+            self.latencies[name].append(elapsed)
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        names = sorted(self.latencies.keys() | self.errors.keys())
+        return {
+            name: summarize(self.latencies[name], self.errors[name], elapsed)
+            for name in names
+        }
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+class Session:
+    """One client's view of the API: timed requests and its family."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        requests: Recorder,
+        rng: random.Random,
+        families: int,
+        item_ids: List[int],
+    ) -> None:
+        self.client = client
+        self.requests = requests
+        self.rng = rng
+        self.families = families
+        self.item_ids = item_ids
+
+    def family(self) -> int:
+        return self.rng.randint(1, self.families)
+
+    async def call(self, kind: str, method: str, url: str, **kwargs: Any) -> Any:
+        """Send one request, record it under `kind`, return the response."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            self.requests.add(kind, None)
+            raise ScenarioFailed(kind) from exc
+        if response.status_code >= 500:
+            self.requests.add(kind, None)
+            raise ScenarioFailed(f"{kind}: {response.status_code}")
+        self.requests.add(kind, time.perf_counter() - started)
+        return response
+
+
+# --------------------------------------------------------------------
+# SCENARIOS
+# --------------------------------------------------------------------
+async def browse_history(session: Session) -> None:
+    """Family pages back through its lists and opens one of them."""
+    params: Dict[str, Any] = {"family_id": session.family(), "limit": 20}
+    listed: List[Dict[str, Any]] = []
+    for _ in range(3):
+        response = await session.call(
+            "GET /groceries", "GET", "/api/v1/groceries", params=params
+        )
+        listed += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {**params, "cursor": cursor}
+    if listed:
+        grocery = session.rng.choice(listed)
+        await session.call(
+            "GET /groceries/{id}", "GET", f"/api/v1/groceries/{grocery['id']}"
+        )
+
+
+async def check_off_trip(session: Session) -> None:
+    """Family opens a list with open lines and checks them off in one batch."""
+    response = await session.call(
+        "GET /groceries?purchased=false",
+        "GET",
+        "/api/v1/groceries",
+        params={"family_id": session.family(), "purchased": "false", "limit": 5},
+    )
+    groceries = response.json()
+    if not groceries:
+        return
+    grocery = session.rng.choice(groceries)
+    open_lines = [
+        line["id"] for line in grocery["grocery_items"] if not line["purchased"]
+    ]
+    await session.call(
+        "PATCH /grocery_items:batch",
+        "PATCH",
+        "/api/v1/grocery_items:batch",
+        json={"update": [{"id": line_id, "purchased": True} for line_id in open_lines]},
+    )
+
+
+async def plan_trip(session: Session) -> None:
+    """Family writes a new list, adds a forgotten item and fixes a quantity."""
+    picks = session.rng.sample(session.item_ids, min(8, len(session.item_ids)))
+    response = await session.call(
+        "POST /groceries",
+        "POST",
+        "/api/v1/groceries",
+        json={
+            "family_id": session.family(),
+            "grocery_date": "2025-01-06",
+            "grocery_items": [{"item_id": item_id} for item_id in picks[:-1]],
+        },
+    )
+    grocery = response.json()
+    await session.call(
+        "POST /groceries/{id}/items",
+        "POST",
+        f"/api/v1/groceries/{grocery['id']}/items",
+        json={"item_id": picks[-1]},
+    )
+    if grocery["grocery_items"]:
+        line = session.rng.choice(grocery["grocery_items"])
+        await session.call(
+            "PATCH /grocery_items/{id}",
+            "PATCH",
+            f"/api/v1/grocery_items/{line['id']}",
+            json={"quantity": session.rng.randint(2, 5)},
+        )
+
+
+async def browse_catalog(session: Session) -> None:
+    """Client loads the catalog, revalidating with the ETag it already holds."""
+    response = await session.call("GET /items", "GET", "/api/v1/items")
+    await session.call(
+        "GET /items (revalidate)",
+        "GET",
+        "/api/v1/items",
+        headers={"If-None-Match": response.headers.get("ETag", "")},
+    )
+    await session.call("GET /item_types", "GET", "/api/v1/item_types")
+
+
+async def family_report(session: Session) -> None:
+    """Family opens its shopping report."""
+    await session.call(
+        "GET /families/{id}/summary",
+        "GET",
+        f"/api/v1/families/{session.family()}/summary",
+    )
+
+
+SCENARIOS: Dict[str, Callable[[Session], Awaitable[None]]] = {
+    "browse_history": browse_history,
+    "check_off_trip": check_off_trip,
+    "plan_trip": plan_trip,
+    "browse_catalog": browse_catalog,
+    "family_report": family_report,
+}
+DEFAULT_MIX = (
+    "browse_history=4,check_off_trip=2,plan_trip=1,browse_catalog=2,family_report=1"
+)
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(
+                f"unknown scenario {name!r}; known: {', '.join(SCENARIOS)}"
+            )
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+async def run_load(
+    base_url: str,
+    clients: int,
+    duration: float,
+    mix: List[Tuple[str, float]],
+    families: int,
+    seed: int,
+) -> Dict[str, Any]:
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    scenarios, requests = Recorder(), Recorder()
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60.0
+    ) as client:
+        item_ids = [item["id"] for item in (await client.get("/api/v1/items")).json()]
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id: int) -> None:
+            rng = random.Random(seed * 100_003 + worker_id)
+            session = Session(client, requests, rng, families, item_ids)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    await SCENARIOS[name](session)
+                except ScenarioFailed:
+                    scenarios.add(name, None)
+                else:
+                    scenarios.add(name, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    every_latency = [s for samples in requests.latencies.values() for s in samples]
+    return {
+        "overall": summarize(every_latency, sum(requests.errors.values()), elapsed),
+        "scenarios": scenarios.summary(elapsed),
+        "requests": requests.summary(elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--families", type=int, default=200)
+    parser.add_argument("--groceries-per-family", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--database-url",
+        help="Use this database as is instead of generating a scratch one.",
+    )
+    parser.add_argument(
+        "--uvicorn-arg",
+        action="append",
+        default=[],
+        help="Extra uvicorn argument, e.g. --uvicorn-arg=--workers=4.",
+    )
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url
+        if database_url is None:
+            database_url = f"sqlite:///{Path(tmp) / 'load.db'}"
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "grocery_api.seed",
+                    "--families",
+                    str(args.families),
+                    "--groceries-per-family",
+                    str(args.groceries_per_family),
+                    "--seed",
+                    str(args.seed),
+                ],
+                cwd=BACKEND_DIR,
+                env={**os.environ, "DATABASE_URL": database_url},
+                check=True,
+                capture_output=True,
+            )
+        with running_server(database_url, args=args.uvicorn_arg) as base_url:
+            results = asyncio.run(
+                run_load(
+                    base_url,
+                    args.clients,
+                    args.duration,
+                    mix,
+                    args.families,
+                    args.seed,
+                )
+            )
+    report(
+        {
+            "config": {
+                "clients": args.clients,
+                "duration": args.duration,
+                "mix": dict(mix),
+                "families": args.families,
+                "groceries_per_family": args.groceries_per_family,
+            },
+            **results,
+        },
+        args,
+    )
+
+
+if __name__ == "__main__":
+    main()
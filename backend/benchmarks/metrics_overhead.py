@@ -0,0 +1,136 @@
+"""Cost of request metrics: the middleware alone, then the whole app with it on/off.
+
+python -m benchmarks.metrics_overhead --clients 50 --duration 10 --rounds 2
+
+The micro part calls the middleware around a no-op ASGI app in-process and
+reports the added time per request and per counted query. The end-to-end part
+runs the real app under uvicorn on one generated database with
+METRICS_ENABLED=0 and =1 in alternating rounds (so drift hits both alike) and
+compares throughput and latency of cheap reads, where the share of overhead is
+largest.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import (
+    BACKEND_DIR,
+    add_report_arguments,
+    closed_loop,
+    report,
+    running_server,
+)
+
+
+def _micro(repeat: int) -> Dict[str, float]:
+    from sqlalchemy import create_engine, text
+
+    from grocery_api import metrics
+
+    async def noop(scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request"}
+
+    async def send(message) -> None:
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/"}
+
+    async def time_app(app) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - started) / repeat
+
+    bare = asyncio.run(time_app(noop))
+    wrapped = asyncio.run(time_app(metrics.MetricsMiddleware(noop)))
+
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+
+        def time_queries() -> float:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text("SELECT 1"))
+            return (time.perf_counter() - started) / repeat
+
+        plain = time_queries()
+        metrics.instrument(engine)
+        counted = time_queries()
+    metrics.reset()
+    return {
+        "middleware_us": round((wrapped - bare) * 1e6, 2),
+        "per_query_us": round((counted - plain) * 1e6, 2),
+    }
+
+
+async def _request(client: httpx.AsyncClient, worker_id: int) -> httpx.Response:
+    if worker_id % 2:
+        return await client.get("/api/v1/items")
+    return await client.get(
+        "/api/v1/groceries", params={"limit": 20, "family_id": 1 + worker_id % 20}
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20000)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"micro": _micro(args.repeat)}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'metrics.db'}"
+        subprocess.run(
+            [sys.executable, "-m", "grocery_api.seed", "--families", "20"],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "DATABASE_URL": database_url},
+            check=True,
+            capture_output=True,
+        )
+        runs: Dict[str, List[Dict[str, float]]] = {"off": [], "on": []}
+        for _ in range(args.rounds):
+            for mode, enabled in (("off", "0"), ("on", "1")):
+                env = {"METRICS_ENABLED": enabled}
+                with running_server(database_url, env=env) as base_url:
+                    runs[mode].append(
+                        asyncio.run(
+                            closed_loop(base_url, args.clients, args.duration, _request)
+                        )
+                    )
+
+    for mode, rounds in runs.items():
+        results[mode] = {
+            key: round(sum(run[key] for run in rounds) / len(rounds), 2)
+            for key in rounds[0]
+        }
+    off, on = results["off"], results["on"]
+    results["overhead"] = {
+        "throughput_pct": round(
+            100
+            * (off["throughput_rps"] - on["throughput_rps"])
+            / off["throughput_rps"],
+            2,
+        ),
+        "p50_pct": round(100 * (on["p50_ms"] - off["p50_ms"]) / off["p50_ms"], 2),
+    }
+    report(results, args)
+
+
+if __name__ == "__main__":
+    main()
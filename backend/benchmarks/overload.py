@@ -0,0 +1,188 @@
+"""Latency under overload, with and without admission control.
+
+python -m benchmarks.overload --clients 200 --duration 20 --output overload.json
+
+Starts the app under uvicorn on a scratch SQLite file twice: once with the
+admission limits switched off (`ADMISSION_*_LIMIT=0`) and once with the
+defaults (or `--read-limit` / `--write-limit`). Each time, `--clients`
+closed-loop clients, far more than the database can serve at once, send a
+write-heavy mix for `--duration` seconds: `POST /groceries` with 8 lines
+(`--write-share` of requests) and `GET /groceries` pages otherwise.
+
+For each run the result has:
+
+- `served`: latency of the requests that got an answer below 500, and the
+  share that failed with another 5xx or a transport error;
+- `shed_rate` and `shed_p99_ms`: how many requests got a 503 from admission
+  control, and how fast that came.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import (
+    add_report_arguments,
+    percentile,
+    report,
+    running_server,
+    summarize,
+)
+
+
+async def _request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes
+) -> int:
+    """Send one pre-encoded request on a kept-alive connection; its status."""
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line[:15].lower() == b"content-length:":
+            length = int(line[15:])
+    await reader.readexactly(length)
+    return status
+
+
+def _encode(method: str, path: str, body: Optional[Any] = None) -> bytes:
+    payload = b"" if body is None else json.dumps(body).encode()
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+    if body is not None:
+        head += "Content-Type: application/json\r\n"
+    head += f"Content-Length: {len(payload)}\r\n\r\n"
+    return head.encode() + payload
+
+
+async def _overload(
+    base_url: str, clients: int, duration: float, write_share: float, seed: int
+) -> Dict[str, Any]:
+    # httpx costs more CPU per request than the app does; on a small box it
+    # would be the bottleneck, so requests are pre-encoded and sent raw.
+    item_ids = [item["id"] for item in httpx.get(f"{base_url}/api/v1/items").json()]
+    rng = random.Random(seed)
+    writes = [
+        _encode(
+            "POST",
+            "/api/v1/groceries",
+            {
+                "family_id": rng.randint(1, 100),
+                "grocery_date": "2025-01-06",
+                "grocery_items": [
+                    {"item_id": item_id} for item_id in rng.sample(item_ids, 8)
+                ],
+            },
+        )
+        for _ in range(500)
+    ]
+    reads = [
+        _encode("GET", f"/api/v1/groceries?family_id={family_id}&limit=20")
+        for family_id in range(1, 101)
+    ]
+    url = httpx.URL(base_url)
+    served: List[float] = []
+    shed: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        nonlocal errors
+        worker_rng = random.Random(seed * 10_000 + worker_id)
+        connection: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+        connection = None
+        while time.perf_counter() < deadline:
+            requests = writes if worker_rng.random() < write_share else reads
+            request = worker_rng.choice(requests)
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(url.host, url.port)
+                status: Optional[int] = await _request(*connection, request)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                status, connection = None, None
+            elapsed = time.perf_counter() - started
+            if status == 503:
+                shed.append(elapsed)
+            elif status is not None and status < 500:
+                served.append(elapsed)
+            else:
+                errors += 1
+        if connection is not None:
+            connection[1].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    total = len(served) + len(shed) + errors
+    return {
+        "served": summarize(served, errors, elapsed),
+        "shed_rate": round(len(shed) / total, 4) if total else 0.0,
+        "shed_p99_ms": round(percentile(shed, 0.99) * 1000, 2),
+    }
+
+
+def run_overload(
+    clients: int,
+    duration: float,
+    write_share: float = 0.5,
+    read_limit: Optional[int] = None,
+    write_limit: Optional[int] = None,
+    seed: int = 1,
+) -> Dict[str, Any]:
+    admission: Dict[str, str] = {}
+    if read_limit is not None:
+        admission["ADMISSION_READ_LIMIT"] = str(read_limit)
+    if write_limit is not None:
+        admission["ADMISSION_WRITE_LIMIT"] = str(write_limit)
+    modes = {
+        "unlimited": {"ADMISSION_READ_LIMIT": "0", "ADMISSION_WRITE_LIMIT": "0"},
+        "admission": admission,
+    }
+    results: Dict[str, Any] = {
+        "clients": clients,
+        "duration_s": duration,
+        "write_share": write_share,
+    }
+    for mode, env in modes.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f"sqlite:///{Path(tmp) / 'overload.db'}"
+            with running_server(database_url, env=env) as base_url:
+                results[mode] = asyncio.run(
+                    _overload(base_url, clients, duration, write_share, seed)
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--write-share", type=float, default=0.5)
+    parser.add_argument("--read-limit", type=int)
+    parser.add_argument("--write-limit", type=int)
+    parser.add_argument("--seed", type=int, default=1)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    report(
+        run_overload(
+            args.clients,
+            args.duration,
+            args.write_share,
+            args.read_limit,
+            args.write_limit,
+            args.seed,
+        ),
+        args,
+    )
+
+
+if __name__ == "__main__":
+    main()
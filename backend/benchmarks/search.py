@@ -0,0 +1,144 @@
+"""Item search latency on a large generated catalog, per kind of query.
+
+python -m benchmarks.search --items 100000 --repeat 500 --output search.json
+
+Builds `grocery_api.search.SearchIndex` in-process over `--items` generated
+names (brand, qualifier and product words plus a unique code, as households
+would add them), reports the build time, then times each query kind:
+whole-name prefixes, word prefixes, multi-word, typos and a type filter. Every
+query asks for a full autocomplete page (`--limit`). The target is p99 under
+1000 µs at 100k items.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.common import add_report_arguments, percentile, report
+
+BRANDS = ["Acme", "Valley", "Sunrise", "Nordic", "Harvest", "Golden", "Blue Hill"]
+QUALIFIERS = [
+    "organic",
+    "whole",
+    "skimmed",
+    "smoked",
+    "fresh",
+    "frozen",
+    "sliced",
+    "sparkling",
+    "wholegrain",
+    "free range",
+    "unsalted",
+    "extra virgin",
+]
+PRODUCTS = [
+    "milk",
+    "cheese",
+    "butter",
+    "yogurt",
+    "bread",
+    "bagels",
+    "croissants",
+    "apples",
+    "bananas",
+    "carrots",
+    "tomatoes",
+    "chicken",
+    "beef",
+    "salmon",
+    "rice",
+    "pasta",
+    "flour",
+    "sugar",
+    "olive oil",
+    "tea",
+    "coffee",
+    "orange juice",
+    "water",
+]
+ITEM_TYPES = 6
+
+# (kind, query, item type filter)
+QUERIES: List[Tuple[str, str, Optional[int]]] = [
+    ("name_prefix", "acme", None),
+    ("name_prefix_short", "s", None),
+    ("word_prefix", "toma", None),
+    ("multi_word", "smoked salm", None),
+    ("multi_word_sparse", "salmon tea", None),
+    ("rare_code", "00042", None),
+    ("typo", "chese", None),
+    ("typo_multi_word", "orgnic yoghurt", None),
+    ("type_filter", "fresh", 3),
+    ("no_match", "zzzzzz", None),
+]
+
+
+def generate_items(count: int, seed: int) -> List[Any]:
+    from grocery_api.catalog import CatalogItem
+
+    rng = random.Random(seed)
+    created_at = datetime(2024, 1, 1)
+    return [
+        CatalogItem(
+            id=n + 1,
+            name=(
+                f"{rng.choice(BRANDS)} {rng.choice(QUALIFIERS)} "
+                f"{rng.choice(PRODUCTS)} {n:06d}"
+            ),
+            item_type_id=1 + rng.randrange(ITEM_TYPES),
+            created_at=created_at,
+            sort_key="",
+        )
+        for n in range(count)
+    ]
+
+
+def run_search(
+    items: int, repeat: int = 500, limit: int = 10, seed: int = 1
+) -> Dict[str, Any]:
+    from grocery_api.search import SearchIndex
+
+    catalog_items = generate_items(items, seed)
+    started = time.perf_counter()
+    index = SearchIndex(catalog_items)
+    build = time.perf_counter() - started
+
+    queries: Dict[str, Any] = {}
+    for kind, query, item_type_id in QUERIES:
+        hits = len(index.search(query, limit, item_type_id))
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            index.search(query, limit, item_type_id)
+            samples.append(time.perf_counter() - started)
+        queries[kind] = {
+            "query": query,
+            "hits": hits,
+            "median_us": round(statistics.median(samples) * 1e6, 1),
+            "p99_us": round(percentile(samples, 0.99) * 1e6, 1),
+        }
+    return {
+        "items": items,
+        "limit": limit,
+        "build_ms": round(build * 1000, 1),
+        "max_p99_us": max(result["p99_us"] for result in queries.values()),
+        "queries": queries,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    report(run_search(args.items, args.repeat, args.limit, args.seed), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Per-page cost of GET /groceries: ORM + response_model vs Core + orjson.
+
+python -m benchmarks.serialization --groceries 500 --lines 8 --limit 100
+
+Runs in-process against a scratch SQLite file so the numbers isolate query,
+object building and JSON encoding from HTTP overhead. Each timed read uses a
+fresh session, as a request would.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Sequence
+
+
+def _time_page(read: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        read()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groceries", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        # Imported late: the database module reads DATABASE_URL at import time
+        import orjson
+        from pydantic import TypeAdapter
+        from sqlalchemy import insert
+
+        from grocery_api import crud, database, models, schemas
+        from grocery_api.migrations import ensure_schema
+        from grocery_api.seed import seed_item_types_and_items
+
+        ensure_schema(database.engine)
+        with database.SessionLocal() as db:
+            seed_item_types_and_items(db)
+            item_ids = list(crud.catalog.get(db).items_by_id)
+            grocery_ids: Sequence[int] = (
+                db.execute(
+                    insert(models.Grocery).returning(models.Grocery.id),
+                    [
+                        {
+                            "family_id": 1,
+                            "grocery_date": date(2024, 1, 1) + timedelta(n),
+                        }
+                        for n in range(args.groceries)
+                    ],
+                )
+                .scalars()
+                .all()
+            )
+            db.execute(
+                insert(models.GroceryItem),
+                [
+                    {"grocery_id": grocery_id, "item_id": item_ids[n % len(item_ids)]}
+                    for grocery_id in grocery_ids
+                    for n in range(args.lines)
+                ],
+            )
+            db.commit()
+
+        adapter = TypeAdapter(list[schemas.Grocery])
+
+        def orm_page() -> bytes:
+            with database.SessionLocal() as db:
+                page = crud.get_groceries(db, limit=args.limit)
+                return adapter.dump_json(adapter.validate_python(page.items))
+
+        def fast_page() -> bytes:
+            with database.SessionLocal() as db:
+                return orjson.dumps(crud.get_grocery_rows(db, limit=args.limit).items)
+
+        assert orm_page() == fast_page(), "fast path output differs"
+        results: Dict[str, Any] = {
+            "orm_response_model": _time_page(orm_page, args.repeat),
+            "core_orjson": _time_page(fast_page, args.repeat),
+        }
+        results["speedup"] = round(
+            results["orm_response_model"]["median_ms"]
+            / results["core_orjson"]["median_ms"],
+            2,
+        )
+        database.engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
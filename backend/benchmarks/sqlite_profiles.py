@@ -0,0 +1,93 @@
+"""Read throughput while a writer holds long transactions, per SQLITE_PROFILE.
+
+python -m benchmarks.sqlite_profiles --clients 50 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import closed_loop, running_server
+
+
+def _writer(db_path: Path, stop: threading.Event, rows: int, hold: float) -> int:
+    """Repeatedly write a large batch and sit on the open transaction.
+
+    Rows go to a scratch table so the payload the readers fetch stays constant;
+    only the lock traffic on the shared database file matters here.
+    """
+    commits = 0
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS bench_writes (id INTEGER PRIMARY KEY, note TEXT)"
+    )
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO bench_writes (note) VALUES (?)",
+            [("x" * 64,)] * rows,
+        )
+        time.sleep(hold)
+        conn.execute("COMMIT")
+        commits += 1
+    conn.close()
+    return commits
+
+
+async def _read(client: httpx.AsyncClient, worker_id: int) -> httpx.Response:
+    return await client.get("/api/v1/groceries", params={"limit": 20})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-rows", type=int, default=50_000)
+    parser.add_argument("--hold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {}
+    for profile in ("none", "production"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "bench.db"
+            env = {"SQLITE_PROFILE": profile}
+            with running_server(f"sqlite:///{db_path}", env=env) as base_url:
+                item_id = httpx.get(f"{base_url}/api/v1/items").json()[0]["id"]
+                for day in range(1, 29):
+                    httpx.post(
+                        f"{base_url}/api/v1/groceries",
+                        json={
+                            "family_id": 1,
+                            "grocery_date": f"2024-02-{day:02d}",
+                            "grocery_items": [{"item_id": item_id}],
+                        },
+                    )
+                stop = threading.Event()
+                commits = []
+                writer = threading.Thread(
+                    target=lambda: commits.append(
+                        _writer(db_path, stop, args.write_rows, args.hold)
+                    )
+                )
+                writer.start()
+                try:
+                    summary = asyncio.run(
+                        closed_loop(base_url, args.clients, args.duration, _read)
+                    )
+                finally:
+                    stop.set()
+                    writer.join()
+                summary["writer_commits"] = commits[0] if commits else 0
+                results[profile] = summary
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Startup cost on a generated database: setup work alone, then time to ready.
+
+python -m benchmarks.startup --families 200 --repeat 5 --output startup.json
+
+`prepare_ms` runs `python -m grocery_api.startup` in a subprocess: `cold` on an
+empty database, `current` once its markers are stored (a restart), `forced`
+redoing the schema check and seed as every start used to. `ready_s` is wall
+time from launching uvicorn (one worker, then `--workers`) until it answers.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import BACKEND_DIR, add_report_arguments, report, running_server
+
+
+def _run(module: str, env: Dict[str, str], *args: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-m", module, *args],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def _prepare_ms(env: Dict[str, str], *args: str) -> float:
+    return json.loads(_run("grocery_api.startup", env, *args))["seconds"] * 1000
+
+
+def _median(samples: List[float], digits: int) -> float:
+    return round(statistics.median(samples), digits)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--families", type=int, default=200)
+    parser.add_argument("--groceries-per-family", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'startup.db'}"
+        env = {**os.environ, "DATABASE_URL": database_url}
+
+        cold = _prepare_ms(env)
+        _run(
+            "grocery_api.seed",
+            env,
+            "--families",
+            str(args.families),
+            "--groceries-per-family",
+            str(args.groceries_per_family),
+        )
+        current = [_prepare_ms(env) for _ in range(args.repeat)]
+        forced = [_prepare_ms(env, "--force") for _ in range(args.repeat)]
+        results["prepare_ms"] = {
+            "cold": round(cold, 2),
+            "current": _median(current, 2),
+            "forced": _median(forced, 2),
+        }
+
+        ready: Dict[str, List[float]] = {"one_worker": [], "workers": []}
+        for _ in range(args.repeat):
+            for key, extra in (
+                ("one_worker", []),
+                ("workers", ["--workers", str(args.workers)]),
+            ):
+                started = time.perf_counter()
+                with running_server(database_url, args=extra):
+                    ready[key].append(time.perf_counter() - started)
+        results["ready_s"] = {key: _median(runs, 3) for key, runs in ready.items()}
+    results["config"] = {
+        "families": args.families,
+        "groceries_per_family": args.groceries_per_family,
+        "workers": args.workers,
+    }
+    report(results, args)
+
+
+if __name__ == "__main__":
+    main()
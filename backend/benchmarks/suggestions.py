@@ -0,0 +1,163 @@
+"""Suggestion latency from the co-occurrence matrix on a million-line history.
+
+python -m benchmarks.suggestions --lines 1000000 --repeat 200 --output suggestions.json
+
+Generates `--lines` grocery lines (8 per list on average, Zipf items over an
+`--items` catalog) into a scratch SQLite file; the generator keeps
+`item_pairs` current as it writes, as the API does. Then, in a child process
+bound to that file, `cooccurrence.suggest` is timed for `--repeat` random
+lists and compared with answering the same question without the matrix: a
+self-join of grocery_items through the lists holding the list's items, per
+request. Last, the matrix is emptied and rebuilt from scratch, which is what a
+startup would cost if it were not persisted.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import BACKEND_DIR, add_report_arguments, percentile, report
+
+LINES_PER_LIST = 8
+GROCERIES_PER_FAMILY = 50
+BASELINE_REPEAT = 20  # the self-join is slow enough that a few calls will do
+
+
+def _timings(samples: List[float]) -> Dict[str, float]:
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 1),
+        "p99_us": round(percentile(samples, 0.99) * 1e6, 1),
+    }
+
+
+def _measure(repeat: int, seed: int) -> Dict[str, Any]:
+    from sqlalchemy import Select, delete, func, select
+
+    from grocery_api import cooccurrence, database, models
+
+    lines = models.GroceryItem
+    held, other = lines.__table__.alias(), lines.__table__.alias()
+
+    def self_join(db: Any, grocery_id: int) -> List[Any]:
+        on_list: Select[int] = select(lines.item_id).where(
+            lines.grocery_id == grocery_id
+        )
+        return db.execute(
+            select(other.c.item_id, func.count(other.c.grocery_id.distinct()))
+            .select_from(held.join(other, held.c.grocery_id == other.c.grocery_id))
+            .where(held.c.item_id.in_(on_list), other.c.item_id.not_in(on_list))
+            .group_by(other.c.item_id)
+        ).all()
+
+    with database.SessionLocal() as db:
+        top = db.execute(select(func.max(models.Grocery.id))).scalar() or 0
+        rng = random.Random(seed)
+        grocery_ids = [rng.randint(1, top) for _ in range(repeat)]
+        cooccurrence.suggest(db, grocery_ids[0])  # warm the catalog snapshot
+
+        samples = []
+        for grocery_id in grocery_ids:
+            started = time.perf_counter()
+            cooccurrence.suggest(db, grocery_id)
+            samples.append(time.perf_counter() - started)
+
+        baseline = []
+        for grocery_id in grocery_ids[:BASELINE_REPEAT]:
+            started = time.perf_counter()
+            self_join(db, grocery_id)
+            baseline.append(time.perf_counter() - started)
+
+        pairs = db.execute(select(func.count()).select_from(models.ItemPair)).scalar()
+        db.execute(delete(models.ItemPair))
+        db.commit()
+        started = time.perf_counter()
+        cooccurrence.backfill(db)
+        rebuild = time.perf_counter() - started
+
+    return {
+        "suggest": _timings(samples),
+        "self_join_baseline": _timings(baseline),
+        "speedup": round(statistics.median(baseline) / statistics.median(samples), 1),
+        "pair_rows": pairs,
+        "rebuild_ms": round(rebuild * 1000, 1),
+    }
+
+
+def run_suggestions(
+    lines: int, items: int, repeat: int = 200, seed: int = 1
+) -> Dict[str, Any]:
+    groceries = max(1, lines // LINES_PER_LIST)
+    families = max(1, groceries // GROCERIES_PER_FAMILY)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'suggestions.db'}",
+        }
+        seeded = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "grocery_api.seed",
+                "--families",
+                str(families),
+                "--groceries-per-family",
+                str(GROCERIES_PER_FAMILY),
+                "--lines",
+                str(LINES_PER_LIST),
+                "--items",
+                str(items),
+                "--seed",
+                str(seed),
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        measured = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.suggestions",
+                "--measure",
+                str(repeat),
+                "--seed",
+                str(seed),
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    return {"data": json.loads(seeded.stdout), **json.loads(measured.stdout)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--measure", type=int, help=argparse.SUPPRESS)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        # Child process: DATABASE_URL already points at the generated database
+        print(json.dumps(_measure(args.measure, args.seed)))
+        return
+    report(run_suggestions(args.lines, args.items, args.repeat, args.seed), args)
+
+
+if __name__ == "__main__":
+    main()
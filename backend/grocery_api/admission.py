@@ -0,0 +1,171 @@
+"""Admission control: bounded concurrency per request class, shed the rest.
+
+Reads (GET/HEAD) and writes (everything else) each get their own limit on
+requests in progress. SQLite takes one writer at a time, so the write limit
+is small; reads can run side by side. A request over its class limit waits in
+a FIFO queue of bounded length. It is answered 503 with `Retry-After` straight
+away if that queue is full, or once it has waited `ADMISSION_QUEUE_TIMEOUT`
+seconds without getting a slot. Requests that get through therefore never
+queue behind an unbounded backlog, and p99 stays near the cost of the queue
+deadline plus the request itself. Without this, a burst piles up in the
+threadpool waiting on the database lock until clients time out.
+
+Health, readiness, metrics and the change stream (long-lived, and mostly
+idle) are exempt. Everything runs on the event loop, so the counters need no
+lock. Queue depth, requests in progress and rejections are exported through
+`grocery_api/metrics.py`.
+"""
+
+import asyncio
+import math
+import os
+from collections import deque
+from typing import Callable, Deque, Optional
+
+import orjson
+
+from . import metrics
+
+READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "32"))
+WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "4"))
+READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", "128"))
+WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", "64"))
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1"))
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+EXEMPT_PATHS = frozenset(
+    {"/", "/ready", "/metrics", "/docs", "/openapi.json", "/api/v1/changes/stream"}
+)
+
+QUEUE_FULL = "queue_full"
+TIMEOUT = "timeout"
+
+
+class Gate:
+    """At most `limit` holders; up to `max_queue` more wait in arrival order.
+
+    A released slot is handed straight to the oldest waiter, so a request
+    arriving just then cannot jump the queue. `limit` 0 admits everything.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot; None once held, otherwise why the request is shed."""
+        if self.limit <= 0:
+            return None
+        if self.in_flight < self.limit and not self._waiters:
+            self._enter()
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return self._reject(QUEUE_FULL)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._observe()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+            return None
+        except asyncio.TimeoutError:
+            return self._reject(TIMEOUT)
+        except BaseException:
+            # Cancelled (client gone) just as the slot was handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                self._observe()
+
+    def release(self) -> None:
+        if self.limit <= 0:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes on as is: in_flight stays the same
+                waiter.set_result(None)
+                self._observe()
+                return
+        self.in_flight -= 1
+        self._observe()
+
+    def _enter(self) -> None:
+        self.in_flight += 1
+        self._observe()
+
+    def _reject(self, reason: str) -> str:
+        if metrics.ENABLED:
+            metrics.ADMISSION_REJECTED.inc((self.name, reason))
+        return reason
+
+    def _observe(self) -> None:
+        if metrics.ENABLED:
+            metrics.ADMISSION_QUEUED.set((self.name,), len(self._waiters))
+            metrics.ADMISSION_IN_FLIGHT.set((self.name,), self.in_flight)
+
+
+class AdmissionMiddleware:
+    """Plain ASGI; holds a slot of the request's class until its response is
+    sent (streamed responses included)."""
+
+    def __init__(
+        self,
+        app: Callable,
+        read_limit: int = READ_LIMIT,
+        write_limit: int = WRITE_LIMIT,
+        read_queue: int = READ_QUEUE,
+        write_queue: int = WRITE_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+    ) -> None:
+        self.app = app
+        self.reads = Gate("read", read_limit, read_queue, queue_timeout)
+        self.writes = Gate("write", write_limit, write_queue, queue_timeout)
+        self.retry_after = str(max(1, math.ceil(queue_timeout))).encode()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        gate = self.reads if scope["method"] in READ_METHODS else self.writes
+        reason = await gate.acquire()
+        if reason is not None:
+            await _send_overloaded(send, gate.name, reason, self.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+async def _send_overloaded(send, kind: str, reason: str, retry_after: bytes) -> None:
+    if reason == QUEUE_FULL:
+        detail = f"Too many {kind} requests queued; retry later."
+    else:
+        detail = f"Timed out waiting for a {kind} slot; retry later."
+    body = orjson.dumps({"detail": detail})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
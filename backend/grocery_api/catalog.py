@@ -0,0 +1,123 @@
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session
+
+from . import invalidation, models
+
+CHANNEL = "catalog"
+
+
+class CatalogItemType(NamedTuple):
+    id: int
+    name: str
+    created_at: datetime
+
+
+class CatalogItem(NamedTuple):
+    id: int
+    name: str
+    item_type_id: int
+    created_at: datetime
+    sort_key: str  # created_at exactly as stored, for cursor pagination
+
+
+class CatalogSnapshot(NamedTuple):
+    """Immutable view of item types and items; replaced wholesale on change."""
+
+    stamp: invalidation.Stamp
+    item_types_by_id: Mapping[int, CatalogItemType]
+    item_types_by_name: Mapping[str, CatalogItemType]
+    items_by_id: Mapping[int, CatalogItem]
+    items_by_name: Mapping[str, CatalogItem]
+    item_types: Tuple[CatalogItemType, ...]  # id order
+    items: Tuple[CatalogItem, ...]  # (created_at, id) order, as /items pages
+    item_keys: Tuple[Tuple[str, int], ...]  # sort keys parallel to `items`
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_rebuild_lock = threading.Lock()
+
+
+def _load(db: Session, stamp: invalidation.Stamp) -> CatalogSnapshot:
+    type_rows: Result[Any] = db.execute(
+        select(
+            models.ItemType.id, models.ItemType.name, models.ItemType.created_at
+        ).order_by(models.ItemType.id)
+    )
+    item_types = tuple(CatalogItemType._make(row) for row in type_rows)
+    raw_created_at = type_coerce(models.Item.created_at, String).label("sort_key")
+    item_rows: Result[Any] = db.execute(
+        select(
+            models.Item.id,
+            models.Item.name,
+            models.Item.item_type_id,
+            models.Item.created_at,
+            raw_created_at,
+        ).order_by(models.Item.created_at, models.Item.id)
+    )
+    items = tuple(CatalogItem._make(row) for row in item_rows)
+    return CatalogSnapshot(
+        stamp=stamp,
+        item_types_by_id=MappingProxyType({t.id: t for t in item_types}),
+        item_types_by_name=MappingProxyType({t.name: t for t in item_types}),
+        items_by_id=MappingProxyType({i.id: i for i in items}),
+        items_by_name=MappingProxyType({i.name: i for i in items}),
+        item_types=item_types,
+        items=items,
+        item_keys=tuple((i.sort_key, i.id) for i in items),
+    )
+
+
+def get(db: Session) -> CatalogSnapshot:
+    """Return the current snapshot, rebuilding it if any process bumped the stamp."""
+    global _snapshot
+    stamp = invalidation.current(CHANNEL)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.stamp == stamp:
+        return snapshot
+    with _rebuild_lock:
+        if _snapshot is None or _snapshot.stamp != stamp:
+            # The stamp is read before loading, so a bump racing with this
+            # rebuild leaves a mismatch and triggers another one next time.
+            _snapshot = _load(db, stamp)
+        return _snapshot
+
+
+def invalidate() -> None:
+    """Call after committing catalog rows: every worker, this one included,
+    reloads on its next lookup."""
+    invalidation.bump(CHANNEL)
+
+
+def refresh(db: Session) -> CatalogSnapshot:
+    """`invalidate`, then rebuild this worker's snapshot right away."""
+    invalidate()
+    return get(db)
+
+
+# Payload keys follow the response schemas' field order, so the fast read path
+# can encode them directly and still match response_model output byte for byte.
+def item_type_payload(item_type: CatalogItemType) -> Dict[str, Any]:
+    return {
+        "name": item_type.name,
+        "id": item_type.id,
+        "created_at": item_type.created_at,
+    }
+
+
+def item_payload(
+    snapshot: CatalogSnapshot, item: CatalogItem, with_type: bool
+) -> Dict[str, Any]:
+    item_type = snapshot.item_types_by_id.get(item.item_type_id)
+    return {
+        "name": item.name,
+        "item_type_id": item.item_type_id,
+        "id": item.id,
+        "created_at": item.created_at,
+        "item_type": item_type_payload(item_type) if with_type and item_type else None,
+    }
@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    cast,
+)
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Table, delete, event, func, insert, select
+from sqlalchemy.engine import CursorResult, Result
+from sqlalchemy.orm import Session
+
+from . import database, invalidation, metrics, models
+
+logger = logging.getLogger(__name__)
+
+# Change feed: crud writes rows to `changes` inside each mutation's transaction
+# and bumps CHANNEL once it commits. One hub per event loop polls the stamp,
+# reads new rows once and fans them out to every subscriber's bounded queue, so
+# an idle subscriber costs a queue slot per event and no database work.
+CHANNEL = "changes"
+GROCERY = "grocery"
+GROCERY_ITEM = "grocery_item"
+
+POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "0.25"))
+BUFFER_SIZE = int(os.getenv("CHANGE_FEED_BUFFER", "256"))
+HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+# Newest changes kept in the log; older ones are pruned at startup and by the
+# hub as it polls. Clients resuming from before the window get a reset event.
+RETENTION = int(os.getenv("CHANGE_FEED_RETENTION", "100000"))
+PAGE_SIZE = 500
+
+_PENDING_KEY = "changes_pending"
+
+
+_CHANGES = cast(Table, models.Change.__table__)
+
+
+class ChangeEvent(NamedTuple):
+    id: int
+    entity: str
+    op: str
+    entity_id: int
+    grocery_id: int
+    created_at: datetime
+
+
+def record(db: Session, changes: Iterable[Tuple[str, str, int, int]]) -> None:
+    """Log `(entity, op, entity_id, grocery_id)` changes in the caller's transaction.
+
+    Subscribers are woken after the transaction commits; a rollback drops both.
+    """
+    rows: List[Dict[str, Any]] = [
+        {"entity": entity, "op": op, "entity_id": entity_id, "grocery_id": grocery_id}
+        for entity, op, entity_id, grocery_id in changes
+    ]
+    if rows:
+        db.execute(insert(models.Change), rows)
+        db.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        invalidation.bump(CHANNEL)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def read_since(db: Session, after_id: int, limit: int = PAGE_SIZE) -> List[ChangeEvent]:
+    """Changes with an id above `after_id`, oldest first."""
+    rows: Result[Any] = db.execute(
+        select(*(_CHANGES.c[field] for field in ChangeEvent._fields))
+        .where(_CHANGES.c.id > after_id)
+        .order_by(_CHANGES.c.id)
+        .limit(limit)
+    )
+    return [ChangeEvent._make(row) for row in rows]
+
+
+def head(db: Session) -> int:
+    """Id of the newest change; 0 while the log is empty."""
+    return db.execute(select(func.max(_CHANGES.c.id))).scalar() or 0
+
+
+def oldest(db: Session) -> int:
+    """Id of the oldest change still retained; 0 while the log is empty."""
+    return db.execute(select(func.min(_CHANGES.c.id))).scalar() or 0
+
+
+def prune(db: Session, keep: int = RETENTION) -> int:
+    """Drop all but the newest `keep` changes; returns how many were deleted."""
+    cutoff = head(db) - keep
+    if cutoff <= 0:
+        return 0
+    deleted = cast(
+        CursorResult, db.execute(delete(_CHANGES).where(_CHANGES.c.id <= cutoff))
+    )
+    db.commit()
+    return deleted.rowcount
+
+
+async def _with_session(fn, *args):
+    def call():
+        with database.SessionLocal() as db:
+            return fn(db, *args)
+
+    return await run_in_threadpool(call)
+
+
+def format_event(change: ChangeEvent) -> bytes:
+    data = orjson.dumps(change._asdict())
+    return b"id: %d\nevent: change\ndata: %s\n\n" % (change.id, data)
+
+
+def format_reset(head_id: int) -> bytes:
+    """Tell a client its resume point was pruned: refetch, then go on from here."""
+    return b"id: %d\nevent: reset\ndata: {}\n\n" % head_id
+
+
+# --------------------------------------------------------------------
+# HUB
+# --------------------------------------------------------------------
+class Subscriber:
+    def __init__(self, buffer_size: int) -> None:
+        self.queue: "asyncio.Queue[ChangeEvent]" = asyncio.Queue(maxsize=buffer_size)
+        # Set when the queue filled up; the stream then drops the queue and
+        # catches up from the log, so a slow client never holds more than
+        # `buffer_size` events and never misses one.
+        self.overflowed = False
+
+
+class ChangeHub:
+    """Polls the change log for one event loop and fans new rows out."""
+
+    def __init__(
+        self,
+        poll_interval: float = POLL_INTERVAL,
+        buffer_size: int = BUFFER_SIZE,
+        page_size: int = PAGE_SIZE,
+        retention: int = RETENTION,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.page_size = page_size
+        self.retention = retention
+        self.subscribers: Set[Subscriber] = set()
+        self.last_id = 0
+        self.reads = 0  # change log queries issued, whatever the subscriber count
+        self._stamp: Optional[invalidation.Stamp] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._start_lock = asyncio.Lock()
+
+    async def read(self, after_id: int) -> List[ChangeEvent]:
+        self.reads += 1
+        return await _with_session(read_since, after_id, self.page_size)
+
+    async def subscribe(self) -> Subscriber:
+        """Register a subscriber; it receives every change after `last_id`."""
+        async with self._start_lock:
+            if self._task is None:
+                # Nobody listened while the hub was stopped; start from the head
+                self.last_id = await _with_session(head)
+                self._stamp = invalidation.current(CHANNEL)
+                self._task = asyncio.get_running_loop().create_task(self._run())
+        subscriber = Subscriber(self.buffer_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def publish(self, changes: List[ChangeEvent]) -> None:
+        for subscriber in self.subscribers:
+            if subscriber.overflowed:
+                continue
+            for change in changes:
+                try:
+                    subscriber.queue.put_nowait(change)
+                except asyncio.QueueFull:
+                    subscriber.overflowed = True
+                    break
+
+    async def poll(self) -> None:
+        """Publish whatever was committed since the last poll, if anything was."""
+        stamp = invalidation.current(CHANNEL)
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+        published = self.last_id
+        while True:
+            changes = await self.read(self.last_id)
+            if changes:
+                self.last_id = changes[-1].id
+                self.publish(changes)
+            if len(changes) < self.page_size:
+                break
+        # Trim once per `retention` new rows rather than on every write
+        if published // self.retention != self.last_id // self.retention:
+            await _with_session(prune, self.retention)
+
+    async def _run(self) -> None:
+        # Started by the first subscriber's request; its polls are not that
+        # request's queries
+        metrics.untrack()
+        try:
+            while self.subscribers:
+                try:
+                    await self.poll()
+                except Exception:
+                    # Keep serving; the stamp is re-read and the poll retried
+                    self._stamp = None
+                    logger.exception("Change feed poll failed")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self._task = None
+
+
+_hubs: Dict[asyncio.AbstractEventLoop, ChangeHub] = {}
+
+
+def get_hub() -> ChangeHub:
+    """The hub serving the running event loop."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        for stale in [other for other in _hubs if other.is_closed()]:
+            del _hubs[stale]
+        hub = _hubs[loop] = ChangeHub()
+    return hub
+
+
+async def stream(
+    hub: ChangeHub,
+    last_event_id: Optional[int] = None,
+    follow: bool = True,
+    heartbeat: float = HEARTBEAT,
+) -> AsyncGenerator[bytes, None]:
+    """Server-sent events for every change after `last_event_id`.
+
+    Without `last_event_id` the stream starts at the newest change. With
+    `follow=False` it replays the backlog and ends instead of waiting for more.
+    """
+    sent = last_event_id
+    if sent is not None:
+        first = await _with_session(oldest)
+        if first > sent + 1:
+            # Events after `sent` were pruned; the client must start over
+            sent = await _with_session(head)
+            yield format_reset(sent)
+    if not follow:
+        changes = [] if sent is None else await hub.read(sent)
+        while changes:
+            for change in changes:
+                yield format_event(change)
+            if len(changes) < hub.page_size:
+                return
+            changes = await hub.read(changes[-1].id)
+        return
+
+    # Registering before replaying means anything committed from here on also
+    # reaches the queue; duplicates of the replay are skipped by id below.
+    subscriber = await hub.subscribe()
+    # Taken before the first yield: the hub may poll while the generator is
+    # suspended, and anything it publishes then must not count as sent.
+    catch_up = sent is not None
+    if sent is None:
+        sent = hub.last_id
+    try:
+        yield b"retry: 2000\n\n"
+        while True:
+            if catch_up or subscriber.overflowed:
+                subscriber.overflowed = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                while True:
+                    changes = await hub.read(sent)
+                    for change in changes:
+                        yield format_event(change)
+                        sent = change.id
+                    if len(changes) < hub.page_size:
+                        break
+                catch_up = False
+            try:
+                change = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if change.id <= sent:
+                continue
+            yield format_event(change)
+            sent = change.id
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,294 @@
+"""Response compression negotiated from Accept-Encoding, plus a cache of
+precompressed bodies for responses that only change with the catalog.
+
+`CompressionMiddleware` compresses JSON, NDJSON, CSV and text responses with
+the best coding the client accepts: zstd, then br, then gzip. gzip is always
+available; br needs the `brotli` package and zstd the `zstandard` package (or
+Python 3.14's `compression.zstd`), and each is offered only when importable.
+Bodies under `COMPRESSION_MIN_SIZE` bytes are sent as they are, since the
+headers and CPU would cost more than they save. Streamed responses (exports)
+are gzip-compressed chunk by chunk with a sync flush, so nothing is buffered.
+The change stream is never compressed, as it must reach clients event by
+event. A compressed response's ETag is made weak, since its bytes differ from
+the identity body's; `If-None-Match` compares weakly, so 304s still work.
+
+`PrecompressedCache` holds whole responses by ETag. The catalog endpoints'
+ETags change only with the catalog, so each page is serialized once per
+catalog version and compressed once per coding, at each codec's highest
+level, since the cost is paid once. Repeat requests are a dict lookup.
+"""
+
+import gzip
+import os
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "256"))
+# Bodies this large are compressed in the threadpool, off the event loop;
+# zlib, brotli and zstd all release the GIL while they work
+OFFLOAD_SIZE = 64 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+STREAM_ONLY_TYPES = ("text/event-stream",)
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+class Codec:
+    """One content coding: a fast level for per-request compression and the
+    highest level for bodies compressed once and cached."""
+
+    def __init__(
+        self, name: str, compress: Callable[[bytes, int], bytes], fast: int, best: int
+    ) -> None:
+        self.name = name
+        self._compress = compress
+        self.fast = fast
+        self.best = best
+
+    def compress(self, data: bytes, cached: bool = False) -> bytes:
+        return self._compress(data, self.best if cached else self.fast)
+
+
+def _available_codecs() -> Dict[str, Codec]:
+    # Preference order when the client rates several codings the same
+    codecs: Dict[str, Codec] = {}
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+
+        codecs["zstd"] = Codec(
+            "zstd", lambda data, level: zstd.compress(data, level), 3, 19
+        )
+    except ImportError:
+        try:
+            import zstandard  # type: ignore[import-not-found]
+
+            codecs["zstd"] = Codec(
+                "zstd",
+                lambda data, level: zstandard.ZstdCompressor(level).compress(data),
+                3,
+                19,
+            )
+        except ImportError:
+            pass
+    try:
+        import brotli  # type: ignore[import-not-found]
+
+        codecs["br"] = Codec(
+            "br", lambda data, level: brotli.compress(data, quality=level), 4, 11
+        )
+    except ImportError:
+        pass
+    codecs["gzip"] = Codec(
+        "gzip",
+        lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+        GZIP_LEVEL,
+        9,
+    )
+    return codecs
+
+
+CODECS = _available_codecs()
+
+
+def negotiate(
+    accept_encoding: Optional[str], offered: Sequence[str] = tuple(CODECS)
+) -> Optional[str]:
+    """The best of the `offered` codings the client accepts, or None for the
+    identity body. The highest q-value wins; ties go to the `offered` order."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        key, _, value = params.strip().partition("=")
+        if key.strip().lower() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in offered:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not (
+        content_type.startswith(STREAM_ONLY_TYPES)
+    )
+
+
+def _vary(headers: MutableHeaders) -> None:
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+def _mark_encoded(headers: MutableHeaders, coding: str, length: Optional[int]) -> None:
+    headers["content-encoding"] = coding
+    if length is None:
+        del headers["content-length"]
+    else:
+        headers["content-length"] = str(length)
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["etag"] = f"W/{etag}"
+
+
+async def _compress(codec: Codec, body: bytes, cached: bool = False) -> bytes:
+    if len(body) >= OFFLOAD_SIZE:
+        return await run_in_threadpool(codec.compress, body, cached)
+    return codec.compress(body, cached)
+
+
+# --------------------------------------------------------------------
+# MIDDLEWARE
+# --------------------------------------------------------------------
+class CompressionMiddleware:
+    """Plain ASGI; holds back the response start until the first body chunk
+    shows whether the body is complete (one-shot) or streamed."""
+
+    def __init__(self, app: Callable, minimum_size: int = MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        start: Optional[dict] = None
+        stream: Optional["zlib._Compress"] = None
+        passthrough = False
+
+        async def compressing_send(message) -> None:
+            nonlocal start, stream, passthrough
+            if passthrough or message["type"] not in (
+                "http.response.start",
+                "http.response.body",
+            ):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if _compressible(Headers(raw=message["headers"])):
+                    start = message
+                else:
+                    # Sent at once: an event stream's first chunk may be far off
+                    passthrough = True
+                    await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is not None:
+                body = stream.compress(body)
+                body += stream.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+                await send({**message, "body": body})
+                return
+
+            assert start is not None
+            headers = MutableHeaders(raw=list(start["headers"]))
+            start = {**start, "headers": headers.raw}
+            _vary(headers)
+            if more_body:
+                coding = negotiate(accept_encoding, ("gzip",))
+            elif len(body) >= self.minimum_size:
+                coding = negotiate(accept_encoding)
+            else:
+                coding = None
+            if coding is None:
+                passthrough = True
+                await send(start)
+                await send(message)
+            elif more_body:
+                stream = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+                _mark_encoded(headers, coding, None)
+                await send(start)
+                body = stream.compress(body) + stream.flush(zlib.Z_SYNC_FLUSH)
+                await send({**message, "body": body})
+            else:
+                body = await _compress(CODECS[coding], body)
+                _mark_encoded(headers, coding, len(body))
+                await send(start)
+                await send({**message, "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
+
+# --------------------------------------------------------------------
+# PRECOMPRESSED RESPONSES
+# --------------------------------------------------------------------
+class Precompressed:
+    """A JSON body with its headers and each coding of it made so far."""
+
+    __slots__ = ("body", "headers", "encoded")
+
+    def __init__(self, body: bytes, headers: RawHeaders) -> None:
+        self.body = body
+        self.headers = headers
+        self.encoded: Dict[str, bytes] = {}
+
+
+class PrecompressedCache:
+    """LRU of responses by ETag, so only for responses whose ETag covers every
+    input of the body. Used from the event loop only, so it needs no lock."""
+
+    def __init__(
+        self, max_entries: int = CACHE_ENTRIES, minimum_size: int = MIN_SIZE
+    ) -> None:
+        self.max_entries = max_entries
+        self.minimum_size = minimum_size
+        self._entries: "OrderedDict[str, Precompressed]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, etag: str) -> Optional[Precompressed]:
+        entry = self._entries.get(etag)
+        if entry is not None:
+            self._entries.move_to_end(etag)
+        return entry
+
+    def put(self, etag: str, body: bytes, headers: RawHeaders) -> Precompressed:
+        entry = self._entries[etag] = Precompressed(body, headers)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def respond(self, entry: Precompressed, request: Request) -> Response:
+        """`entry` in the best coding `request` accepts, compressing it on the
+        first request for that coding."""
+        coding = None
+        if len(entry.body) >= self.minimum_size:
+            coding = negotiate(request.headers.get("accept-encoding"))
+        body = entry.body
+        if coding is not None:
+            encoded = entry.encoded.get(coding)
+            if encoded is None:
+                encoded = await _compress(CODECS[coding], entry.body, cached=True)
+                entry.encoded[coding] = encoded
+            body = encoded
+        response = Response(body, media_type="application/json")
+        response.headers.raw.extend(entry.headers)
+        _vary(response.headers)
+        if coding is not None:
+            _mark_encoded(response.headers, coding, len(body))
+        return response
@@ -0,0 +1,271 @@
+"""Item co-occurrence across lists, maintained incrementally, for suggestions.
+
+`item_pairs` is a sparse, symmetric item-by-item matrix: for every two items
+that share a list, the number of lists holding both, stored in both orders so
+either item's row is one index range; the diagonal counts the lists holding
+each item. Like the family summaries it lives in the database, so it survives
+restarts and every worker sees the same counts, and it is never rebuilt: each
+crud write that changes which items a list holds describes that as a
+`PairDelta` and `apply`s it in its own transaction, with one upsert.
+
+A list counts once per pair however many lines repeat an item, so a delta is
+worked out from the distinct items of a list before and after the write.
+Writes of whole lists know both sides already; line writes read the current
+items of the lists they touched once (`apply_line_changes`), and writes that
+do not change a line's item (quantity, purchased) cost nothing extra.
+
+`suggest` ranks the items missing from a list by how often they appear in
+lists holding its items: the mean over the list's items x of
+lists(x, y) / lists(x). Only the rows of those items are read, and the
+database sums and ranks them, so the cost depends on the catalog, not on how
+many lists the history holds.
+
+python -m grocery_api.cooccurrence   # compare with a full recompute; exits 1 on mismatch
+"""
+
+import argparse
+import sys
+from collections import Counter, defaultdict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from sqlalchemy import Select, Table, case, func, insert, select
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session
+
+from . import catalog, models, summaries
+
+_PAIRS = cast(Table, models.ItemPair.__table__)
+_GROCERIES = cast(Table, models.Grocery.__table__)
+_LINES = cast(Table, models.GroceryItem.__table__)
+
+Pair = Tuple[int, int]
+
+
+class PairDelta:
+    """Co-occurrence adjustments gathered while one transaction writes lists."""
+
+    def __init__(self) -> None:
+        self.pairs: Dict[Pair, int] = defaultdict(int)
+
+    def change(self, before: Iterable[int], after: Iterable[int]) -> None:
+        """Count one list going from the item ids `before` to `after` (repeats
+        allowed; a new list has none before, a deleted one none after)."""
+        old, new = set(before), set(after)
+        added, removed = new - old, old - new
+        pairs = self.pairs
+        for x in added:
+            for y in new:
+                pairs[(x, y)] += 1
+                if y not in added:
+                    pairs[(y, x)] += 1
+        for x in removed:
+            for y in old:
+                pairs[(x, y)] -= 1
+                if y not in removed:
+                    pairs[(y, x)] -= 1
+
+
+def apply(db: Session, delta: PairDelta) -> None:
+    """Add `delta` to `item_pairs` in the caller's transaction: one upsert, or
+    none when the changes cancel out."""
+    rows = [
+        {"item_id": x, "other_item_id": y, "lists": count}
+        for (x, y), count in delta.pairs.items()
+        if count
+    ]
+    if rows:
+        db.execute(summaries.upsert(db, _PAIRS, ("lists",)), rows)
+
+
+def list_items(db: Session, grocery_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """The item id of every line of each list, in one query."""
+    items: Dict[int, List[int]] = {grocery_id: [] for grocery_id in grocery_ids}
+    if items:
+        rows: Result[int, int] = db.execute(
+            select(_LINES.c.grocery_id, _LINES.c.item_id).where(
+                _LINES.c.grocery_id.in_(items)
+            )
+        )
+        for grocery_id, item_id in rows:
+            items[grocery_id].append(item_id)
+    return items
+
+
+def apply_line_changes(
+    db: Session,
+    added: Mapping[int, Sequence[int]],
+    removed: Mapping[int, Sequence[int]],
+) -> None:
+    """Account for line writes already made in this transaction.
+
+    `added` and `removed` map a list id to the item ids of the lines it gained
+    and lost (an item change counts as both). Lists whose item multiset did not
+    change are skipped; the others are read once, after the writes, and their
+    previous items are worked out backwards.
+    """
+    changed = {
+        grocery_id
+        for grocery_id in added.keys() | removed.keys()
+        if Counter(added.get(grocery_id, ())) != Counter(removed.get(grocery_id, ()))
+    }
+    if not changed:
+        return
+    delta = PairDelta()
+    for grocery_id, after in list_items(db, changed).items():
+        before = Counter(after)
+        before.subtract(added.get(grocery_id, ()))
+        before.update(removed.get(grocery_id, ()))
+        delta.change(+before, after)
+    apply(db, delta)
+
+
+# --------------------------------------------------------------------
+# READS
+# --------------------------------------------------------------------
+def suggest(
+    db: Session, grocery_id: int, limit: int = 10
+) -> Optional[List[Dict[str, Any]]]:
+    """Items often bought with the ones on a list, best first; None if the
+    list does not exist, empty if it has no lines yet."""
+    rows: Result[int, Optional[int]] = db.execute(
+        select(_GROCERIES.c.id, _LINES.c.item_id)
+        .select_from(_GROCERIES.outerjoin(_LINES))
+        .where(_GROCERIES.c.id == grocery_id)
+    )
+    lines = rows.all()
+    if not lines:
+        return None
+    on_list = {item_id for _, item_id in lines if item_id is not None}
+    if not on_list:
+        return []
+
+    # lists(x) for each item on the list, then the weighted sum over their rows
+    # of the matrix, added up and ranked by the database
+    support: Result[int, int] = db.execute(
+        select(_PAIRS.c.item_id, _PAIRS.c.lists).where(
+            _PAIRS.c.item_id.in_(on_list),
+            _PAIRS.c.other_item_id == _PAIRS.c.item_id,
+            _PAIRS.c.lists > 0,
+        )
+    )
+    weights = {item_id: 1.0 / lists for item_id, lists in support}
+    if not weights:
+        return []
+    score = func.sum(_PAIRS.c.lists * case(weights, value=_PAIRS.c.item_id))
+    best: Result[int, float] = db.execute(
+        select(_PAIRS.c.other_item_id, score)
+        .where(
+            _PAIRS.c.item_id.in_(weights),
+            _PAIRS.c.other_item_id.not_in(on_list),
+            _PAIRS.c.lists > 0,
+        )
+        .group_by(_PAIRS.c.other_item_id)
+        .order_by(score.desc(), _PAIRS.c.other_item_id)
+        .limit(limit)
+    )
+
+    snapshot = catalog.get(db)
+    suggestions = []
+    for item_id, total in best:
+        item = snapshot.items_by_id.get(item_id)
+        suggestions.append(
+            {
+                "item_id": item_id,
+                "name": item.name if item else None,
+                "score": round(total / len(on_list), 4),
+            }
+        )
+    return suggestions
+
+
+# --------------------------------------------------------------------
+# CONSISTENCY
+# --------------------------------------------------------------------
+def _pair_counts() -> Select[int, int, int]:
+    """The matrix as a query: a self-join of the distinct (list, item) pairs of
+    grocery_items."""
+    held = select(_LINES.c.grocery_id, _LINES.c.item_id).distinct().subquery()
+    other = held.alias()
+    return (
+        select(held.c.item_id, other.c.item_id, func.count())
+        .select_from(held.join(other, held.c.grocery_id == other.c.grocery_id))
+        .group_by(held.c.item_id, other.c.item_id)
+    )
+
+
+def recompute(db: Session) -> Dict[Pair, int]:
+    """The matrix computed from scratch."""
+    rows: Result[int, int, int] = db.execute(_pair_counts())
+    return {(x, y): count for x, y, count in rows}
+
+
+def stored(db: Session) -> Dict[Pair, int]:
+    """`item_pairs` as it is, zeroed rows left out."""
+    rows: Result[int, int, int] = db.execute(
+        select(_PAIRS.c.item_id, _PAIRS.c.other_item_id, _PAIRS.c.lists).where(
+            _PAIRS.c.lists != 0
+        )
+    )
+    return {(x, y): count for x, y, count in rows}
+
+
+def check(db: Session) -> List[str]:
+    """Differences between `item_pairs` and a full recompute; empty when they
+    agree."""
+    expected, actual = recompute(db), stored(db)
+    return [
+        f"pair {pair}: stored {actual.get(pair, 0)}, expected {expected.get(pair, 0)}"
+        for pair in sorted(expected.keys() | actual.keys())
+        if expected.get(pair, 0) != actual.get(pair, 0)
+    ]
+
+
+def backfill(db: Session) -> bool:
+    """Fill an empty `item_pairs` from the lists; True if it did.
+
+    Only meant for databases created before the matrix existed: once it holds
+    rows, writes keep it current and this does nothing.
+    """
+    if db.execute(select(_PAIRS.c.item_id).limit(1)).first() is not None:
+        return False
+    if db.execute(select(_LINES.c.id).limit(1)).first() is None:
+        return False
+    db.execute(
+        insert(_PAIRS).from_select(
+            ["item_id", "other_item_id", "lists"], _pair_counts()
+        )
+    )
+    db.commit()
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the item co-occurrence matrix with a full recompute."
+    )
+    parser.parse_args()
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        problems = check(db)
+    for problem in problems:
+        print(problem)
+    print(
+        f"{len(problems)} mismatch(es)" if problems else "Co-occurrence is consistent"
+    )
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
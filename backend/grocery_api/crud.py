@@ -1,9 +1,62 @@
-from typing import cast
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
+from sqlalchemy import (
+    Select,
+    String,
+    Table,
+    delete,
+    exists,
+    false,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.engine import Result, Row
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
 
-from grocery_api import models, schemas
+from grocery_api import (
+    catalog,
+    changes,
+    cooccurrence,
+    models,
+    schemas,
+    search,
+    summaries,
+)
+from grocery_api.load_profiles import load_options, resolve_expand, trim_unloaded
+from grocery_api.pagination import (
+    Page,
+    page_validator,
+    paginate,
+    paginate_rows,
+    paginate_sorted,
+)
+from grocery_api.versions import next_version
+
+Expand = Optional[Iterable[str]]
 
 
 def _model_dump(schema_obj, **kwargs):
@@ -13,230 +66,1200 @@ def _model_dump(schema_obj, **kwargs):
     return schema_obj.dict(**kwargs)
 
 
+def catalog_stamp(db: Session):
+    """Version of the item types and items, as held by the catalog snapshot."""
+    return catalog.get(db).stamp
+
+
 # --------------------------------------------------------------------
 # ITEM TYPES
 # --------------------------------------------------------------------
 def get_item_types(db: Session, skip: int = 0, limit: int = 50):
-    return (
-        db.query(models.ItemType)
-        .options(selectinload(models.ItemType.items))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    snapshot = catalog.get(db)
+    return [
+        catalog.item_type_payload(item_type)
+        for item_type in snapshot.item_types[skip : skip + limit]
+    ]
 
 
 def create_item_type(db: Session, item_type: schemas.ItemTypeCreate):
-    db_item_type = models.ItemType(**_model_dump(item_type))
-    db.add(db_item_type)
     try:
+        row: Row[int, str, datetime] = db.execute(
+            insert(models.ItemType)
+            .values(**_model_dump(item_type))
+            .returning(
+                models.ItemType.id, models.ItemType.name, models.ItemType.created_at
+            )
+        ).one()
         db.commit()
     except IntegrityError:
         db.rollback()
         raise
-    db.refresh(db_item_type)
-    return db_item_type
+    catalog.invalidate()
+    return catalog.item_type_payload(catalog.CatalogItemType._make(row))
 
 
 # --------------------------------------------------------------------
 # ITEMS
 # --------------------------------------------------------------------
-def get_items(db: Session, skip: int = 0, limit: int = 50):
-    return (
-        db.query(models.Item)
-        .options(selectinload(models.Item.item_type))
-        .offset(skip)
-        .limit(limit)
-        .all()
+def get_items(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    expand: Expand = None,
+) -> Page:
+    snapshot = catalog.get(db)
+    with_type = "item_type" in resolve_expand("catalog", expand)
+    page = paginate_sorted(
+        snapshot.items, snapshot.item_keys, skip=skip, limit=limit, cursor=cursor
+    )
+    return page._replace(
+        items=[catalog.item_payload(snapshot, item, with_type) for item in page.items]
     )
 
 
+def search_items(
+    db: Session,
+    q: str,
+    limit: int = 10,
+    item_type_id: Optional[int] = None,
+    expand: Expand = None,
+) -> List[Dict[str, Any]]:
+    """Autocomplete matches for `q` from the catalog snapshot's search index."""
+    snapshot = catalog.get(db)
+    with_type = "item_type" in resolve_expand("catalog", expand)
+    ids = search.index_for(snapshot).search(q, limit, item_type_id)
+    return [
+        catalog.item_payload(snapshot, snapshot.items_by_id[item_id], with_type)
+        for item_id in ids
+    ]
+
+
 def create_item(db: Session, item: schemas.ItemCreate):
-    item_type_exists = (
-        db.query(models.ItemType)
-        .filter(models.ItemType.id == item.item_type_id)
-        .first()
-    )
-    if not item_type_exists:
-        raise ValueError(f"Unknown item type id={item.item_type_id}")
-    db_item = models.Item(**_model_dump(item))
-    db.add(db_item)
+    # The item type reference is checked by its foreign key, not looked up first
+    snapshot = catalog.get(db)
     try:
+        row: Row[int, str, int, datetime, str] = db.execute(
+            insert(models.Item)
+            .values(**_model_dump(item))
+            .returning(
+                models.Item.id,
+                models.Item.name,
+                models.Item.item_type_id,
+                models.Item.created_at,
+                type_coerce(models.Item.created_at, String).label("sort_key"),
+            )
+        ).one()
         db.commit()
     except IntegrityError:
         db.rollback()
         raise
-    db.refresh(db_item)
-    return db_item
+    catalog.invalidate()
+    return catalog.item_payload(
+        snapshot, catalog.CatalogItem._make(row), with_type=True
+    )
 
 
 # --------------------------------------------------------------------
-# GROCERIES
+# FAST READ PATH
 # --------------------------------------------------------------------
-def get_groceries(db: Session, skip: int = 0, limit: int = 50):
-    return (
-        db.query(models.Grocery)
-        .options(
-            selectinload(models.Grocery.grocery_items).selectinload(
-                models.GroceryItem.item
-            )
+# Response columns in schema field order, for the plain-dict list readers
+_GROCERY_COLUMNS = (
+    models.Grocery.family_id,
+    models.Grocery.grocery_date,
+    models.Grocery.id,
+    models.Grocery.created_at,
+)
+_LINE_COLUMNS = (
+    models.GroceryItem.item_id,
+    models.GroceryItem.quantity,
+    models.GroceryItem.purchased,
+    models.GroceryItem.id,
+    models.GroceryItem.grocery_id,
+    models.GroceryItem.created_at,
+)
+
+
+def _line_payloads(
+    db: Session, rows: Iterable[Mapping], expand: Set[str]
+) -> List[Dict]:
+    """Grocery line dicts from `_LINE_COLUMNS` rows, items nested per `expand`."""
+    if "item" not in expand:
+        return [{**row, "item": None} for row in rows]
+    snapshot = catalog.get(db)
+    with_type = "item.item_type" in expand
+    payloads = []
+    for row in rows:
+        item = snapshot.items_by_id.get(row["item_id"])
+        payloads.append(
+            {
+                **row,
+                "item": (
+                    catalog.item_payload(snapshot, item, with_type) if item else None
+                ),
+            }
         )
-        .offset(skip)
-        .limit(limit)
+    return payloads
+
+
+def _grocery_payloads(
+    db: Session, rows: Iterable[Mapping], resolved: Set[str]
+) -> List[Dict]:
+    """Grocery dicts from `_GROCERY_COLUMNS` rows, lines nested per `resolved`."""
+    groceries = [{**row, "grocery_items": []} for row in rows]
+    if groceries and "grocery_items" in resolved:
+        by_id = {grocery["id"]: grocery for grocery in groceries}
+        lines = db.execute(
+            select(*_LINE_COLUMNS)
+            .where(models.GroceryItem.grocery_id.in_(by_id))
+            .order_by(models.GroceryItem.grocery_id, models.GroceryItem.id)
+        ).mappings()
+        nested = {path[len("grocery_items.") :] for path in resolved}
+        for line in _line_payloads(db, lines, nested):
+            by_id[line["grocery_id"]]["grocery_items"].append(line)
+    return groceries
+
+
+def _insert_lines(db: Session, rows: List[Dict], columns: tuple) -> List[Mapping]:
+    """Multi-row INSERT of grocery lines, RETURNING `columns` (which must include
+    the id) in `rows` order.
+
+    SQLite hands out rowids in VALUES order, so sorting by id restores the
+    parameter order; `sort_by_parameter_order` would instead cost one INSERT
+    per row here, as SQLite offers no insert sentinel to sort on.
+    """
+    returned = (
+        db.execute(
+            insert(models.GroceryItem).returning(*columns),
+            rows,
+        )
+        .mappings()
         .all()
     )
+    return sorted(returned, key=lambda row: row["id"])
+
+
+def _begin_write(db: Session) -> None:
+    """Start the write transaction before reading what the write will replace.
+
+    pysqlite only sends BEGIN ahead of the first INSERT/UPDATE/DELETE, so a
+    SELECT issued first runs outside the transaction, and another writer can
+    commit between it and the write. An UPDATE that matches no row still takes
+    SQLite's write lock, held until commit or rollback: rows read after it stay
+    as read until this transaction ends.
+    """
+    db.execute(
+        update(models.FamilySummary)
+        .where(false())
+        .values(groceries=models.FamilySummary.groceries)
+        .execution_options(synchronize_session=False)
+    )
 
 
-def get_grocery_by_id(db: Session, grocery_id: int):
+def _update_if_changed(
+    db: Session,
+    model: Union[Type[models.Grocery], Type[models.GroceryItem]],
+    row_id: int,
+    values: Dict,
+    columns: tuple,
+) -> Optional[Mapping]:
+    """UPDATE one row where `values` differ from what it holds, RETURNING `columns`.
+
+    Returns None when the row is missing or already holds those values, so a
+    no-op write leaves the row's version (and its ETags) alone.
+    """
+    if not values:
+        return None
     return (
-        db.query(models.Grocery)
-        .options(
-            selectinload(models.Grocery.grocery_items).selectinload(
-                models.GroceryItem.item
+        db.execute(
+            update(model)
+            .where(
+                model.id == row_id,
+                or_(
+                    *(
+                        getattr(model, key).is_distinct_from(value)
+                        for key, value in values.items()
+                    )
+                ),
+            )
+            .values(**values)
+            .returning(*columns)
+            .execution_options(synchronize_session=False)
+        )
+        .mappings()
+        .first()
+    )
+
+
+# --------------------------------------------------------------------
+# GROCERIES
+# --------------------------------------------------------------------
+_GROCERIES = cast(Table, models.Grocery.__table__)
+
+
+def _grocery_conditions(
+    filters: Optional[schemas.GroceryFilters],
+) -> List[ColumnElement[bool]]:
+    """WHERE clauses on `groceries` for household and date-range filters."""
+    if filters is None:
+        return []
+    columns = _GROCERIES.c
+    conditions: List[ColumnElement[bool]] = []
+    if filters.family_id is not None:
+        conditions.append(columns.family_id == filters.family_id)
+    if filters.date_from is not None:
+        conditions.append(columns.grocery_date >= filters.date_from)
+    if filters.date_to is not None:
+        conditions.append(columns.grocery_date <= filters.date_to)
+    return conditions
+
+
+def _touch_groceries(
+    db: Session, grocery_ids: Collection[int]
+) -> Dict[int, Tuple[int, date]]:
+    """Bump the version of lists whose lines changed, in the caller's transaction.
+
+    Returns each touched list's `(family_id, grocery_date)`, which the summary
+    update needs, so line writes never look their list up separately.
+    """
+    if not grocery_ids:
+        return {}
+    touched: Result[Any] = db.execute(
+        update(models.Grocery)
+        .where(models.Grocery.id.in_(grocery_ids))
+        .values(
+            version=next_version(models.Grocery.__tablename__), updated_at=func.now()
+        )
+        .returning(
+            models.Grocery.id, models.Grocery.family_id, models.Grocery.grocery_date
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return {grocery_id: (family_id, day) for grocery_id, family_id, day in touched}
+
+
+def _groceries_where(filters: Optional[schemas.GroceryFilters]) -> list:
+    conditions = _grocery_conditions(filters)
+    if filters is not None and filters.purchased is not None:
+        # Lists holding at least one line in the requested state
+        conditions.append(
+            exists().where(
+                models.GroceryItem.grocery_id == models.Grocery.id,
+                models.GroceryItem.purchased == filters.purchased,
             )
         )
+    return conditions
+
+
+def _groceries_query(db: Session, filters: Optional[schemas.GroceryFilters]):
+    return db.query(models.Grocery).filter(*_groceries_where(filters))
+
+
+def get_groceries(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    expand: Expand = None,
+    filters: Optional[schemas.GroceryFilters] = None,
+) -> Page:
+    page = paginate(
+        _groceries_query(db, filters).options(*load_options("grocery-detail", expand)),
+        models.Grocery.grocery_date,
+        models.Grocery.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    trim_unloaded(page.items, "grocery-detail", expand)
+    return page
+
+
+def get_grocery_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    expand: Expand = None,
+    filters: Optional[schemas.GroceryFilters] = None,
+) -> Page:
+    """`get_groceries` as plain dicts, ready for a JSON encoder.
+
+    Reads only the response columns with Core, so no ORM objects, identity map
+    or response-model validation are involved; nested items come from the
+    catalog snapshot. Keys follow `schemas.Grocery`'s field order.
+    """
+    resolved = resolve_expand("grocery-detail", expand)
+    page = paginate_rows(
+        db,
+        select(*_GROCERY_COLUMNS).where(*_groceries_where(filters)),
+        models.Grocery.grocery_date,
+        models.Grocery.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    return page._replace(items=_grocery_payloads(db, page.items, resolved))
+
+
+def groceries_validator(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    filters: Optional[schemas.GroceryFilters] = None,
+) -> Tuple:
+    """Cheap validator for the page `get_groceries` returns with these arguments."""
+    return page_validator(
+        _groceries_query(db, filters),
+        models.Grocery.grocery_date,
+        models.Grocery.id,
+        models.Grocery.version,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+def grocery_version(db: Session, grocery_id: int) -> Optional[int]:
+    """Current version of one list (covering its lines); None if it is gone."""
+    return db.execute(
+        select(models.Grocery.version).where(models.Grocery.id == grocery_id)
+    ).scalar()
+
+
+def get_grocery_by_id(db: Session, grocery_id: int, expand: Expand = None):
+    result = (
+        db.query(models.Grocery)
+        .options(*load_options("grocery-detail", expand))
         .filter(models.Grocery.id == grocery_id)
         .first()
     )
+    return trim_unloaded(result, "grocery-detail", expand)
+
+
+def _account_new_grocery(db: Session, row: Mapping, lines: List[Mapping]) -> None:
+    """Summaries, co-occurrence and change log for a list just written with
+    its lines, in the caller's transaction."""
+    delta = summaries.SummaryDelta()
+    delta.add_grocery(row["family_id"], row["grocery_date"], lines)
+    summaries.apply(db, delta)
+    pairs = cooccurrence.PairDelta()
+    pairs.change((), [line["item_id"] for line in lines])
+    cooccurrence.apply(db, pairs)
+    changes.record(
+        db,
+        [(changes.GROCERY, "created", row["id"], row["id"])]
+        + [(changes.GROCERY_ITEM, "created", line["id"], row["id"]) for line in lines],
+    )
 
 
 def create_grocery(db: Session, grocery: schemas.GroceryCreate):
-    db_grocery = models.Grocery(
-        family_id=grocery.family_id,
-        grocery_date=grocery.grocery_date,
-    )
-    if grocery.grocery_items:
-        db_grocery.grocery_items = [
-            models.GroceryItem(
-                item_id=item.item_id,
-                quantity=item.quantity,
-                purchased=item.purchased,
-            )
-            for item in grocery.grocery_items
-        ]
-    db.add(db_grocery)
+    """Insert a list and its lines with two RETURNING statements and no reload.
+
+    Item references are enforced by the grocery_items foreign key, so an
+    unknown item raises IntegrityError instead of costing a lookup up front.
+    """
     try:
+        row = (
+            db.execute(
+                insert(models.Grocery)
+                .values(family_id=grocery.family_id, grocery_date=grocery.grocery_date)
+                .returning(*_GROCERY_COLUMNS)
+            )
+            .mappings()
+            .one()
+        )
+        lines: list = []
+        if grocery.grocery_items:
+            lines = _insert_lines(
+                db,
+                [
+                    {"grocery_id": row["id"], **_model_dump(item)}
+                    for item in grocery.grocery_items
+                ],
+                _LINE_COLUMNS,
+            )
+        _account_new_grocery(db, row, lines)
         db.commit()
     except IntegrityError:
         db.rollback()
         raise
+    nested = resolve_expand("grocery-line", None)
+    return {**row, "grocery_items": _line_payloads(db, lines, nested)}
 
-    db.refresh(db_grocery)
-    grocery_id_int = cast(int, db_grocery.id)
-    return get_grocery_by_id(db, grocery_id_int)
 
+def _clone_grocery(
+    db: Session,
+    grocery_id: int,
+    grocery_date: date,
+    family_id: Optional[int] = None,
+    reset_purchased: bool = True,
+) -> Optional[Tuple[Mapping, List[Mapping]]]:
+    """Copy a list and its lines in the caller's transaction; None if there is
+    no such list.
 
-def update_grocery(db: Session, grocery_id: int, grocery: schemas.GroceryUpdate):
-    db_grocery = (
-        db.query(models.Grocery).filter(models.Grocery.id == grocery_id).first()
+    Set-based: one INSERT ... SELECT RETURNING per table, so the lines go from
+    row to row inside the database without being read, validated or turned
+    into objects. Item references were checked when the source was written.
+    """
+    source = models.Grocery
+    row = (
+        db.execute(
+            insert(models.Grocery)
+            .from_select(
+                ["family_id", "grocery_date"],
+                select(
+                    source.family_id if family_id is None else literal(family_id),
+                    literal(grocery_date),
+                ).where(source.id == grocery_id),
+            )
+            .returning(*_GROCERY_COLUMNS)
+        )
+        .mappings()
+        .first()
     )
-    if not db_grocery:
+    if row is None:
         return None
+    source_line = models.GroceryItem
+    lines: List[Mapping] = sorted(
+        db.execute(
+            insert(models.GroceryItem)
+            .from_select(
+                ["grocery_id", "item_id", "quantity", "purchased"],
+                select(
+                    literal(row["id"]),
+                    source_line.item_id,
+                    source_line.quantity,
+                    literal(False) if reset_purchased else source_line.purchased,
+                )
+                .where(source_line.grocery_id == grocery_id)
+                .order_by(source_line.id),
+            )
+            .returning(*_LINE_COLUMNS)
+        )
+        .mappings()
+        .all(),
+        key=lambda line: line["id"],
+    )
+    _account_new_grocery(db, row, lines)
+    return row, lines
 
+
+def clone_grocery(
+    db: Session, grocery_id: int, clone: schemas.GroceryClone
+) -> Optional[Dict]:
+    """Copy a list to another date (and optionally household) server-side,
+    lines unchecked unless `reset_purchased` is off; None if it does not exist."""
+    try:
+        cloned = _clone_grocery(
+            db, grocery_id, clone.grocery_date, clone.family_id, clone.reset_purchased
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    if cloned is None:
+        return None
+    row, lines = cloned
+    nested = resolve_expand("grocery-line", None)
+    return {**row, "grocery_items": _line_payloads(db, lines, nested)}
+
+
+def update_grocery(db: Session, grocery_id: int, grocery: schemas.GroceryUpdate):
     update_data = _model_dump(
         grocery,
         exclude_unset=True,
         exclude={"grocery_items"},
     )
-    for key, value in update_data.items():
-        setattr(db_grocery, key, value)
-    db.commit()
-    db.refresh(db_grocery)
-    grocery_id_int = cast(int, db_grocery.id)
-    return get_grocery_by_id(db, grocery_id_int)
+    # Moving a list to another family or week moves its share of the summaries
+    moving = update_data.keys() & {"family_id", "grocery_date"}
+    try:
+        before = None
+        if moving:
+            _begin_write(db)
+            before = summaries.contribution(db, grocery_id)
+        row = _update_if_changed(
+            db, models.Grocery, grocery_id, update_data, _GROCERY_COLUMNS
+        )
+        if row is not None:
+            if before is not None:
+                delta = summaries.SummaryDelta()
+                delta.add_grocery(*before, sign=-1)
+                delta.add_grocery(row["family_id"], row["grocery_date"], before.lines)
+                summaries.apply(db, delta)
+            changes.record(db, [(changes.GROCERY, "updated", grocery_id, grocery_id)])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    if row is None:
+        row = (
+            db.execute(select(*_GROCERY_COLUMNS).where(models.Grocery.id == grocery_id))
+            .mappings()
+            .first()
+        )
+        if row is None:
+            return None
+    resolved = resolve_expand("grocery-detail", None)
+    return _grocery_payloads(db, [row], resolved)[0]
 
 
-def delete_grocery(db: Session, grocery_id: int):
-    db_grocery = (
-        db.query(models.Grocery).filter(models.Grocery.id == grocery_id).first()
-    )
-    if db_grocery:
-        db.delete(db_grocery)
-        db.commit()
-    return db_grocery
+def delete_grocery(db: Session, grocery_id: int) -> Optional[int]:
+    """Delete a list in one statement; its lines go through ON DELETE CASCADE.
+
+    Only the list's deletion is logged; it implies its lines. Its lines are read
+    first, inside the write transaction, so their share of the family summaries
+    and of the item co-occurrence can be taken back out.
+    """
+    _begin_write(db)
+    before = summaries.contribution(db, grocery_id)
+    if before is None:
+        db.rollback()
+        return None
+    deleted_id = db.execute(
+        delete(models.Grocery)
+        .where(models.Grocery.id == grocery_id)
+        .returning(models.Grocery.id)
+    ).scalar()
+    if deleted_id is not None:
+        delta = summaries.SummaryDelta()
+        delta.add_grocery(*before, sign=-1)
+        summaries.apply(db, delta)
+        pairs = cooccurrence.PairDelta()
+        pairs.change([line["item_id"] for line in before.lines], ())
+        cooccurrence.apply(db, pairs)
+        changes.record(db, [(changes.GROCERY, "deleted", grocery_id, grocery_id)])
+    db.commit()
+    return deleted_id
 
 
 # --------------------------------------------------------------------
 # GROCERY ITEMS
 # --------------------------------------------------------------------
-def get_grocery_items(db: Session, skip: int = 0, limit: int = 50):
-    return (
+def _grocery_items_where(
+    filters: Optional[schemas.GroceryFilters],
+) -> List[ColumnElement[bool]]:
+    conditions: List[ColumnElement[bool]] = []
+    grocery_conditions = _grocery_conditions(filters)
+    if grocery_conditions:
+        conditions.append(
+            models.GroceryItem.grocery_id.in_(
+                select(models.Grocery.id).where(*grocery_conditions)
+            )
+        )
+    if filters is not None and filters.purchased is not None:
+        conditions.append(models.GroceryItem.purchased == filters.purchased)
+    return conditions
+
+
+def _grocery_items_query(db: Session, filters: Optional[schemas.GroceryFilters]):
+    return db.query(models.GroceryItem).filter(*_grocery_items_where(filters))
+
+
+def get_grocery_items(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    expand: Expand = None,
+    filters: Optional[schemas.GroceryFilters] = None,
+) -> Page:
+    page = paginate(
+        _grocery_items_query(db, filters).options(
+            *load_options("grocery-line", expand)
+        ),
+        models.GroceryItem.created_at,
+        models.GroceryItem.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    trim_unloaded(page.items, "grocery-line", expand)
+    return page
+
+
+def get_grocery_item_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    expand: Expand = None,
+    filters: Optional[schemas.GroceryFilters] = None,
+) -> Page:
+    """`get_grocery_items` as plain dicts; see `get_grocery_rows`."""
+    page = paginate_rows(
+        db,
+        select(*_LINE_COLUMNS).where(*_grocery_items_where(filters)),
+        models.GroceryItem.created_at,
+        models.GroceryItem.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    expand = resolve_expand("grocery-line", expand)
+    return page._replace(items=_line_payloads(db, page.items, expand))
+
+
+def grocery_items_validator(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    filters: Optional[schemas.GroceryFilters] = None,
+) -> Tuple:
+    """Cheap validator for the page `get_grocery_items` returns."""
+    return page_validator(
+        _grocery_items_query(db, filters),
+        models.GroceryItem.created_at,
+        models.GroceryItem.id,
+        models.GroceryItem.version,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+def get_grocery_item_by_id(db: Session, grocery_item_id: int, expand: Expand = None):
+    result = (
         db.query(models.GroceryItem)
-        .options(selectinload(models.GroceryItem.item))
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .options(*load_options("grocery-line", expand))
+        .filter(models.GroceryItem.id == grocery_item_id)
+        .first()
     )
+    return trim_unloaded(result, "grocery-line", expand)
 
 
 def get_grocery_items_by_grocery(
-    db: Session, grocery_id: int, skip: int = 0, limit: int = 50
+    db: Session,
+    grocery_id: int,
+    skip: int = 0,
+    limit: int = 50,
+    expand: Expand = None,
 ):
-    return (
+    result = (
         db.query(models.GroceryItem)
-        .options(selectinload(models.GroceryItem.item))
+        .options(*load_options("grocery-line", expand))
         .filter(models.GroceryItem.grocery_id == grocery_id)
         .offset(skip)
         .limit(limit)
         .all()
     )
+    return trim_unloaded(result, "grocery-line", expand)
 
 
-def create_grocery_item(db: Session, grocery_id: int, item: schemas.GroceryItemCreate):
-    grocery_exists = (
-        db.query(models.Grocery).filter(models.Grocery.id == grocery_id).first()
-    )
-    if not grocery_exists:
-        raise ValueError("Invalid grocery or item reference.")
+def _line_payload(db: Session, row: Mapping) -> Dict:
+    """A written line as the single-line endpoints return it."""
+    return _line_payloads(db, [row], resolve_expand("grocery-line", None))[0]
 
-    item_exists = db.query(models.Item).filter(models.Item.id == item.item_id).first()
-    if not item_exists:
-        raise ValueError("Invalid grocery or item reference.")
 
-    db_item = models.GroceryItem(
-        grocery_id=grocery_id,
-        item_id=item.item_id,
-        quantity=item.quantity,
-        purchased=item.purchased,
-    )
-    db.add(db_item)
+def create_grocery_item(db: Session, grocery_id: int, item: schemas.GroceryItemCreate):
+    """Insert a line and bump its list; both references are checked by foreign keys."""
     try:
+        row = (
+            db.execute(
+                insert(models.GroceryItem)
+                .values(grocery_id=grocery_id, **_model_dump(item))
+                .returning(*_LINE_COLUMNS)
+            )
+            .mappings()
+            .one()
+        )
+        family_id, grocery_date = _touch_groceries(db, [grocery_id])[grocery_id]
+        delta = summaries.SummaryDelta()
+        delta.add_lines(family_id, grocery_date, [row])
+        summaries.apply(db, delta)
+        cooccurrence.apply_line_changes(db, {grocery_id: [row["item_id"]]}, {})
+        changes.record(db, [(changes.GROCERY_ITEM, "created", row["id"], grocery_id)])
         db.commit()
     except IntegrityError:
         db.rollback()
         raise
-    db.refresh(db_item)
-    return db_item
+    return _line_payload(db, row)
 
 
 def update_grocery_item(
     db: Session, grocery_item_id: int, item: schemas.GroceryItemUpdate
 ):
-    db_item = (
-        db.query(models.GroceryItem)
-        .filter(models.GroceryItem.id == grocery_item_id)
+    try:
+        # The line as it was: its summary share is swapped for the new one, and
+        # it is the response when the write changes nothing
+        _begin_write(db)
+        before = (
+            db.execute(
+                select(*_LINE_COLUMNS).where(models.GroceryItem.id == grocery_item_id)
+            )
+            .mappings()
+            .first()
+        )
+        if before is None:
+            db.rollback()
+            return None
+        row = _update_if_changed(
+            db,
+            models.GroceryItem,
+            grocery_item_id,
+            _model_dump(item, exclude_unset=True),
+            _LINE_COLUMNS,
+        )
+        if row is not None:
+            touched = _touch_groceries(db, [row["grocery_id"]])
+            family_id, grocery_date = touched[row["grocery_id"]]
+            delta = summaries.SummaryDelta()
+            delta.add_lines(family_id, grocery_date, [before], sign=-1)
+            delta.add_lines(family_id, grocery_date, [row])
+            summaries.apply(db, delta)
+            cooccurrence.apply_line_changes(
+                db,
+                {row["grocery_id"]: [row["item_id"]]},
+                {row["grocery_id"]: [before["item_id"]]},
+            )
+            changes.record(
+                db,
+                [(changes.GROCERY_ITEM, "updated", row["id"], row["grocery_id"])],
+            )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    return _line_payload(db, before if row is None else row)
+
+
+def delete_grocery_item(db: Session, grocery_item_id: int) -> Optional[int]:
+    row = (
+        db.execute(
+            delete(models.GroceryItem)
+            .where(models.GroceryItem.id == grocery_item_id)
+            .returning(*_LINE_COLUMNS)
+        )
+        .mappings()
         .first()
     )
-    if not db_item:
+    if row is None:
         return None
-    for key, value in _model_dump(item, exclude_unset=True).items():
-        setattr(db_item, key, value)
+    grocery_id = row["grocery_id"]
+    family_id, grocery_date = _touch_groceries(db, [grocery_id])[grocery_id]
+    delta = summaries.SummaryDelta()
+    delta.add_lines(family_id, grocery_date, [row], sign=-1)
+    summaries.apply(db, delta)
+    cooccurrence.apply_line_changes(db, {}, {grocery_id: [row["item_id"]]})
+    changes.record(db, [(changes.GROCERY_ITEM, "deleted", grocery_item_id, grocery_id)])
+    db.commit()
+    return grocery_id
+
+
+def apply_grocery_item_batch(
+    db: Session,
+    batch: schemas.GroceryItemBatchPatch,
+    grocery_id: Optional[int] = None,
+) -> Optional[List[Dict]]:
+    """Apply many line creates, updates and deletes in one transaction.
+
+    Line lookups run as one IN query and items resolve from the catalog
+    snapshot, then each kind of change goes out as
+    a single (executemany) statement and the whole batch commits once. Lines
+    that fail validation are reported per line instead of aborting the batch.
+    With `grocery_id`, creates target that list and updates/deletes may only
+    touch its lines; returns None when that grocery does not exist.
+    """
+    creates = getattr(batch, "create", [])
+    if grocery_id is not None:
+        grocery_exists: Optional[Row[Any]] = db.execute(
+            select(models.Grocery.id).where(models.Grocery.id == grocery_id)
+        ).first()
+        if not grocery_exists:
+            return None
+
+    line_ids = {line.id for line in batch.update} | set(batch.delete)
+    # Current state of the lines touched, for ownership and the summary deltas
+    old_lines: Dict[int, Mapping] = {}
+    if line_ids:
+        _begin_write(db)
+        lines_query: Select[int, int, bool, int, int, datetime] = select(
+            *_LINE_COLUMNS
+        ).where(models.GroceryItem.id.in_(line_ids))
+        if grocery_id is not None:
+            lines_query = lines_query.where(models.GroceryItem.grocery_id == grocery_id)
+        old_lines = {line["id"]: line for line in db.execute(lines_query).mappings()}
+    known_lines = {line_id: line["grocery_id"] for line_id, line in old_lines.items()}
+
+    item_ids = {line.item_id for line in creates} | {
+        line.item_id for line in batch.update if line.item_id is not None
+    }
+    known_items = item_ids & catalog.get(db).items_by_id.keys()
+
+    results: List[Dict] = []
+    claimed: Set[int] = set()
+
+    def check_line(op: str, index: int, line_id: int, item_id=None) -> bool:
+        result = {"op": op, "index": index, "id": line_id}
+        if line_id not in known_lines:
+            results.append({**result, "status": "not_found"})
+        elif line_id in claimed:
+            detail = "Line appears more than once in the batch."
+            results.append({**result, "status": "invalid", "detail": detail})
+        elif item_id is not None and item_id not in known_items:
+            detail = f"Unknown item id={item_id}"
+            results.append({**result, "status": "invalid", "detail": detail})
+        else:
+            claimed.add(line_id)
+            return True
+        return False
+
+    update_rows = []
+    update_results = []
+    for index, line in enumerate(batch.update):
+        if check_line("update", index, line.id, line.item_id):
+            values = _model_dump(line, exclude_unset=True)
+            if len(values) > 1:
+                update_rows.append(values)
+            update_results.append(
+                {"op": "update", "index": index, "id": line.id, "status": "updated"}
+            )
+
+    delete_ids = []
+    delete_results = []
+    for index, line_id in enumerate(batch.delete):
+        if check_line("delete", index, line_id):
+            delete_ids.append(line_id)
+            delete_results.append(
+                {"op": "delete", "index": index, "id": line_id, "status": "deleted"}
+            )
+
+    create_rows = []
+    create_results = []
+    for index, line in enumerate(creates):
+        if line.item_id not in known_items:
+            detail = f"Unknown item id={line.item_id}"
+            results.append(
+                {"op": "create", "index": index, "status": "invalid", "detail": detail}
+            )
+            continue
+        create_rows.append({"grocery_id": grocery_id, **_model_dump(line)})
+        create_results.append({"op": "create", "index": index, "status": "created"})
+
+    touched = {known_lines[row["id"]] for row in update_rows}
+    touched |= {known_lines[line_id] for line_id in delete_ids}
+    if create_rows:
+        touched.add(cast(int, grocery_id))
+
     try:
+        if update_rows:
+            db.execute(update(models.GroceryItem), update_rows)
+        if delete_ids:
+            db.execute(
+                delete(models.GroceryItem).where(models.GroceryItem.id.in_(delete_ids))
+            )
+        if create_rows:
+            created = _insert_lines(db, create_rows, (models.GroceryItem.id,))
+            for result, created_row in zip(create_results, created):
+                result["id"] = created_row["id"]
+        families = _touch_groceries(db, touched)
+        delta = summaries.SummaryDelta()
+        added: Dict[int, List[int]] = defaultdict(list)
+        removed: Dict[int, List[int]] = defaultdict(list)
+        for row in update_rows:
+            old = old_lines[row["id"]]
+            new = {**old, **row}
+            delta.add_lines(*families[old["grocery_id"]], [old], sign=-1)
+            delta.add_lines(*families[old["grocery_id"]], [new])
+            removed[old["grocery_id"]].append(old["item_id"])
+            added[old["grocery_id"]].append(new["item_id"])
+        for line_id in delete_ids:
+            old = old_lines[line_id]
+            delta.add_lines(*families[old["grocery_id"]], [old], sign=-1)
+            removed[old["grocery_id"]].append(old["item_id"])
+        if create_rows:
+            delta.add_lines(*families[cast(int, grocery_id)], create_rows)
+            added[cast(int, grocery_id)].extend(row["item_id"] for row in create_rows)
+        summaries.apply(db, delta)
+        cooccurrence.apply_line_changes(db, added, removed)
+        changes.record(
+            db,
+            [
+                (changes.GROCERY_ITEM, "created", result["id"], grocery_id)
+                for result in create_results
+            ]
+            + [
+                (changes.GROCERY_ITEM, "updated", row["id"], known_lines[row["id"]])
+                for row in update_rows
+            ]
+            + [
+                (changes.GROCERY_ITEM, "deleted", line_id, known_lines[line_id])
+                for line_id in delete_ids
+            ],
+        )
         db.commit()
     except IntegrityError:
         db.rollback()
         raise
-    db.refresh(db_item)
-    return db_item
 
+    changed = create_results + update_results
+    if changed:
+        lines = db.execute(
+            select(*_LINE_COLUMNS).where(
+                models.GroceryItem.id.in_([result["id"] for result in changed])
+            )
+        ).mappings()
+        nested = resolve_expand("grocery-line", None)
+        by_id = {line["id"]: line for line in _line_payloads(db, lines, nested)}
+        for result in changed:
+            result["grocery_item"] = by_id.get(result["id"])
 
-def delete_grocery_item(db: Session, grocery_item_id: int):
-    db_item = (
-        db.query(models.GroceryItem)
-        .filter(models.GroceryItem.id == grocery_item_id)
+    results.extend(changed + delete_results)
+    order = {"create": 0, "update": 1, "delete": 2}
+    results.sort(key=lambda result: (order[result["op"]], result["index"]))
+    return results
+
+
+# --------------------------------------------------------------------
+# FAMILY SUMMARIES
+# --------------------------------------------------------------------
+def get_family_summary(
+    db: Session, family_id: int, weeks: int = 12, top: int = 10
+) -> Optional[Dict]:
+    """Reporting totals for one household, read from the maintained summaries."""
+    return summaries.get_summary(db, family_id, weeks=weeks, top=top)
+
+
+# --------------------------------------------------------------------
+# SUGGESTIONS
+# --------------------------------------------------------------------
+def get_grocery_suggestions(
+    db: Session, grocery_id: int, limit: int = 10
+) -> Optional[List[Dict]]:
+    """Items frequently bought with a list's items, read from the maintained
+    co-occurrence matrix; None if the list does not exist."""
+    return cooccurrence.suggest(db, grocery_id, limit=limit)
+
+
+# --------------------------------------------------------------------
+# RECURRING LISTS
+# --------------------------------------------------------------------
+_RECURRENCES = cast(Table, models.GroceryRecurrence.__table__)
+_RECURRENCE_COLUMNS = (
+    _RECURRENCES.c.grocery_id,
+    _RECURRENCES.c.every_days,
+    _RECURRENCES.c.next_date,
+    _RECURRENCES.c.reset_purchased,
+)
+
+
+def get_grocery_recurrence(db: Session, grocery_id: int) -> Optional[Mapping]:
+    return (
+        db.execute(
+            select(*_RECURRENCE_COLUMNS).where(_RECURRENCES.c.grocery_id == grocery_id)
+        )
+        .mappings()
         .first()
     )
-    if db_item:
-        db.delete(db_item)
+
+
+def set_grocery_recurrence(
+    db: Session, grocery_id: int, recurrence: schemas.GroceryRecurrenceSet
+) -> Optional[Mapping]:
+    """Make a list a template cloned on a schedule, or change its schedule;
+    None if the list does not exist."""
+    values = _model_dump(recurrence)
+    try:
+        row = (
+            db.execute(
+                update(_RECURRENCES)
+                .where(_RECURRENCES.c.grocery_id == grocery_id)
+                .values(**values)
+                .returning(*_RECURRENCE_COLUMNS)
+            )
+            .mappings()
+            .first()
+        )
+        if row is None:
+            # Inserted only if the list exists, which the SELECT checks
+            row = (
+                db.execute(
+                    insert(_RECURRENCES)
+                    .from_select(
+                        ["grocery_id", *values],
+                        select(
+                            models.Grocery.id,
+                            *(literal(value) for value in values.values()),
+                        ).where(models.Grocery.id == grocery_id),
+                    )
+                    .returning(*_RECURRENCE_COLUMNS)
+                )
+                .mappings()
+                .first()
+            )
         db.commit()
-    return db_item
+    except IntegrityError:
+        db.rollback()
+        raise
+    return row
+
+
+def delete_grocery_recurrence(db: Session, grocery_id: int) -> bool:
+    deleted: Optional[Row[Any]] = db.execute(
+        delete(_RECURRENCES)
+        .where(_RECURRENCES.c.grocery_id == grocery_id)
+        .returning(_RECURRENCES.c.grocery_id)
+    ).first()
+    db.commit()
+    return deleted is not None
+
+
+def run_due_recurrences(db: Session, today: Optional[date] = None) -> List[int]:
+    """Clone every template due by `today`; returns the new lists' ids.
+
+    A due template gets one list, dated its latest occurrence not after
+    `today` (occurrences missed while nothing ran are skipped), and its
+    `next_date` moves to the occurrence after that. Each template is claimed by
+    a conditional UPDATE in the transaction that clones it, so workers running
+    this at the same time never clone the same occurrence twice.
+    """
+    today = today or date.today()
+    due: Result[int, int, date, bool] = db.execute(
+        select(*_RECURRENCE_COLUMNS)
+        .where(_RECURRENCES.c.next_date <= today)
+        .order_by(_RECURRENCES.c.next_date, _RECURRENCES.c.grocery_id)
+    )
+    created = []
+    for grocery_id, every_days, next_date, reset_purchased in due.all():
+        periods = (today - next_date).days // every_days
+        occurrence = next_date + timedelta(days=periods * every_days)
+        try:
+            claimed: Optional[Row[Any]] = db.execute(
+                update(_RECURRENCES)
+                .where(
+                    _RECURRENCES.c.grocery_id == grocery_id,
+                    _RECURRENCES.c.next_date == next_date,
+                )
+                .values(next_date=occurrence + timedelta(days=every_days))
+                .returning(_RECURRENCES.c.grocery_id)
+            ).first()
+            cloned = None
+            if claimed is not None:
+                cloned = _clone_grocery(
+                    db, grocery_id, occurrence, reset_purchased=reset_purchased
+                )
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise
+        if cloned is not None:
+            created.append(cloned[0]["id"])
+    return created
+
+
+# --------------------------------------------------------------------
+# EXPORT
+# --------------------------------------------------------------------
+_LINES = cast(Table, models.GroceryItem.__table__)
+EXPORT_COLUMNS = (
+    "grocery_id",
+    "family_id",
+    "grocery_date",
+    "grocery_item_id",
+    "item_id",
+    "quantity",
+    "purchased",
+)
+ExportRow = Row[int, int, date, Optional[int], Optional[int], Optional[int], bool]
+
+
+def iter_grocery_export(
+    db: Session,
+    filters: Optional[schemas.GroceryFilters] = None,
+    batch_size: int = 1000,
+) -> Iterator[Sequence[ExportRow]]:
+    """Groceries and their lines as one flat, ordered join, in batches.
+
+    Rows come off a server-side cursor `batch_size` at a time, in list order
+    (`grocery_date, id`, then line id); a list without lines yields one row
+    with the line columns empty. Memory is bounded by the batch, not the
+    history.
+    """
+    rows: Result[int, int, date, Optional[int], Optional[int], Optional[int], bool] = (
+        db.execute(
+            select(
+                _GROCERIES.c.id,
+                _GROCERIES.c.family_id,
+                _GROCERIES.c.grocery_date,
+                _LINES.c.id,
+                _LINES.c.item_id,
+                _LINES.c.quantity,
+                _LINES.c.purchased,
+            )
+            .select_from(_GROCERIES.outerjoin(_LINES))
+            .where(*_grocery_conditions(filters))
+            .order_by(_GROCERIES.c.grocery_date, _GROCERIES.c.id, _LINES.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+    )
+    yield from rows.partitions()
+
+
+# --------------------------------------------------------------------
+# IMPORT
+# --------------------------------------------------------------------
+def import_groceries(db: Session, groceries: Sequence[schemas.GroceryCreate]) -> int:
+    """Write validated lists and their lines in one transaction; returns the
+    number of lines written.
+
+    Whatever the number of lists: one multi-row INSERT ... RETURNING for the
+    lists, one executemany for all of their lines, one read of the new lines'
+    ids, the summary and co-occurrence upserts and the change log, which gets
+    the same `created` events as `create_grocery`: each list, then its lines.
+    """
+    if not groceries:
+        return 0
+    try:
+        created: List[Mapping] = sorted(
+            db.execute(
+                insert(models.Grocery).returning(*_GROCERY_COLUMNS),
+                [
+                    {"family_id": g.family_id, "grocery_date": g.grocery_date}
+                    for g in groceries
+                ],
+            )
+            .mappings()
+            .all(),
+            key=lambda row: row["id"],
+        )
+        delta = summaries.SummaryDelta()
+        pairs = cooccurrence.PairDelta()
+        line_rows = []
+        for row, grocery in zip(created, groceries):
+            lines = [
+                {"grocery_id": row["id"], **_model_dump(item)}
+                for item in grocery.grocery_items
+            ]
+            delta.add_grocery(row["family_id"], row["grocery_date"], lines)
+            pairs.change((), [line["item_id"] for line in lines])
+            line_rows.extend(lines)
+        line_ids: Dict[int, List[int]] = {row["id"]: [] for row in created}
+        if line_rows:
+            db.execute(insert(models.GroceryItem), line_rows)
+            # The executemany returns no ids; the lists are new, so their lines
+            # are exactly the rows just inserted
+            new_lines: Result[int, int] = db.execute(
+                select(models.GroceryItem.grocery_id, models.GroceryItem.id)
+                .where(models.GroceryItem.grocery_id.in_(line_ids))
+                .order_by(models.GroceryItem.id)
+            )
+            for grocery_id, line_id in new_lines:
+                line_ids[grocery_id].append(line_id)
+        summaries.apply(db, delta)
+        cooccurrence.apply(db, pairs)
+        events = []
+        for grocery_id, ids in line_ids.items():
+            events.append((changes.GROCERY, "created", grocery_id, grocery_id))
+            events.extend(
+                (changes.GROCERY_ITEM, "created", line_id, grocery_id)
+                for line_id in ids
+            )
+        changes.record(db, events)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    return len(line_rows)
@@ -0,0 +1,63 @@
+"""Awaitable versions of the `crud` functions.
+
+The query logic lives once, in `crud`. With an `AsyncSession` it runs through
+`run_sync`, so every statement goes over the async driver without leaving the
+event loop; with a plain `Session` it is pushed to the threadpool, which is
+what sync routes did before.
+"""
+
+from functools import wraps
+from typing import Any, Callable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from grocery_api import crud
+from grocery_api.database import DbSession
+
+
+async def run(db: DbSession, fn: Callable[..., Any], *args: Any, **kwargs: Any):
+    """Await `fn(session, *args, **kwargs)` for either session flavour."""
+    if not isinstance(db, Session):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def _awaitable(fn: Callable[..., Any]):
+    @wraps(fn)
+    async def wrapper(db: DbSession, *args: Any, **kwargs: Any):
+        return await run(db, fn, *args, **kwargs)
+
+    return wrapper
+
+
+catalog_stamp = _awaitable(crud.catalog_stamp)
+get_item_types = _awaitable(crud.get_item_types)
+create_item_type = _awaitable(crud.create_item_type)
+get_items = _awaitable(crud.get_items)
+search_items = _awaitable(crud.search_items)
+create_item = _awaitable(crud.create_item)
+get_groceries = _awaitable(crud.get_groceries)
+get_grocery_rows = _awaitable(crud.get_grocery_rows)
+groceries_validator = _awaitable(crud.groceries_validator)
+grocery_version = _awaitable(crud.grocery_version)
+get_grocery_by_id = _awaitable(crud.get_grocery_by_id)
+create_grocery = _awaitable(crud.create_grocery)
+update_grocery = _awaitable(crud.update_grocery)
+delete_grocery = _awaitable(crud.delete_grocery)
+clone_grocery = _awaitable(crud.clone_grocery)
+get_grocery_items = _awaitable(crud.get_grocery_items)
+get_grocery_item_rows = _awaitable(crud.get_grocery_item_rows)
+grocery_items_validator = _awaitable(crud.grocery_items_validator)
+get_grocery_item_by_id = _awaitable(crud.get_grocery_item_by_id)
+get_grocery_items_by_grocery = _awaitable(crud.get_grocery_items_by_grocery)
+create_grocery_item = _awaitable(crud.create_grocery_item)
+update_grocery_item = _awaitable(crud.update_grocery_item)
+delete_grocery_item = _awaitable(crud.delete_grocery_item)
+apply_grocery_item_batch = _awaitable(crud.apply_grocery_item_batch)
+get_family_summary = _awaitable(crud.get_family_summary)
+get_grocery_suggestions = _awaitable(crud.get_grocery_suggestions)
+get_grocery_recurrence = _awaitable(crud.get_grocery_recurrence)
+set_grocery_recurrence = _awaitable(crud.set_grocery_recurrence)
+delete_grocery_recurrence = _awaitable(crud.delete_grocery_recurrence)
+import_groceries = _awaitable(crud.import_groceries)
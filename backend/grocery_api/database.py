@@ -1,8 +1,17 @@
+import logging
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+logger = logging.getLogger(__name__)
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -10,7 +19,77 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 DB_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATA_DIR}/grocery.db")
 connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
 
-engine = create_engine(DB_URL, connect_args=connect_args, pool_pre_ping=True)
+# An async driver in DATABASE_URL (e.g. sqlite+aiosqlite://) switches requests
+# onto the event loop. Startup work keeps a sync engine on the same database.
+_url = make_url(DB_URL)
+ASYNC_MODE = _url.get_dialect().is_async
+SYNC_DB_URL = _url.set(drivername=_url.get_backend_name()) if ASYNC_MODE else _url
+IS_SQLITE = _url.get_backend_name() == "sqlite"
+IS_MEMORY_DB = IS_SQLITE and _url.database in (None, "", ":memory:")
+
+# --------------------------------------------------------------------
+# SQLITE TUNING
+# --------------------------------------------------------------------
+# PRAGMAs applied to every new connection, chosen with SQLITE_PROFILE.
+# "none" leaves SQLite's tuning defaults untouched (rollback journal, full sync).
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "none": {},
+    "production": {
+        "journal_mode": "WAL",  # readers no longer block on a writer
+        "synchronous": "NORMAL",  # fsync at checkpoints only; safe under WAL
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,  # ms to wait for the write lock before failing
+        "cache_size": -65536,  # negative = KiB, i.e. 64 MiB page cache
+        "mmap_size": 268435456,  # 256 MiB of the file read via mmap
+        "temp_store": "MEMORY",
+    },
+}
+# Applied whatever the profile: the write path leaves reference checks and
+# ON DELETE CASCADE to SQLite instead of looking rows up first.
+SQLITE_REQUIRED_PRAGMAS: Dict[str, Any] = {"foreign_keys": "ON"}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+if SQLITE_PROFILE not in SQLITE_PROFILES:
+    raise ValueError(
+        f"Unknown SQLITE_PROFILE={SQLITE_PROFILE!r}; "
+        f"expected one of {', '.join(SQLITE_PROFILES)}"
+    )
+
+# Values SQLite reports back as integers
+_PRAGMA_CODES = {
+    "synchronous": {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3},
+    "temp_store": {"DEFAULT": 0, "FILE": 1, "MEMORY": 2},
+    "foreign_keys": {"OFF": 0, "ON": 1},
+}
+
+
+def _profile_pragmas() -> Dict[str, Any]:
+    return {**SQLITE_PROFILES[SQLITE_PROFILE], **SQLITE_REQUIRED_PRAGMAS}
+
+
+def _apply_sqlite_profile(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in _profile_pragmas().items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+def _engine_kwargs() -> Dict[str, Any]:
+    if not IS_SQLITE:
+        return {"pool_pre_ping": True}
+    if IS_MEMORY_DB:
+        # One shared connection, otherwise every checkout sees an empty database
+        return {"poolclass": StaticPool}
+    # Connections to a local file never go stale, so skip the pre-ping SELECT,
+    # and keep enough of them open to serve the whole request threadpool.
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "30")),
+    }
+
+
+engine = create_engine(SYNC_DB_URL, connect_args=connect_args, **_engine_kwargs())
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -18,4 +97,58 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+async_engine: Optional["AsyncEngine"] = None
+AsyncSessionLocal: Optional[Any] = None
+if ASYNC_MODE:
+    # Imported lazily: the asyncio extension needs greenlet + an async driver.
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        _url, connect_args=connect_args, **_engine_kwargs()
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        autoflush=False,
+        bind=async_engine,
+    )
+
+# Engine carrying API traffic in either mode; attach event hooks here.
+request_engine: Engine = async_engine.sync_engine if async_engine else engine
+
+if IS_SQLITE:
+    for _engine in {engine, request_engine}:
+        event.listen(_engine, "connect", _apply_sqlite_profile)
+
+
+def sqlite_settings(bind: Optional[Engine] = None) -> Dict[str, Any]:
+    """Read back the PRAGMAs in effect on a pooled connection."""
+    pragmas = set(SQLITE_PROFILES["production"]) | set(_profile_pragmas())
+    with (bind or engine).connect() as conn:
+        return {
+            pragma: conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            for pragma in sorted(pragmas)
+        }
+
+
+def log_sqlite_settings(bind: Optional[Engine] = None) -> Dict[str, Any]:
+    """Log the effective SQLite settings and warn where the profile did not stick."""
+    if not IS_SQLITE:
+        return {}
+    settings = sqlite_settings(bind)
+    logger.info(
+        "SQLite profile %r in effect: %s",
+        SQLITE_PROFILE,
+        ", ".join(f"{key}={value}" for key, value in settings.items()),
+    )
+    for pragma, requested in _profile_pragmas().items():
+        expected = _PRAGMA_CODES.get(pragma, {}).get(str(requested).upper(), requested)
+        actual = settings[pragma]
+        if str(actual).lower() != str(expected).lower():
+            logger.warning(
+                "SQLite PRAGMA %s requested %s but is %s", pragma, requested, actual
+            )
+    return settings
+
+
+DbSession = Union[Session, "AsyncSession"]
+
 Base = declarative_base()
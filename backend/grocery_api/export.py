@@ -0,0 +1,109 @@
+"""Streamed grocery history export as NDJSON or CSV.
+
+Both formats come from `crud.iter_grocery_export`: one ordered join of lists
+and lines read off a server-side cursor, encoded a batch at a time into one
+chunk of bytes each. Nothing accumulates but the batch and, for NDJSON, the
+lines of the list being written, so memory stays flat however long the
+history is. The generator opens its own session: it runs after the endpoint
+has returned, in the threadpool, one batch per step.
+"""
+
+import csv
+import io
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import orjson
+
+from . import catalog, crud, database, schemas
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+BATCH_SIZE = 2000
+
+# CSV columns: the flat join plus the item's name from the catalog
+CSV_COLUMNS = (
+    "grocery_id",
+    "family_id",
+    "grocery_date",
+    "grocery_item_id",
+    "item_id",
+    "item_name",
+    "quantity",
+    "purchased",
+)
+
+
+def _csv_chunks(
+    batches: Iterator[Sequence[crud.ExportRow]], snapshot: catalog.CatalogSnapshot
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    items = snapshot.items_by_id
+    for batch in batches:
+        for grocery_id, family_id, day, line_id, item_id, quantity, bought in batch:
+            item = items.get(item_id) if item_id is not None else None
+            writer.writerow(
+                (
+                    grocery_id,
+                    family_id,
+                    day.isoformat(),
+                    line_id,
+                    item_id,
+                    item.name if item else "",
+                    quantity,
+                    "" if line_id is None else ("true" if bought else "false"),
+                )
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _ndjson_chunks(
+    batches: Iterator[Sequence[crud.ExportRow]], snapshot: catalog.CatalogSnapshot
+) -> Iterator[bytes]:
+    """One list per line, its lines nested as `POST /groceries` takes them."""
+    items = snapshot.items_by_id
+    grocery: Optional[Dict[str, Any]] = None
+    for batch in batches:
+        encoded: List[bytes] = []
+        for grocery_id, family_id, day, line_id, item_id, quantity, bought in batch:
+            if grocery is None or grocery["id"] != grocery_id:
+                if grocery is not None:
+                    encoded.append(orjson.dumps(grocery))
+                grocery = {
+                    "id": grocery_id,
+                    "family_id": family_id,
+                    "grocery_date": day,
+                    "grocery_items": [],
+                }
+            if line_id is not None:
+                item = items.get(item_id) if item_id is not None else None
+                grocery["grocery_items"].append(
+                    {
+                        "id": line_id,
+                        "item_id": item_id,
+                        "item_name": item.name if item else None,
+                        "quantity": quantity,
+                        "purchased": bought,
+                    }
+                )
+        if encoded:
+            yield b"\n".join(encoded) + b"\n"
+    if grocery is not None:
+        yield orjson.dumps(grocery) + b"\n"
+
+
+def stream(
+    filters: Optional[schemas.GroceryFilters],
+    fmt: str,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Encoded export chunks for `fmt` ("ndjson" or "csv")."""
+    encode = _csv_chunks if fmt == "csv" else _ndjson_chunks
+    with database.SessionLocal() as db:
+        snapshot = catalog.get(db)
+        yield from encode(crud.iter_grocery_export(db, filters, batch_size), snapshot)
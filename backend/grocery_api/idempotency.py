@@ -0,0 +1,342 @@
+"""Idempotency-Key support for POST requests: retries replay the first outcome.
+
+A client that may retry a create sends `Idempotency-Key: <unique string>`.
+The first request with a key claims it with one INSERT into
+`idempotency_keys`, runs as usual, and has its response stored there. Any
+later request with that key replays the stored response
+(`Idempotent-Replayed: true`) without reaching the route, provided it is the
+same request: same path and query string, and a body with the same SHA-256
+(hashed as it streams in, so bulk imports are never buffered). A key reused
+for a different request gets 422.
+
+Duplicates that arrive while the first request is still running wait for it:
+in the same worker on an event, from other workers by polling the row, for up
+to `IDEMPOTENCY_WAIT` seconds before answering 409. Responses of 500 and above
+are not stored (the claim is released so a retry can run again), nor are
+responses larger than `MAX_STORED_BODY`.
+
+Keys live in SQLite, so they survive restarts and every worker shares them.
+They expire after `IDEMPOTENCY_TTL` seconds, at most `IDEMPOTENCY_MAX_KEYS`
+are kept (oldest dropped first), and both bounds are enforced at startup and
+every `PRUNE_EVERY` claims. A claim whose request never finished (its worker
+died) is taken over after `IDEMPOTENCY_PENDING_TIMEOUT` seconds.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Callable, Dict, NamedTuple, Optional, cast
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Table, delete, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import database, models
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+PENDING_TIMEOUT = float(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT", "600"))
+POLL_INTERVAL = 0.05
+PRUNE_EVERY = 1000
+MAX_KEY_LENGTH = 255
+MAX_STORED_BODY = 1 << 20
+
+_KEYS = cast(Table, models.IdempotencyKey.__table__)
+
+
+class Stored(NamedTuple):
+    request: str
+    body_hash: Optional[str]
+    status: Optional[int]  # None while the first request is running
+    content_type: Optional[str]
+    body: Optional[bytes]
+    stored_at: float
+
+
+# --------------------------------------------------------------------
+# STORE
+# --------------------------------------------------------------------
+def lookup(db: Session, key: str) -> Optional[Stored]:
+    row: Optional[Row] = db.execute(
+        select(
+            _KEYS.c.request,
+            _KEYS.c.body_hash,
+            _KEYS.c.status,
+            _KEYS.c.content_type,
+            _KEYS.c.body,
+            _KEYS.c.stored_at,
+        ).where(_KEYS.c.key == key)
+    ).first()
+    return Stored(*row) if row is not None else None
+
+
+def claim(
+    db: Session, key: str, request: str, now: float, ttl: float = TTL
+) -> Optional[Stored]:
+    """Claim `key` for `request`; None if this caller now owns it, otherwise
+    what is stored under it (finished or still running)."""
+    try:
+        db.execute(insert(_KEYS).values(key=key, request=request, stored_at=now))
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+    stored = lookup(db, key)
+    if stored is None:  # pruned in between
+        return claim(db, key, request, now, ttl)
+    expired = stored.stored_at < now - ttl
+    abandoned = stored.status is None and stored.stored_at < now - PENDING_TIMEOUT
+    if not (expired or abandoned):
+        return stored
+    # Take it over, unless another request just did
+    taken: Optional[Row] = db.execute(
+        update(_KEYS)
+        .where(_KEYS.c.key == key, _KEYS.c.stored_at == stored.stored_at)
+        .values(
+            request=request,
+            body_hash=None,
+            status=None,
+            content_type=None,
+            body=None,
+            stored_at=now,
+        )
+        .returning(_KEYS.c.key)
+    ).first()
+    db.commit()
+    return None if taken is not None else claim(db, key, request, now, ttl)
+
+
+def complete(
+    db: Session,
+    key: str,
+    body_hash: str,
+    status: int,
+    content_type: Optional[str],
+    body: bytes,
+    now: float,
+) -> None:
+    db.execute(
+        update(_KEYS)
+        .where(_KEYS.c.key == key)
+        .values(
+            body_hash=body_hash,
+            status=status,
+            content_type=content_type,
+            body=body,
+            stored_at=now,
+        )
+    )
+    db.commit()
+
+
+def release(db: Session, key: str) -> None:
+    db.execute(delete(_KEYS).where(_KEYS.c.key == key, _KEYS.c.status.is_(None)))
+    db.commit()
+
+
+def prune(
+    db: Session,
+    now: Optional[float] = None,
+    ttl: float = TTL,
+    max_keys: int = MAX_KEYS,
+) -> int:
+    """Drop expired keys, then the oldest beyond `max_keys`; returns how many
+    were deleted."""
+    now = time.time() if now is None else now
+    deleted = len(
+        db.execute(
+            delete(_KEYS).where(_KEYS.c.stored_at < now - ttl).returning(_KEYS.c.key)
+        ).all()
+    )
+    newest_dropped = db.execute(
+        select(_KEYS.c.stored_at)
+        .order_by(_KEYS.c.stored_at.desc())
+        .offset(max_keys)
+        .limit(1)
+    ).scalar()
+    if newest_dropped is not None:
+        deleted += len(
+            db.execute(
+                delete(_KEYS)
+                .where(_KEYS.c.stored_at <= newest_dropped)
+                .returning(_KEYS.c.key)
+            ).all()
+        )
+    db.commit()
+    return deleted
+
+
+async def _with_session(fn, *args):
+    def call():
+        with database.SessionLocal() as db:
+            return fn(db, *args)
+
+    return await run_in_threadpool(call)
+
+
+# --------------------------------------------------------------------
+# MIDDLEWARE
+# --------------------------------------------------------------------
+class IdempotencyMiddleware:
+    """Plain ASGI; requests without the header pass straight through."""
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+        # Keys whose claim or first request is in flight in this worker
+        self._running: Dict[str, asyncio.Event] = {}
+        self._claims = 0
+
+    async def __call__(self, scope, receive, send) -> None:
+        key = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            for name, value in scope["headers"]:
+                if name == HEADER:
+                    key = value.decode("latin-1").strip()
+                    break
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            detail = f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters."
+            await _send_json(send, 400, detail)
+            return
+
+        request = f"POST {scope['path']}?{scope['query_string'].decode('latin-1')}"
+        deadline = time.monotonic() + WAIT
+        while True:
+            running = self._running.get(key)
+            if running is not None:
+                # Coalesced in this worker: wait for the first request to finish
+                try:
+                    await asyncio.wait_for(
+                        running.wait(), max(0.0, deadline - time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    await _send_in_progress(send)
+                    return
+                continue
+            event = self._running[key] = asyncio.Event()
+            try:
+                stored = await _with_session(claim, key, request, time.time())
+                if stored is None:
+                    await self._run_first(key, scope, receive, send)
+                    return
+            finally:
+                del self._running[key]
+                event.set()
+            if stored.status is not None:
+                await _replay(stored, request, receive, send)
+                return
+            # Running in another worker
+            if time.monotonic() >= deadline:
+                await _send_in_progress(send)
+                return
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _run_first(self, key: str, scope, receive, send) -> None:
+        self._claims += 1
+        if self._claims % PRUNE_EVERY == 0:
+            await _with_session(prune)
+
+        hasher = hashlib.sha256()
+        body_read = False
+        status = 500
+        content_type: Optional[str] = None
+        chunks = []
+        size = 0
+        sent = False
+
+        async def hashing_receive():
+            nonlocal body_read
+            message = await receive()
+            if message["type"] == "http.request":
+                hasher.update(message.get("body", b""))
+                body_read = not message.get("more_body", False)
+            return message
+
+        async def capturing_send(message) -> None:
+            nonlocal status, content_type, size, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= MAX_STORED_BODY:
+                    chunks.append(body)
+                sent = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, hashing_receive, capturing_send)
+        except BaseException:
+            await asyncio.shield(_with_session(release, key))
+            raise
+        if status < 500 and body_read and sent and size <= MAX_STORED_BODY:
+            await _with_session(
+                complete,
+                key,
+                hasher.hexdigest(),
+                status,
+                content_type,
+                b"".join(chunks),
+                time.time(),
+            )
+        else:
+            await _with_session(release, key)
+
+
+async def _replay(stored: Stored, request: str, receive, send) -> None:
+    hasher = hashlib.sha256()
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return  # client went away
+        hasher.update(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    if stored.request != request or stored.body_hash != hasher.hexdigest():
+        detail = "Idempotency-Key was already used for a different request."
+        await _send_json(send, 422, detail)
+        return
+    body = stored.body or b""
+    headers = [
+        (b"content-length", str(len(body)).encode()),
+        (REPLAYED_HEADER.lower().encode(), b"true"),
+    ]
+    if stored.content_type:
+        headers.append((b"content-type", stored.content_type.encode("latin-1")))
+    await send(
+        {"type": "http.response.start", "status": stored.status, "headers": headers}
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_in_progress(send) -> None:
+    detail = "A request with this Idempotency-Key is still being processed."
+    await _send_json(send, 409, detail, [(b"retry-after", b"1")])
+
+
+async def _send_json(send, status: int, detail: str, headers=()) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
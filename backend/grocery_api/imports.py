@@ -0,0 +1,164 @@
+"""Streamed bulk import of grocery lists from NDJSON.
+
+Each line of the body is one list shaped like `POST /groceries` takes it; a
+line may name an item (`"item_name"`) instead of giving its `item_id`, and
+extra keys are ignored, so an NDJSON export imports back as is. The body is
+read as it arrives and split on newlines, so only the current chunk of lists
+is ever held. Lists are validated against `schemas.GroceryCreate` with item
+references checked against the catalog snapshot, then written `chunk_size`
+at a time by `crud.import_groceries`, each chunk in its own transaction.
+
+A line that fails validation is rejected alone; a chunk the database refuses
+is rolled back and all of its lines are rejected. Everything else stays
+committed, and the summary says which line numbers were rejected and why.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from . import catalog, crud_async, schemas
+from .database import DbSession
+
+CHUNK_SIZE = 500
+MAX_LINE_BYTES = 1 << 20
+MAX_ERRORS = 1000
+
+
+class LineRejected(ValueError):
+    """A line that cannot be imported; the message is its reported detail."""
+
+
+async def _lines(
+    body: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """(line number, content) for each line of `body`, blank ones included.
+
+    The content of a line longer than MAX_LINE_BYTES is dropped as it arrives
+    and comes out as None, so one runaway line cannot exhaust memory.
+    """
+    buffer = bytearray()
+    number = 0
+    oversized = False
+    async for chunk in body:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            number += 1
+            yield number, None if oversized else bytes(buffer[start:end])
+            oversized = False
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > MAX_LINE_BYTES:
+            oversized = True
+            buffer.clear()
+    if buffer or oversized:
+        yield number + 1, None if oversized else bytes(buffer)
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def parse_line(
+    raw: Optional[bytes], snapshot: catalog.CatalogSnapshot
+) -> schemas.GroceryCreate:
+    """One NDJSON line as a validated list whose items all exist."""
+    if raw is None:
+        raise LineRejected(f"line longer than {MAX_LINE_BYTES} bytes")
+    try:
+        data: Any = orjson.loads(raw)
+    except orjson.JSONDecodeError as exc:
+        raise LineRejected(f"invalid JSON: {exc}") from None
+    if not isinstance(data, dict):
+        raise LineRejected("expected a JSON object")
+    lines = data.get("grocery_items")
+    if isinstance(lines, list):
+        for index, line in enumerate(lines):
+            if not isinstance(line, dict) or line.get("item_id") is not None:
+                continue
+            name = line.get("item_name")
+            if not isinstance(name, str):
+                continue  # left for validation to report the missing item_id
+            item = snapshot.items_by_name.get(name)
+            if item is None:
+                raise LineRejected(f"grocery_items.{index}: unknown item {name!r}")
+            line["item_id"] = item.id
+    try:
+        grocery = schemas.GroceryCreate.model_validate(data)
+    except ValidationError as exc:
+        raise LineRejected(_validation_detail(exc)) from None
+    for index, line in enumerate(grocery.grocery_items):
+        if line.item_id not in snapshot.items_by_id:
+            raise LineRejected(
+                f"grocery_items.{index}.item_id: unknown item {line.item_id}"
+            )
+    return grocery
+
+
+class _Import:
+    def __init__(self, db: DbSession) -> None:
+        self.db = db
+        self.accepted = self.rejected = self.grocery_items = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.pending: List[Tuple[int, schemas.GroceryCreate]] = []
+
+    def reject(self, line: int, detail: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "detail": detail})
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        chunk, self.pending = self.pending, []
+        try:
+            self.grocery_items += await crud_async.import_groceries(
+                self.db, [grocery for _, grocery in chunk]
+            )
+        except IntegrityError as exc:
+            detail = f"chunk rejected by the database: {exc.orig}"
+            for line, _ in chunk:
+                self.reject(line, detail)
+        else:
+            self.accepted += len(chunk)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "grocery_items": self.grocery_items,
+            "errors": self.errors,
+        }
+
+
+async def import_groceries(
+    db: DbSession, body: AsyncIterator[bytes], chunk_size: int = CHUNK_SIZE
+) -> Dict[str, Any]:
+    """Import an NDJSON body; returns a `schemas.GroceryImportResult` dict."""
+    state = _Import(db)
+    snapshot: Optional[catalog.CatalogSnapshot] = None
+    async for number, raw in _lines(body):
+        if raw is not None and not raw.strip():
+            continue
+        if snapshot is None:
+            # Taken again after every chunk, to see items created meanwhile
+            snapshot = await crud_async.run(db, catalog.get)
+        try:
+            state.pending.append((number, parse_line(raw, snapshot)))
+        except LineRejected as exc:
+            state.reject(number, str(exc))
+            continue
+        if len(state.pending) >= chunk_size:
+            await state.flush()
+            snapshot = None
+    await state.flush()
+    return state.result()
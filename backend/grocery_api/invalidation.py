@@ -0,0 +1,84 @@
+import itertools
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from . import database
+
+# Cross-process invalidation stamps: one small file per channel beside the
+# SQLite database (in DATA_DIR for other databases), shared by every worker on
+# the host. Writers replace the file after committing; readers compare its
+# (inode, mtime) with what they cached, which costs one stat() call and no
+# database round trip. In-memory databases are single-process, so a local
+# counter is enough there.
+#
+# A freed inode can be reused by the next bump, and mtimes only move once per
+# filesystem clock tick, so two bumps in quick succession could leave the same
+# (inode, mtime). Each bump therefore writes a random token that is part of the
+# stamp, read from the file while the stamp is younger than RACY_WINDOW_NS. A
+# token read after that cannot be overtaken by a colliding bump (its mtime
+# would be newer), so it is remembered and the check goes back to one stat().
+Stamp = Tuple[int, int, int]
+RACY_WINDOW_NS = 2_000_000_000
+
+_local_counter = itertools.count(1)
+_local_stamps: Dict[str, Stamp] = {}
+_seen: Dict[Path, Stamp] = {}
+_lock = threading.Lock()
+
+
+def _stamp_dir() -> Optional[Path]:
+    if database.IS_MEMORY_DB:
+        return None
+    if not database.IS_SQLITE:
+        return database.DATA_DIR
+    return Path(str(database.SYNC_DB_URL.database)).resolve().parent
+
+
+def _stamp_path(channel: str) -> Optional[Path]:
+    directory = _stamp_dir()
+    if directory is None:
+        return None
+    db_name = Path(str(database.SYNC_DB_URL.database)).name
+    return directory / f".{db_name}.{channel}.stamp"
+
+
+def current(channel: str) -> Stamp:
+    """Return the channel's current stamp; (0, 0, 0) if it was never bumped."""
+    path = _stamp_path(channel)
+    if path is None:
+        return _local_stamps.get(channel, (0, 0, 0))
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (0, 0, 0)
+    seen = _seen.get(path)
+    if seen is not None and seen[:2] == (stat.st_ino, stat.st_mtime_ns):
+        return seen
+    settled = time.time_ns() - stat.st_mtime_ns >= RACY_WINDOW_NS
+    try:
+        token = int(path.read_text() or 0)
+    except (FileNotFoundError, ValueError):
+        return (stat.st_ino, stat.st_mtime_ns, -1)  # replaced or foreign; reread
+    stamp = (stat.st_ino, stat.st_mtime_ns, token)
+    if settled:
+        _seen[path] = stamp
+    return stamp
+
+
+def bump(channel: str) -> Stamp:
+    """Signal every process that data behind `channel` changed."""
+    path = _stamp_path(channel)
+    with _lock:
+        if path is None:
+            _local_stamps[channel] = (0, 0, next(_local_counter))
+            return _local_stamps[channel]
+        # Write-then-rename gives a fresh inode, so the stamp changes even when
+        # two bumps land within the filesystem's mtime granularity.
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(str(random.getrandbits(62) + 1))
+        os.replace(tmp_path, path)
+    return current(channel)
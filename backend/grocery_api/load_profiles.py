@@ -0,0 +1,134 @@
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import models
+
+# Relationships each response schema reads. Anything a profile does not load is
+# blanked by `trim_unloaded` so serialization never lazy-loads row by row.
+SCHEMA_RELATIONSHIPS: Dict[type, tuple] = {
+    models.ItemType: (),
+    models.Item: ("item_type",),
+    models.GroceryItem: ("item",),
+    models.Grocery: ("grocery_items",),
+}
+
+
+class LoadProfile(NamedTuple):
+    model: type
+    default_expand: FrozenSet[str]
+    required: FrozenSet[str] = frozenset()
+
+
+# --------------------------------------------------------------------
+# PROFILES
+# --------------------------------------------------------------------
+LOAD_PROFILES: Dict[str, LoadProfile] = {
+    "catalog": LoadProfile(
+        model=models.Item,
+        default_expand=frozenset({"item_type"}),
+    ),
+    "grocery-detail": LoadProfile(
+        model=models.Grocery,
+        # Items keep embedding their type by default, as when the relationships
+        # were eager-loaded; `expand` lets clients ask for less.
+        default_expand=frozenset({"grocery_items.item.item_type"}),
+        required=frozenset({"grocery_items"}),
+    ),
+    "grocery-line": LoadProfile(
+        model=models.GroceryItem,
+        default_expand=frozenset({"item.item_type"}),
+    ),
+}
+
+
+def _related_model(model: type, relationship: str) -> type:
+    return getattr(model, relationship).property.mapper.class_
+
+
+def expandable_paths(model: type, prefix: str = "") -> Set[str]:
+    """Return every dotted relationship path reachable from `model`."""
+    paths: Set[str] = set()
+    for relationship in SCHEMA_RELATIONSHIPS[model]:
+        path = f"{prefix}{relationship}"
+        paths.add(path)
+        paths |= expandable_paths(_related_model(model, relationship), f"{path}.")
+    return paths
+
+
+def parse_expand(raw: Optional[str]) -> Optional[Set[str]]:
+    """Split a comma-separated `expand` query value; None keeps profile defaults."""
+    if raw is None:
+        return None
+    return {part.strip() for part in raw.split(",") if part.strip()}
+
+
+def resolve_expand(profile_name: str, expand: Optional[Iterable[str]]) -> Set[str]:
+    """Validate requested paths against the profile and add implied prefixes."""
+    profile = LOAD_PROFILES[profile_name]
+    requested = set(profile.default_expand if expand is None else expand)
+    unknown = requested - expandable_paths(profile.model)
+    if unknown:
+        raise ValueError(f"Unknown expand path(s): {', '.join(sorted(unknown))}")
+
+    resolved = set(profile.required)
+    for path in requested:
+        parts = path.split(".")
+        resolved |= {".".join(parts[: i + 1]) for i in range(len(parts))}
+    return resolved
+
+
+def _nested(expand: Set[str], relationship: str) -> Set[str]:
+    return {
+        path[len(relationship) + 1 :]
+        for path in expand
+        if path.startswith(f"{relationship}.")
+    }
+
+
+def _options_for(model: type, expand: Set[str]) -> List:
+    options = []
+    for relationship in SCHEMA_RELATIONSHIPS[model]:
+        if relationship not in expand:
+            continue
+        loader = selectinload(getattr(model, relationship))
+        sub_options = _options_for(
+            _related_model(model, relationship), _nested(expand, relationship)
+        )
+        if sub_options:
+            loader = loader.options(*sub_options)
+        options.append(loader)
+    return options
+
+
+def load_options(profile_name: str, expand: Optional[Iterable[str]] = None) -> List:
+    """Loader options for a named profile, optionally overriding its expansions."""
+    profile = LOAD_PROFILES[profile_name]
+    return _options_for(profile.model, resolve_expand(profile_name, expand))
+
+
+def _trim(objects: Iterable, expand: Set[str]) -> None:
+    for obj in objects:
+        state = inspect(obj)
+        for relationship in SCHEMA_RELATIONSHIPS[type(obj)]:
+            if relationship in expand:
+                value = getattr(obj, relationship)
+                related = value if isinstance(value, list) else [value]
+                _trim(
+                    (child for child in related if child is not None),
+                    _nested(expand, relationship),
+                )
+            elif relationship in state.unloaded:
+                uselist = state.mapper.relationships[relationship].uselist
+                set_committed_value(obj, relationship, [] if uselist else None)
+
+
+def trim_unloaded(result, profile_name: str, expand: Optional[Iterable[str]] = None):
+    """Blank relationships the profile did not load, in place; returns `result`."""
+    if result is None:
+        return result
+    objects = result if isinstance(result, list) else [result]
+    _trim(objects, resolve_expand(profile_name, expand))
+    return result
@@ -0,0 +1,301 @@
+"""Request and query metrics in the Prometheus text format.
+
+`MetricsMiddleware` is plain ASGI: it times each request from the first byte
+in to the last byte out, labels it with the matched route template (never the
+raw path, so ids do not multiply series) and records status, latency and the
+queries the request ran. Queries are counted by engine hooks into a
+`RequestStats` held in a context variable, which follows the request into the
+threadpool and into the async engine's greenlets.
+
+Everything is recorded on the event loop thread, so the registry needs no
+lock; `/metrics` renders it with `render()`. Queries run outside a request
+(startup, the change feed hub) are not counted.
+"""
+
+import bisect
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; from a cached catalog read up to a slow batch write
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+QUERY_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+# Route label for requests no route matched (404s, probes)
+UNMATCHED = "unmatched"
+
+Labels = Tuple[str, ...]
+# (sample name, label names, label values, value)
+Sample = Tuple[str, Labels, Labels, float]
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str]) -> None:
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        return [(self.name, self.labels, key, v) for key, v in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels, amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: Labels, value: float) -> None:
+        self.values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]
+    ) -> None:
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: a count per bucket (non-cumulative, +Inf last) and sum
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def samples(self) -> List[Sample]:
+        rows: List[Sample] = []
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                rows.append(
+                    (
+                        f"{self.name}_bucket",
+                        (*self.labels, "le"),
+                        (*key, _format_bound(bound)),
+                        cumulative,
+                    )
+                )
+            rows.append((f"{self.name}_sum", self.labels, key, total[0]))
+            rows.append((f"{self.name}_count", self.labels, key, cumulative))
+        return rows
+
+
+def _format_bound(bound: Any) -> str:
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def _format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f"{name}={orjson.dumps(value).decode()}" for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests served, by route and status.",
+    ("method", "route", "status"),
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served.", ("method",)
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the last response byte.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving one request.",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+QUERY_TIME = Histogram(
+    "db_query_seconds_per_request",
+    "Time spent in SQL statements while serving one request.",
+    ("method", "route"),
+    QUERY_TIME_BUCKETS,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests holding an admission slot, by class (read or write).",
+    ("class",),
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot, by class.",
+    ("class",),
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed with a 503, by class and reason (queue_full or timeout).",
+    ("class", "reason"),
+)
+REGISTRY: List[Any] = [
+    REQUESTS,
+    IN_FLIGHT,
+    LATENCY,
+    QUERIES,
+    QUERY_TIME,
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUED,
+    ADMISSION_REJECTED,
+]
+
+
+def render() -> bytes:
+    """The whole registry in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, label_names, label_values, value in metric.samples():
+            lines.append(f"{name}{_format_labels(label_names, label_values)} {value}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def reset() -> None:
+    for metric in REGISTRY:
+        metric.values.clear()
+
+
+# --------------------------------------------------------------------
+# QUERY ACCOUNTING
+# --------------------------------------------------------------------
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar(
+    "metrics_request_stats", default=None
+)
+_QUERY_STARTED = "metrics_query_started"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info[_QUERY_STARTED] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.pop(_QUERY_STARTED, None)
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+def untrack() -> None:
+    """Stop counting queries in the current context; for background tasks
+    started from inside a request, which would otherwise inherit its stats."""
+    _current.set(None)
+
+
+def instrument(engine: Engine) -> None:
+    """Count `engine`'s statements against the request that runs them."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --------------------------------------------------------------------
+# MIDDLEWARE
+# --------------------------------------------------------------------
+def _route_label(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED
+
+
+class MetricsMiddleware:
+    """Turns unhandled errors into a JSON 500 and, when `enabled`, records
+    every HTTP request."""
+
+    def __init__(self, app: Callable, enabled: bool = True) -> None:
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        response_started = False
+
+        async def send_wrapper(message) -> None:
+            nonlocal status, response_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_started = True
+            await send(message)
+
+        if not self.enabled:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception as exc:
+                if response_started:
+                    raise
+                await _send_error(send, exc)
+            return
+
+        method = scope["method"]
+        stats = RequestStats()
+        token = _current.set(stats)
+        IN_FLIGHT.inc((method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_started:
+                raise
+            status = 500
+            await _send_error(send, exc)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            IN_FLIGHT.dec((method,))
+            route = _route_label(scope)
+            REQUESTS.inc((method, route, str(status)))
+            LATENCY.observe((method, route), elapsed)
+            QUERIES.observe((method, route), stats.queries)
+            QUERY_TIME.observe((method, route), stats.query_seconds)
+
+
+async def _send_error(send: Callable, exc: Exception) -> None:
+    body = orjson.dumps({"error": str(exc), "detail": "Internal Server Error"})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 500,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,45 @@
+import functools
+import hashlib
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Dialect, Engine
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from . import models
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Create missing tables, then any columns and indexes added to tables that
+    already exist.
+
+    `create_all` skips existing tables entirely, so databases created before a
+    column or index was declared would otherwise never get it. Added columns
+    must be nullable or carry a server default, as ALTER TABLE requires.
+    """
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        preparer = conn.dialect.identifier_preparer
+        for table in models.Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"
+                )
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+@functools.lru_cache(maxsize=None)
+def schema_fingerprint(dialect: Dialect) -> str:
+    """Digest of the DDL the models compile to; changes with any table, column
+    or index, so a stored copy tells whether `ensure_schema` has work to do."""
+    digest = hashlib.sha256()
+    for table in models.Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: str(index.name)):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()
@@ -1,16 +1,21 @@
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     Date,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     func,
 )
 from sqlalchemy.orm import relationship
 
 from .database import Base
+from .versions import next_version
 
 
 class ItemType(Base):
@@ -19,7 +24,7 @@ class ItemType(Base):
     name = Column(String, unique=True, nullable=False, index=True)
     created_at = Column(DateTime, nullable=False, default=func.now())
 
-    items = relationship("Item", back_populates="item_type", lazy="selectin")
+    items = relationship("Item", back_populates="item_type")
 
 
 class Item(Base):
@@ -29,8 +34,11 @@ class Item(Base):
     item_type_id = Column(Integer, ForeignKey("item_types.id"), nullable=False)
     created_at = Column(DateTime, nullable=False, default=func.now())
 
-    item_type = relationship("ItemType", back_populates="items", lazy="selectin")
-    grocery_items = relationship("GroceryItem", back_populates="item", lazy="selectin")
+    item_type = relationship("ItemType", back_populates="items")
+    grocery_items = relationship("GroceryItem", back_populates="item")
+
+    # Keyset pagination order for /items
+    __table_args__ = (Index("ix_items_created_at_id", "created_at", "id"),)
 
 
 class Grocery(Base):
@@ -41,14 +49,33 @@ class Grocery(Base):
     )  # Assuming family_id refers to a family entity, family table can be added later (default to 1 for now)
     grocery_date = Column(Date, nullable=False)
     created_at = Column(DateTime, nullable=False, default=func.now())
+    # Bumped on every write to the list or any of its lines; feeds ETags
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    version = Column(
+        BigInteger,
+        nullable=False,
+        default=next_version("groceries"),
+        onupdate=next_version("groceries"),
+        server_default="0",
+    )
 
     grocery_items = relationship(
         "GroceryItem",
         back_populates="grocery",
-        lazy="selectin",
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # Keyset pagination order for /groceries, also serves date-range filters
+        Index("ix_groceries_grocery_date_id", "grocery_date", "id"),
+        # Per-household listing in the same order
+        Index(
+            "ix_groceries_family_id_grocery_date_id", "family_id", "grocery_date", "id"
+        ),
+        # max(version) for the next version is one index seek
+        Index("ix_groceries_version", "version"),
+    )
+
 
 class GroceryItem(Base):
     __tablename__ = "grocery_items"
@@ -57,11 +84,136 @@ class GroceryItem(Base):
         Integer,
         ForeignKey("groceries.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
-    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=False, index=True)
     quantity = Column(Integer, default=1)
     purchased = Column(Boolean, default=False)
     created_at = Column(DateTime, nullable=False, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    version = Column(
+        BigInteger,
+        nullable=False,
+        default=next_version("grocery_items"),
+        onupdate=next_version("grocery_items"),
+        server_default="0",
+    )
+
+    grocery = relationship("Grocery", back_populates="grocery_items")
+    item = relationship("Item", back_populates="grocery_items")
+
+    __table_args__ = (
+        # Keyset pagination order for /grocery_items
+        Index("ix_grocery_items_created_at_id", "created_at", "id"),
+        # Purchased-state filter in the same order
+        Index(
+            "ix_grocery_items_purchased_created_at_id", "purchased", "created_at", "id"
+        ),
+        Index("ix_grocery_items_version", "version"),
+    )
+
+
+class GroceryRecurrence(Base):
+    """A list used as a template: cloned every `every_days` days, the next time
+    on `next_date` (see `grocery_api/recurrences.py`)."""
+
+    __tablename__ = "grocery_recurrences"
+    grocery_id = Column(
+        Integer, ForeignKey("groceries.id", ondelete="CASCADE"), primary_key=True
+    )
+    every_days = Column(Integer, nullable=False, default=7)
+    next_date = Column(Date, nullable=False)
+    reset_purchased = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+
+    # Due schedules are one range of this index
+    __table_args__ = (Index("ix_grocery_recurrences_next_date", "next_date"),)
+
+
+class Change(Base):
+    """Row-level change log feeding /changes/stream; one row per created,
+    updated or deleted grocery or grocery line, written in the same transaction.
+    """
+
+    __tablename__ = "changes"
+    # Doubles as the SSE event id. AUTOINCREMENT keeps ids from ever being
+    # reused, and SQLite's single writer hands them out in commit order.
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)  # "grocery" or "grocery_item"
+    op = Column(String, nullable=False)  # "created", "updated" or "deleted"
+    entity_id = Column(Integer, nullable=False)
+    grocery_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class FamilySummary(Base):
+    """Running shopping totals per household and week, adjusted by every crud
+    write in its own transaction (see `grocery_api/summaries.py`)."""
+
+    __tablename__ = "family_summaries"
+    family_id = Column(Integer, primary_key=True)
+    week = Column(Date, primary_key=True)  # Monday of the lists' grocery_date
+    groceries = Column(Integer, nullable=False, default=0)
+    lines = Column(Integer, nullable=False, default=0)
+    purchased_lines = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    purchased_quantity = Column(Integer, nullable=False, default=0)
+
+
+class FamilyItemSummary(Base):
+    """How often each household puts each item on its lists."""
+
+    __tablename__ = "family_item_summaries"
+    family_id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    lines = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Top items per family without sorting the family's whole item set
+        Index("ix_family_item_summaries_family_id_lines", "family_id", "lines"),
+    )
+
+
+class ItemPair(Base):
+    """How many lists hold both items: a sparse, symmetric item-by-item
+    co-occurrence matrix, each pair stored in both orders. The diagonal
+    (item_id == other_item_id) counts the lists holding the item at all."""
+
+    __tablename__ = "item_pairs"
+    item_id = Column(Integer, primary_key=True)
+    other_item_id = Column(Integer, primary_key=True)
+    lists = Column(Integer, nullable=False, default=0)
+
+    # Rows live in the primary key itself on SQLite, so an item's row of the
+    # matrix is one range scan with no lookups back into the table
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class IdempotencyKey(Base):
+    """The outcome of a POST sent with an Idempotency-Key, replayed to retries
+    of the same request (see `grocery_api/idempotency.py`)."""
+
+    __tablename__ = "idempotency_keys"
+    key = Column(String, primary_key=True)
+    request = Column(String, nullable=False)  # method, path and query string
+    # Set with the response; until then the first request is still running
+    body_hash = Column(String)
+    status = Column(Integer)
+    content_type = Column(String)
+    body = Column(LargeBinary)
+    stored_at = Column(Float, nullable=False)  # epoch seconds, claim then response
+
+    # Expiry and the size bound both drop the oldest keys first
+    __table_args__ = (Index("ix_idempotency_keys_stored_at", "stored_at"),)
+
+
+class SchemaMarker(Base):
+    """What startup last brought this database up to: one row per marker
+    (schema and seed fingerprints), checked by `grocery_api/startup.py`."""
 
-    grocery = relationship("Grocery", back_populates="grocery_items", lazy="selectin")
-    item = relationship("Item", back_populates="grocery_items", lazy="selectin")
+    __tablename__ = "schema_markers"
+    name = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
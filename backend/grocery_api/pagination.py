@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+from bisect import bisect_right
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple, Union, cast
+
+from sqlalchemy import String, func, literal, tuple_, type_coerce
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(sort_value: str, row_id: int) -> str:
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str):
+    """Return `(sort_value, row_id)` or raise ValueError for a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid pagination cursor.") from exc
+    if not isinstance(sort_value, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid pagination cursor.")
+    return sort_value, row_id
+
+
+def _page_window(
+    query: Union[Query, Select],
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+) -> Union[Query, Select]:
+    """Restrict `query` to one page plus the row that decides `next_cursor`."""
+    if cursor is not None and skip:
+        raise ValueError("Use either skip or cursor, not both.")
+
+    query = query.order_by(sort_column, id_column)
+    if cursor is not None:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(sort_column, id_column)
+            > tuple_(literal(sort_value, String), literal(row_id))
+        )
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def paginate(
+    query: Query,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Page:
+    """Order `query` by `(sort_column, id_column)` and fetch one page of it.
+
+    With a cursor the page starts right after the encoded key, so the cost
+    stays O(limit) at any depth; otherwise `skip` falls back to OFFSET. The
+    sort key travels as the raw stored text so that SQLite compares it exactly
+    as it sits in the index, whatever timestamp format the row was written in.
+    """
+    raw_sort = type_coerce(sort_column, String)
+    window = cast(
+        Query,
+        _page_window(
+            query.add_columns(raw_sort), sort_column, id_column, skip, limit, cursor
+        ),
+    )
+    rows = window.all()
+    items = [row[0] for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last_entity, last_sort = rows[limit - 1]
+        next_cursor = encode_cursor(last_sort, last_entity.id)
+    return Page(items=items, next_cursor=next_cursor)
+
+
+def paginate_rows(
+    db: Session,
+    statement: Select,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Page:
+    """`paginate` for a Core select; the page holds one plain dict per row,
+    keyed by the statement's column names in select order.
+    """
+    raw_sort = type_coerce(sort_column, String).label("_sort_key")
+    window = _page_window(
+        statement.add_columns(raw_sort, id_column.label("_sort_id")),
+        sort_column,
+        id_column,
+        skip,
+        limit,
+        cursor,
+    )
+    result = db.execute(window)
+    keys = list(result.keys())[:-2]
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        *_, last_sort, last_id = rows[limit - 1]
+        next_cursor = encode_cursor(last_sort, last_id)
+    return Page(
+        items=[dict(zip(keys, row)) for row in rows[:limit]], next_cursor=next_cursor
+    )
+
+
+def page_validator(
+    query: Query,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    version_column: ColumnElement,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[int, Optional[int], Optional[int]]:
+    """Return `(count, max version, sum of ids)` over the page `paginate` serves.
+
+    Any write to a row on the page raises its max version, and rows entering or
+    leaving the page move the count or the id sum, so the tuple changes whenever
+    the page would. It reads only the index-ordered window, never the rows'
+    relationships, so it stays cheap enough to run before every conditional GET.
+    """
+    window = _page_window(
+        query.with_entities(id_column.label("id"), version_column.label("version")),
+        sort_column,
+        id_column,
+        skip,
+        limit,
+        cursor,
+    ).subquery()
+    count, max_version, id_sum = query.session.query(
+        func.count(), func.max(window.c.version), func.sum(window.c.id)
+    ).one()
+    return count, max_version, id_sum
+
+
+def paginate_sorted(
+    rows: Sequence[Any],
+    keys: Sequence[Tuple[str, int]],
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Page:
+    """`paginate` for in-memory rows already sorted by their `(sort, id)` keys.
+
+    Keys hold the same raw text SQLite compares, so cursors are interchangeable
+    with those produced by `paginate` over the same table.
+    """
+    if cursor is not None and skip:
+        raise ValueError("Use either skip or cursor, not both.")
+    start = bisect_right(keys, decode_cursor(cursor)) if cursor is not None else skip
+    end = start + limit
+    next_cursor = encode_cursor(*keys[end - 1]) if end < len(rows) else None
+    return Page(items=list(rows[start:end]), next_cursor=next_cursor)
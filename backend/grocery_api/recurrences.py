@@ -0,0 +1,59 @@
+"""Recurring lists: templates cloned server-side on a schedule.
+
+A household marks a list as a template with `PUT /groceries/{id}/recurrence`
+(every N days, starting on a date). Each worker checks for due templates at
+startup and then every `RECURRENCE_INTERVAL` seconds; `crud.run_due_recurrences`
+claims each due template in the transaction that clones it, so however many
+workers check at once, every occurrence becomes exactly one list. Deployments
+that would rather drive it from cron can set the interval to 0 and run:
+
+python -m grocery_api.recurrences                   # clone what is due today
+python -m grocery_api.recurrences --today 2024-06-03
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import date
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from . import crud, database
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = float(os.getenv("RECURRENCE_INTERVAL", "3600"))
+
+
+def run_once(today: Optional[date] = None) -> List[int]:
+    """Clone every template due by `today` (default: the current date)."""
+    with database.SessionLocal() as db:
+        return crud.run_due_recurrences(db, today)
+
+
+async def run_forever(interval: float = INTERVAL) -> None:
+    """Clone due templates now and every `interval` seconds until cancelled."""
+    while True:
+        try:
+            created = await run_in_threadpool(run_once)
+            if created:
+                logger.info("Created %d recurring list(s)", len(created))
+        except Exception:
+            logger.exception("Recurring lists run failed")
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Clone the recurring list templates that are due."
+    )
+    parser.add_argument("--today", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    print(json.dumps({"created": run_once(args.today)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -72,6 +72,44 @@ class GroceryItemUpdate(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
 
+# --------------------------------------------------------------------
+# GROCERY ITEM BATCHES
+# --------------------------------------------------------------------
+MAX_BATCH_LINES = 500
+
+
+class GroceryItemBatchUpdate(GroceryItemUpdate):
+    id: int = Field(gt=0)
+
+
+class GroceryItemBatchPatch(BaseModel):
+    update: List[GroceryItemBatchUpdate] = Field(
+        default_factory=list, max_length=MAX_BATCH_LINES
+    )
+    delete: List[int] = Field(default_factory=list, max_length=MAX_BATCH_LINES)
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class GroceryItemBatch(GroceryItemBatchPatch):
+    create: List[GroceryItemCreate] = Field(
+        default_factory=list, max_length=MAX_BATCH_LINES
+    )
+
+
+class GroceryItemBatchLine(BaseModel):
+    op: Literal["create", "update", "delete"]
+    index: int
+    status: Literal["created", "updated", "deleted", "not_found", "invalid"]
+    id: Optional[int] = None
+    detail: Optional[str] = None
+    grocery_item: Optional[GroceryItem] = None
+
+
+class GroceryItemBatchResult(BaseModel):
+    results: List[GroceryItemBatchLine]
+
+
 # --------------------------------------------------------------------
 # GROCERY
 # --------------------------------------------------------------------
@@ -96,3 +134,85 @@ class Grocery(GroceryBase):
     grocery_items: List[GroceryItem] = Field(default_factory=list)
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class GroceryClone(BaseModel):
+    grocery_date: date
+    # The source list's household when left out
+    family_id: Optional[int] = Field(default=None, ge=1)
+    reset_purchased: bool = True
+
+
+class GroceryRecurrenceSet(BaseModel):
+    every_days: int = Field(default=7, ge=1, le=366)
+    next_date: date
+    reset_purchased: bool = True
+
+
+class GroceryRecurrence(GroceryRecurrenceSet):
+    grocery_id: int
+
+
+class GroceryFilters(BaseModel):
+    family_id: Optional[int] = Field(default=None, ge=1)
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    purchased: Optional[bool] = None
+
+
+# --------------------------------------------------------------------
+# FAMILY SUMMARY
+# --------------------------------------------------------------------
+class FamilyWeekSummary(BaseModel):
+    week: date
+    groceries: int
+    lines: int
+    purchased_lines: int
+    quantity: int
+    purchased_quantity: int
+
+
+class FamilyTopItem(BaseModel):
+    item_id: int
+    name: Optional[str] = None
+    lines: int
+    quantity: int
+
+
+class FamilySummary(BaseModel):
+    family_id: int
+    groceries: int
+    lines: int
+    purchased_lines: int
+    quantity: int
+    purchased_quantity: int
+    items_per_trip: float
+    completion_rate: float
+    top_items: List[FamilyTopItem]
+    weeks: List[FamilyWeekSummary]
+
+
+# --------------------------------------------------------------------
+# SUGGESTIONS
+# --------------------------------------------------------------------
+class ItemSuggestion(BaseModel):
+    item_id: int
+    name: Optional[str] = None
+    # Mean share of the lists holding each of the list's items that also hold
+    # this one, 0 to 1
+    score: float
+
+
+# --------------------------------------------------------------------
+# IMPORT
+# --------------------------------------------------------------------
+class GroceryImportError(BaseModel):
+    line: int  # 1-based line number in the NDJSON body
+    detail: str
+
+
+class GroceryImportResult(BaseModel):
+    accepted: int  # lists written
+    rejected: int
+    grocery_items: int  # lines written with the accepted lists
+    errors: List[GroceryImportError]  # the first rejections, in line order
@@ -0,0 +1,273 @@
+"""Prefix and fuzzy item search over the catalog snapshot, for autocomplete.
+
+The index is built from a `catalog.CatalogSnapshot` the first time that
+snapshot is searched and is replaced along with it, so items created by any
+worker become searchable through the same stamp that refreshes `/items`.
+Names are normalized (case, accents and punctuation folded) and split into
+words, and matches come in three tiers:
+
+1. the whole name starts with the query ("gre" -> "Green apples");
+2. every query word starts some word of the name ("app gr" -> "Green apples");
+3. every query word starts, or closely resembles, some word of the name
+   ("aples" -> "Green apples"). Resemblance is trigram similarity against the
+   catalog's vocabulary of distinct words, which stays small as items grow.
+
+Items come in name order within a tier; a one-word query lists them by matched
+word first (closest first in tier 3), walking its word ranges and stopping at
+`limit`. For several words, the items of a rare word are checked one by one,
+and common words' item bitmaps are and-ed together. Nothing scans the catalog.
+Words with digits (codes, sizes) only match as prefixes.
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from . import catalog
+
+SIMILARITY = 0.4  # least trigram similarity for a fuzzy word match
+FUZZY_MIN_LENGTH = 3  # shorter query words only match as prefixes
+# A multi-word query whose rarest word has at most this many items checks
+# them one by one; otherwise the words' item bitmaps are and-ed together
+CHECK_LIMIT = 256
+BITMAP_MIN_ITEMS = 512  # words with this many items keep a bitmap
+
+_WORD = re.compile(r"\w+")
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accents stripped and punctuation collapsed to single spaces."""
+    text = text.casefold()
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_WORD.findall(text))
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefix_range(keys: Sequence[str], prefix: str) -> Tuple[int, int]:
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + "\U0010ffff")
+
+
+def _exact_range(keys: Sequence[str], key: str) -> Tuple[int, int]:
+    return bisect_left(keys, key), bisect_right(keys, key)
+
+
+class SearchIndex:
+    """Sorted names and words of one catalog snapshot.
+
+    Items are referred to by rank, their position in name order, so a set of
+    matches sorts straight into name order.
+    """
+
+    def __init__(self, items: Sequence[catalog.CatalogItem]) -> None:
+        entries = sorted(
+            (normalize(item.name), item.id, item.item_type_id) for item in items
+        )
+        self.names = [name for name, _, _ in entries]
+        self.ids = [item_id for _, item_id, _ in entries]
+        self.types = [item_type_id for _, _, item_type_id in entries]
+        self.spaced_names = [f" {name}" for name in self.names]
+        self.name_words = [frozenset(name.split()) for name in self.names]
+        items_by_word: Dict[str, List[int]] = {}
+        for rank, name_words in enumerate(self.name_words):
+            for word in name_words:
+                items_by_word.setdefault(word, []).append(rank)
+        # Every word's items in rank order, words sorted; each word's run is
+        # found by bisection. Common words also keep a bitmap of their items,
+        # as (first position in `words`, last + 1, bitmap), for multi-word
+        # queries to and together.
+        self.vocabulary = sorted(items_by_word)
+        self.words: List[str] = []
+        self.word_ranks: List[int] = []
+        self.bitmaps: List[Tuple[int, int, int]] = []
+        for word in self.vocabulary:
+            ranks = items_by_word[word]
+            if len(ranks) >= BITMAP_MIN_ITEMS:
+                start = len(self.words)
+                bitmap = _bitmap(ranks, len(self.names))
+                self.bitmaps.append((start, start + len(ranks), bitmap))
+            self.words.extend([word] * len(ranks))
+            self.word_ranks.extend(ranks)
+        self.bitmap_starts = [start for start, _, _ in self.bitmaps]
+        # Fuzzy matching is for words; codes and numbers only match as prefixes
+        self.vocabulary_trigrams: List[int] = []
+        postings: Dict[str, List[int]] = {}
+        for position, word in enumerate(self.vocabulary):
+            grams = trigrams(word) if word.isalpha() else set()
+            self.vocabulary_trigrams.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self.trigram_postings = postings
+
+    def similar_words(self, term: str) -> Dict[str, float]:
+        """Vocabulary words starting with `term` (scored 1.0) or resembling it."""
+        matches = {
+            word: 1.0
+            for word in self.vocabulary[slice(*_prefix_range(self.vocabulary, term))]
+        }
+        if len(term) < FUZZY_MIN_LENGTH:
+            return matches
+        grams = trigrams(term)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self.trigram_postings.get(gram, ()))
+        for position, count in shared.items():
+            score = count / (len(grams) + self.vocabulary_trigrams[position] - count)
+            word = self.vocabulary[position]
+            if score >= SIMILARITY and word not in matches:
+                matches[word] = score
+        return matches
+
+    def search(
+        self, query: str, limit: int, item_type_id: Optional[int] = None
+    ) -> List[int]:
+        """Ids of up to `limit` items matching `query`, best tier first."""
+        text = normalize(query)
+        terms = sorted(set(text.split()))
+        found: List[int] = []
+        if not terms or limit <= 0:
+            return found
+        seen: Set[int] = set()
+
+        def take(rank: int) -> bool:
+            """Add a match unless filtered out; True once the page is full."""
+            if rank not in seen:
+                seen.add(rank)
+                if item_type_id is None or self.types[rank] == item_type_id:
+                    found.append(self.ids[rank])
+            return len(found) >= limit
+
+        for rank in range(*_prefix_range(self.names, text)):
+            if take(rank):
+                return found
+
+        # " apples" in " green apples": a word of the name starts with "apples"
+        spaced = self.spaced_names
+        ranges = {term: [_prefix_range(self.words, term)] for term in terms}
+        for rank in self._matches(ranges, lambda term, r: f" {term}" in spaced[r]):
+            if take(rank):
+                return found
+
+        similar = {term: self.similar_words(term) for term in terms}
+        ranges = {
+            term: [
+                _exact_range(self.words, word)
+                for word in sorted(words, key=lambda w: (-words[w], w))
+            ]
+            for term, words in similar.items()
+        }
+        name_words = self.name_words
+        for rank in self._matches(
+            ranges, lambda term, r: not name_words[r].isdisjoint(similar[term])
+        ):
+            if take(rank):
+                return found
+        return found
+
+    def _matches(
+        self,
+        ranges: Dict[str, List[Tuple[int, int]]],
+        contains: Callable[[str, int], bool],
+    ) -> Iterable[int]:
+        """Ranks of the items found in every term's word `ranges`;
+        `contains(term, rank)` tells whether an item has one of term's words."""
+        word_ranks = self.word_ranks
+        if len(ranges) == 1:
+            (spans,) = ranges.values()
+            return (
+                word_ranks[position]
+                for start, stop in spans
+                for position in range(start, stop)
+            )
+        sizes = {
+            term: sum(stop - start for start, stop in spans)
+            for term, spans in ranges.items()
+        }
+        first, *others = sorted(sizes, key=sizes.__getitem__)
+        if sizes[first] <= CHECK_LIMIT:
+            candidates = sorted(
+                {
+                    word_ranks[p]
+                    for start, stop in ranges[first]
+                    for p in range(start, stop)
+                }
+            )
+            return [
+                rank
+                for rank in candidates
+                if all(contains(term, rank) for term in others)
+            ]
+        mask = self._mask(ranges[first])
+        for term in others:
+            mask &= self._mask(ranges[term])
+        return _set_bits(mask)
+
+    def _mask(self, spans: List[Tuple[int, int]]) -> int:
+        """Bitmap of the ranks in the word `spans`: the common words' bitmaps
+        or'ed together plus the bits of the rarer words' items."""
+        word_ranks = self.word_ranks
+        starts = self.bitmap_starts
+        mask = 0
+        rare: List[int] = []
+        for start, stop in spans:
+            position = start
+            for index in range(bisect_left(starts, start), bisect_left(starts, stop)):
+                common_start, common_stop, common_mask = self.bitmaps[index]
+                rare.extend(word_ranks[position:common_start])
+                mask |= common_mask
+                position = common_stop
+            rare.extend(word_ranks[position:stop])
+        return mask | _bitmap(rare, len(self.names)) if rare else mask
+
+
+def _bitmap(ranks: Iterable[int], size: int) -> int:
+    bits = bytearray(size // 8 + 1)
+    for rank in ranks:
+        bits[rank >> 3] |= 1 << (rank & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _set_bits(mask: int) -> Iterator[int]:
+    """The positions of the bits set in `mask`, lowest first."""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        index = match.start()
+        byte = data[index]
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield index * 8 + bit
+
+
+_index: Optional[Tuple[catalog.CatalogSnapshot, SearchIndex]] = None
+_build_lock = threading.Lock()
+
+
+def index_for(snapshot: catalog.CatalogSnapshot) -> SearchIndex:
+    """The search index of `snapshot`, built on first use."""
+    global _index
+    current = _index
+    if current is not None and current[0] is snapshot:
+        return current[1]
+    with _build_lock:
+        if _index is None or _index[0] is not snapshot:
+            _index = (snapshot, SearchIndex(snapshot.items))
+        return _index[1]
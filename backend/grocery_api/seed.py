@@ -1,8 +1,29 @@
-from typing import Dict, Set
+import argparse
+import bisect
+import hashlib
+import itertools
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
 
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session
 
-from . import models
+from . import catalog, cooccurrence, models, summaries
 
 DEFAULT_DATA = {
     "Dairy": ["Milk", "Cheese", "Butter", "Yogurt"],
@@ -14,35 +35,273 @@ DEFAULT_DATA = {
 }
 
 
+def seed_fingerprint() -> str:
+    """Digest of DEFAULT_DATA; stored at startup so unchanged seed data is not
+    checked again."""
+    encoded = json.dumps(DEFAULT_DATA, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
 def seed_item_types_and_items(db: Session) -> None:
-    existing_types = (
-        db.query(models.ItemType).options(selectinload(models.ItemType.items)).all()
+    """Add whatever part of DEFAULT_DATA is missing; reads names and ids only."""
+    type_rows: Result[str, int] = db.execute(
+        select(models.ItemType.name, models.ItemType.id)
     )
-    type_by_name: Dict[str, models.ItemType] = {}
-    items_by_type: Dict[str, Set[str]] = {}
-
-    for item_type in existing_types:
-        name = str(item_type.name)
-        type_by_name[name] = item_type
-        items_by_type[name] = {item.name for item in item_type.items}
+    type_ids = dict(type_rows.all())
+    item_names: Set[str] = set(db.scalars(select(models.Item.name)))
 
+    added = False
     for type_name, items in DEFAULT_DATA.items():
-        existing = type_by_name.get(type_name)
-        if existing is None:
+        if type_name not in type_ids:
             new_item_type = models.ItemType(name=type_name)
             db.add(new_item_type)
             db.flush()  # Populate item_type.id for FK usage
-            type_by_name[type_name] = new_item_type
-            items_by_type[type_name] = set()
-            item_type = new_item_type
-        else:
-            item_type = existing
-
-        existing_items = items_by_type[type_name]
+            type_ids[type_name] = cast(int, new_item_type.id)
+            added = True
         for item_name in items:
-            if item_name in existing_items:
+            # Item names are unique across the catalog, not per type
+            if item_name in item_names:
                 continue
-            db.add(models.Item(name=item_name, item_type_id=item_type.id))
-            existing_items.add(item_name)
+            db.add(models.Item(name=item_name, item_type_id=type_ids[type_name]))
+            item_names.add(item_name)
+            added = True
+
+    db.commit()
+    if added:
+        catalog.refresh(db)
+
+
+# --------------------------------------------------------------------
+# SYNTHETIC DATA
+# --------------------------------------------------------------------
+# Popularity follows a Zipf-like curve: a few staples appear on most lists and
+# the long tail rarely. Each family ranks the catalog in its own order, so "top
+# items" differ per household while the overall shape stays the same.
+POPULARITY_EXPONENT = 1.1
+
 
+class SyntheticPlan(NamedTuple):
+    families: int = 10
+    groceries_per_family: int = 50
+    date_from: date = date(2024, 1, 1)
+    date_to: date = date(2024, 12, 31)
+    lines_per_grocery: float = 8.0
+    items: int = 0  # catalog size to grow to; 0 keeps the seeded catalog
+    first_family_id: int = 1
+    chunk_size: int = 1000  # lists per transaction
+    seed: int = 0
+
+
+def seed_synthetic_items(db: Session, total: int, rng: random.Random) -> int:
+    """Grow the catalog to `total` items with generated names; returns how many
+    were added."""
+    snapshot = catalog.get(db)
+    missing = total - len(snapshot.items)
+    if missing <= 0:
+        return 0
+    type_ids = [item_type.id for item_type in snapshot.item_types]
+    start = len(snapshot.items)
+    db.execute(
+        insert(models.Item),
+        [
+            {
+                "name": f"Synthetic item {start + n:07d}",
+                "item_type_id": rng.choice(type_ids),
+            }
+            for n in range(missing)
+        ],
+    )
     db.commit()
+    catalog.refresh(db)
+    return missing
+
+
+def _cumulative_weights(count: int) -> List[float]:
+    total = 0.0
+    weights = []
+    for rank in range(1, count + 1):
+        total += 1.0 / rank**POPULARITY_EXPONENT
+        weights.append(total)
+    return weights
+
+
+def _pick_items(
+    rng: random.Random, ranked: Sequence[int], weights: List[float], count: int
+) -> List[int]:
+    """`count` distinct items drawn by popularity from one family's ranking."""
+    count = min(count, len(ranked))
+    picked: Dict[int, None] = {}
+    while len(picked) < count:
+        rank = bisect.bisect_left(weights, rng.random() * weights[-1])
+        picked[ranked[min(rank, len(ranked) - 1)]] = None
+    return list(picked)
+
+
+def _plan_groceries(
+    plan: SyntheticPlan, item_ids: Sequence[int]
+) -> Iterator[Tuple[int, date, List[Tuple[int, int, bool]]]]:
+    """Yield `(family_id, grocery_date, [(item_id, quantity, purchased)])` one
+    list at a time, so memory does not grow with the number of families."""
+    rng = random.Random(plan.seed)
+    weights = _cumulative_weights(len(item_ids))
+    span = max(0, (plan.date_to - plan.date_from).days)
+    upcoming = plan.date_to - timedelta(days=7)
+    for family_id in range(plan.first_family_id, plan.first_family_id + plan.families):
+        ranked = list(item_ids)
+        rng.shuffle(ranked)
+        days = sorted(rng.randint(0, span) for _ in range(plan.groceries_per_family))
+        for offset in days:
+            grocery_date = plan.date_from + timedelta(days=offset)
+            size = max(
+                1, round(rng.gauss(plan.lines_per_grocery, plan.lines_per_grocery / 3))
+            )
+            # Trips in the range's last week are still open; older ones are
+            # mostly checked off
+            bought = 0.1 if grocery_date > upcoming else 0.95
+            lines = [
+                (
+                    item_id,
+                    1 if rng.random() < 0.7 else rng.randint(2, 6),
+                    rng.random() < bought,
+                )
+                for item_id in _pick_items(rng, ranked, weights, size)
+            ]
+            yield family_id, grocery_date, lines
+
+
+def generate(db: Session, plan: SyntheticPlan) -> Dict[str, Any]:
+    """Insert the groceries and lines described by `plan` and report throughput.
+
+    Rows go out as Core executemany INSERTs, `plan.chunk_size` lists per
+    transaction, with ids and versions assigned up front so no statement has to
+    return anything. Family summaries and item co-occurrence are updated per
+    chunk like any other write; the change log is left alone, as this is
+    history, not live edits. Output depends only on the plan and the catalog,
+    so a given seed always produces the same data.
+    """
+    started = time.perf_counter()
+    seed_item_types_and_items(db)
+    added_items = seed_synthetic_items(db, plan.items, random.Random(plan.seed))
+    item_ids = sorted(catalog.get(db).items_by_id)
+    groceries = lines = 0
+    planned = _plan_groceries(plan, item_ids)
+    while True:
+        chunk = list(itertools.islice(planned, plan.chunk_size))
+        if not chunk:
+            break
+        next_id = db.execute(select(func.max(models.Grocery.id))).scalar() or 0
+        version = db.execute(select(func.max(models.Grocery.version))).scalar() or 0
+        line_version = (
+            db.execute(select(func.max(models.GroceryItem.version))).scalar() or 0
+        )
+        grocery_rows = []
+        line_rows = []
+        delta = summaries.SummaryDelta()
+        pairs = cooccurrence.PairDelta()
+        for family_id, grocery_date, planned_lines in chunk:
+            next_id += 1
+            version += 1
+            created_at = datetime.combine(grocery_date, datetime.min.time())
+            grocery_rows.append(
+                {
+                    "id": next_id,
+                    "family_id": family_id,
+                    "grocery_date": grocery_date,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "version": version,
+                }
+            )
+            rows = []
+            for item_id, quantity, purchased in planned_lines:
+                line_version += 1
+                rows.append(
+                    {
+                        "grocery_id": next_id,
+                        "item_id": item_id,
+                        "quantity": quantity,
+                        "purchased": purchased,
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                        "version": line_version,
+                    }
+                )
+            delta.add_grocery(family_id, grocery_date, rows)
+            pairs.change((), [item_id for item_id, _, _ in planned_lines])
+            line_rows.extend(rows)
+        connection = db.connection()
+        connection.execute(insert(models.Grocery.__table__), grocery_rows)
+        connection.execute(insert(models.GroceryItem.__table__), line_rows)
+        summaries.apply(db, delta)
+        cooccurrence.apply(db, pairs)
+        db.commit()
+        groceries += len(grocery_rows)
+        lines += len(line_rows)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "families": plan.families,
+        "groceries": groceries,
+        "grocery_items": lines,
+        "items_added": added_items,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round((groceries + lines) / elapsed) if elapsed else 0,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    defaults = SyntheticPlan()
+    parser = argparse.ArgumentParser(
+        description="Fill DATABASE_URL with deterministic synthetic grocery data."
+    )
+    parser.add_argument("--families", type=int, default=defaults.families)
+    parser.add_argument(
+        "--groceries-per-family", type=int, default=defaults.groceries_per_family
+    )
+    parser.add_argument(
+        "--date-from", type=date.fromisoformat, default=defaults.date_from
+    )
+    parser.add_argument("--date-to", type=date.fromisoformat, default=defaults.date_to)
+    parser.add_argument(
+        "--lines",
+        type=float,
+        default=defaults.lines_per_grocery,
+        help="Mean lines per list.",
+    )
+    parser.add_argument(
+        "--items",
+        type=int,
+        default=defaults.items,
+        help="Grow the catalog to this many items first.",
+    )
+    parser.add_argument("--first-family-id", type=int, default=defaults.first_family_id)
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=defaults.chunk_size,
+        help="Lists per transaction.",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal, engine
+    from .startup import prepare
+
+    prepare(engine)
+    plan = SyntheticPlan(
+        families=args.families,
+        groceries_per_family=args.groceries_per_family,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        lines_per_grocery=args.lines,
+        items=args.items,
+        first_family_id=args.first_family_id,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+    )
+    with SessionLocal() as db:
+        print(json.dumps(generate(db, plan), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Run the API in one or more uvicorn worker processes.
+
+python -m grocery_api.server --workers 4            # or WEB_CONCURRENCY=4
+
+Setup (`grocery_api.startup`) runs once here before the workers are spawned,
+so they all start on current markers and go straight to serving. Workers share
+nothing but the database: per-process caches (the catalog snapshot, the change
+feed hub) notice writes made by other workers through the stamp files in
+`grocery_api/invalidation.py`. uvicorn supervises the workers and replaces any
+that die.
+"""
+
+import argparse
+import os
+from typing import Optional, Sequence
+
+import uvicorn
+
+from . import database, startup
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Worker processes (default $WEB_CONCURRENCY or 1).",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and database.IS_MEMORY_DB:
+        parser.error("an in-memory database cannot be shared by several workers")
+
+    startup.prepare(database.engine)
+    # Workers open their own connections; nothing pooled here is handed over
+    database.engine.dispose()
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Bring a database up to date once, however many workers start at the same time.
+
+Startup used to run `create_all`, the schema upgrade and the catalog seed on
+every process start. Now the fingerprints of the schema and the seed data are
+stored in `schema_markers` once that work is done, and `prepare` starts with a
+single read of that table: when both match, there is nothing to do. Otherwise
+the work runs under a cross-process lock (a `flock` beside a SQLite file, an
+advisory lock on PostgreSQL), and whoever waited for the lock checks the
+markers again before doing it twice.
+
+python -m grocery_api.startup          # what a deploy step or init container runs
+python -m grocery_api.startup --force  # redo everything whatever the markers say
+"""
+
+import argparse
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional, cast
+
+from sqlalchemy import Table, delete, insert, select
+from sqlalchemy.engine import Engine, Result
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from . import cooccurrence, database, models, summaries
+from .migrations import ensure_schema, schema_fingerprint
+from .seed import seed_fingerprint, seed_item_types_and_items
+
+_MARKERS = cast(Table, models.SchemaMarker.__table__)
+# Arbitrary, fixed key for pg_advisory_lock
+_PG_LOCK_KEY = 0x67726F63
+_local_lock = threading.Lock()
+
+
+class StartupReport(NamedTuple):
+    ran: bool  # False when the markers were current and nothing was done
+    seconds: float
+    waited: float = 0.0  # time spent waiting for another process's lock
+
+
+def expected_markers(engine: Engine) -> Dict[str, str]:
+    return {
+        "schema": schema_fingerprint(engine.dialect),
+        "seed": seed_fingerprint(),
+    }
+
+
+def is_current(engine: Engine) -> bool:
+    """One SELECT: do the stored markers match this code? False before the
+    markers table exists."""
+    try:
+        with engine.connect() as conn:
+            rows: Result[str, str] = conn.execute(
+                select(_MARKERS.c.name, _MARKERS.c.value)
+            )
+            stored = dict(rows.all())
+    except DBAPIError:
+        return False
+    return stored == expected_markers(engine)
+
+
+def _lock_path(engine: Engine) -> Optional[Path]:
+    url = engine.url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    db_path = Path(str(url.database)).resolve()
+    return db_path.with_name(f".{db_path.name}.startup.lock")
+
+
+@contextmanager
+def startup_lock(engine: Engine) -> Iterator[None]:
+    """Held by one process at a time for a given database."""
+    if engine.url.get_backend_name() == "postgresql":
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f"SELECT pg_advisory_lock({_PG_LOCK_KEY})")
+            try:
+                yield
+            finally:
+                conn.exec_driver_sql(f"SELECT pg_advisory_unlock({_PG_LOCK_KEY})")
+        return
+    path = _lock_path(engine)
+    if path is None:
+        # In-memory database: only this process can see it
+        with _local_lock:
+            yield
+        return
+    import fcntl
+
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _bring_up_to_date(engine: Engine) -> None:
+    ensure_schema(engine)
+    with Session(bind=engine) as db:
+        seed_item_types_and_items(db)
+        summaries.backfill(db)
+        cooccurrence.backfill(db)
+        db.execute(delete(_MARKERS))
+        db.execute(
+            insert(_MARKERS),
+            [
+                {"name": name, "value": value}
+                for name, value in expected_markers(engine).items()
+            ],
+        )
+        db.commit()
+
+
+def prepare(engine: Engine, force: bool = False) -> StartupReport:
+    """Create or upgrade the schema and seed the catalog unless the markers say
+    it is already done."""
+    started = time.perf_counter()
+    if not force and is_current(engine):
+        return StartupReport(False, time.perf_counter() - started)
+    with startup_lock(engine):
+        waited = time.perf_counter() - started
+        if not force and is_current(engine):
+            # Another worker did it while this one waited
+            return StartupReport(False, time.perf_counter() - started, waited)
+        _bring_up_to_date(engine)
+    return StartupReport(True, time.perf_counter() - started, waited)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Create or upgrade DATABASE_URL's schema and seed its catalog."
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Ignore the stored markers."
+    )
+    args = parser.parse_args()
+    report = prepare(database.engine, force=args.force)
+    print(json.dumps(report._asdict()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""Per-family shopping summaries, maintained incrementally.
+
+Every crud write that adds, moves or removes groceries or lines describes its
+effect as a `SummaryDelta` and `apply`s it in the same transaction: at most one
+upsert into `family_summaries` and one into `family_item_summaries`, whatever
+the number of rows written. The tables are never rebuilt from scratch; `check`
+compares them with a full recompute from the source tables, and `backfill`
+seeds them once for databases that predate them.
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from sqlalchemy import Table, case, delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session
+
+from . import catalog, models
+
+WEEK_FIELDS = (
+    "groceries",
+    "lines",
+    "purchased_lines",
+    "quantity",
+    "purchased_quantity",
+)
+ITEM_FIELDS = ("lines", "quantity")
+
+_WEEKS = cast(Table, models.FamilySummary.__table__)
+_ITEMS = cast(Table, models.FamilyItemSummary.__table__)
+_GROCERIES = cast(Table, models.Grocery.__table__)
+_LINES = cast(Table, models.GroceryItem.__table__)
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+WeekKey = Tuple[int, date]
+ItemKey = Tuple[int, int]
+
+
+def week_of(day: date) -> date:
+    """Monday of the week `day` falls in."""
+    return day - timedelta(days=day.weekday())
+
+
+class SummaryDelta:
+    """Summary adjustments gathered while one transaction writes rows."""
+
+    def __init__(self) -> None:
+        self.weeks: Dict[WeekKey, List[int]] = defaultdict(
+            lambda: [0] * len(WEEK_FIELDS)
+        )
+        self.items: Dict[ItemKey, List[int]] = defaultdict(
+            lambda: [0] * len(ITEM_FIELDS)
+        )
+
+    def add_grocery(
+        self,
+        family_id: int,
+        grocery_date: date,
+        lines: Iterable[Mapping] = (),
+        sign: int = 1,
+    ) -> None:
+        """Count a list and its `lines`; `sign=-1` takes them back out."""
+        self.weeks[(family_id, week_of(grocery_date))][0] += sign
+        self.add_lines(family_id, grocery_date, lines, sign)
+
+    def add_lines(
+        self,
+        family_id: int,
+        grocery_date: date,
+        lines: Iterable[Mapping],
+        sign: int = 1,
+    ) -> None:
+        """Count lines (mappings with item_id, quantity and purchased)."""
+        week = self.weeks[(family_id, week_of(grocery_date))]
+        for line in lines:
+            quantity = sign * (line["quantity"] or 0)
+            week[1] += sign
+            week[3] += quantity
+            if line["purchased"]:
+                week[2] += sign
+                week[4] += quantity
+            item = self.items[(family_id, line["item_id"])]
+            item[0] += sign
+            item[1] += quantity
+
+
+def upsert(db: Session, table: Table, fields: Sequence[str]) -> Any:
+    """INSERT that adds to the existing counters when the key is already there."""
+    statement: Any = _DIALECT_INSERTS[db.get_bind().dialect.name](table)
+    return statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={field: table.c[field] + statement.excluded[field] for field in fields},
+    )
+
+
+def apply(db: Session, delta: SummaryDelta) -> None:
+    """Add `delta` to the summary tables in the caller's transaction.
+
+    Keys whose adjustments cancel out (a list moved within its week, a purchased
+    toggle for the item counts) are skipped, so they cost no statement.
+    """
+    weeks = [
+        {"family_id": family_id, "week": week, **dict(zip(WEEK_FIELDS, values))}
+        for (family_id, week), values in delta.weeks.items()
+        if any(values)
+    ]
+    if weeks:
+        db.execute(upsert(db, _WEEKS, WEEK_FIELDS), weeks)
+    items = [
+        {"family_id": family_id, "item_id": item_id, **dict(zip(ITEM_FIELDS, values))}
+        for (family_id, item_id), values in delta.items.items()
+        if any(values)
+    ]
+    if items:
+        db.execute(upsert(db, _ITEMS, ITEM_FIELDS), items)
+
+
+class Contribution(NamedTuple):
+    """What one list currently adds to its family's summary."""
+
+    family_id: int
+    grocery_date: date
+    lines: Sequence[Mapping]
+
+
+def contribution(db: Session, grocery_id: int) -> Optional[Contribution]:
+    """Read a list's key and lines in one query; None if the list is gone."""
+    rows = (
+        db.execute(
+            select(
+                _GROCERIES.c.family_id,
+                _GROCERIES.c.grocery_date,
+                _LINES.c.id,
+                _LINES.c.item_id,
+                _LINES.c.quantity,
+                _LINES.c.purchased,
+            )
+            .select_from(_GROCERIES.outerjoin(_LINES))
+            .where(_GROCERIES.c.id == grocery_id)
+        )
+        .mappings()
+        .all()
+    )
+    if not rows:
+        return None
+    first = rows[0]
+    lines = [row for row in rows if row["id"] is not None]
+    return Contribution(first["family_id"], first["grocery_date"], lines)
+
+
+# --------------------------------------------------------------------
+# READS
+# --------------------------------------------------------------------
+def get_summary(
+    db: Session, family_id: int, weeks: int = 12, top: int = 10
+) -> Optional[Dict[str, Any]]:
+    """Totals, the latest `weeks` weeks and the `top` items of one family.
+
+    Two indexed reads of the summary tables, however many lists the family
+    has; None when it has never had a list.
+    """
+    week_rows = db.execute(
+        select(_WEEKS.c.week, *(_WEEKS.c[field] for field in WEEK_FIELDS))
+        .where(_WEEKS.c.family_id == family_id)
+        .order_by(_WEEKS.c.week.desc())
+    ).mappings()
+    by_week = [dict(row) for row in week_rows if any(row[f] for f in WEEK_FIELDS)]
+    if not by_week:
+        return None
+    totals = {field: sum(row[field] for row in by_week) for field in WEEK_FIELDS}
+
+    snapshot = catalog.get(db)
+    item_rows: Result[int, int, int] = db.execute(
+        select(_ITEMS.c.item_id, _ITEMS.c.lines, _ITEMS.c.quantity)
+        .where(_ITEMS.c.family_id == family_id, _ITEMS.c.lines > 0)
+        .order_by(_ITEMS.c.lines.desc(), _ITEMS.c.quantity.desc(), _ITEMS.c.item_id)
+        .limit(top)
+    )
+    top_items = []
+    for item_id, lines, quantity in item_rows:
+        item = snapshot.items_by_id.get(item_id)
+        top_items.append(
+            {
+                "item_id": item_id,
+                "name": item.name if item else None,
+                "lines": lines,
+                "quantity": quantity,
+            }
+        )
+
+    groceries, lines = totals["groceries"], totals["lines"]
+    return {
+        "family_id": family_id,
+        **totals,
+        "items_per_trip": round(lines / groceries, 2) if groceries else 0.0,
+        "completion_rate": (
+            round(totals["purchased_lines"] / lines, 4) if lines else 0.0
+        ),
+        "top_items": top_items,
+        "weeks": by_week[:weeks],
+    }
+
+
+# --------------------------------------------------------------------
+# CONSISTENCY
+# --------------------------------------------------------------------
+class Totals(NamedTuple):
+    weeks: Dict[WeekKey, Tuple[int, ...]]
+    items: Dict[ItemKey, Tuple[int, ...]]
+
+
+def recompute(db: Session) -> Totals:
+    """Summaries computed from scratch out of groceries and grocery_items."""
+    delta = SummaryDelta()
+    grocery_rows: Result[int, date, int] = db.execute(
+        select(
+            _GROCERIES.c.family_id, _GROCERIES.c.grocery_date, func.count()
+        ).group_by(_GROCERIES.c.family_id, _GROCERIES.c.grocery_date)
+    )
+    for family_id, grocery_date, count in grocery_rows:
+        delta.weeks[(family_id, week_of(grocery_date))][0] += count
+
+    purchased = case((_LINES.c.purchased, 1), else_=0)
+    line_rows: Result[int, date, int, int, int, int, int] = db.execute(
+        select(
+            _GROCERIES.c.family_id,
+            _GROCERIES.c.grocery_date,
+            _LINES.c.item_id,
+            func.count(),
+            func.coalesce(func.sum(purchased), 0),
+            func.coalesce(func.sum(_LINES.c.quantity), 0),
+            func.coalesce(func.sum(purchased * _LINES.c.quantity), 0),
+        )
+        .select_from(_LINES.join(_GROCERIES))
+        .group_by(_GROCERIES.c.family_id, _GROCERIES.c.grocery_date, _LINES.c.item_id)
+    )
+    for (
+        family_id,
+        grocery_date,
+        item_id,
+        lines,
+        bought,
+        quantity,
+        bought_qty,
+    ) in line_rows:
+        week = delta.weeks[(family_id, week_of(grocery_date))]
+        week[1] += lines
+        week[2] += bought
+        week[3] += quantity
+        week[4] += bought_qty
+        item = delta.items[(family_id, item_id)]
+        item[0] += lines
+        item[1] += quantity
+    return Totals(
+        weeks={key: tuple(v) for key, v in delta.weeks.items() if any(v)},
+        items={key: tuple(v) for key, v in delta.items.items() if any(v)},
+    )
+
+
+def stored(db: Session) -> Totals:
+    """The summary tables as they are, zeroed rows left out."""
+    week_rows: Result[int, date, int, int, int, int, int] = db.execute(
+        select(
+            _WEEKS.c.family_id,
+            _WEEKS.c.week,
+            *(_WEEKS.c[field] for field in WEEK_FIELDS),
+        )
+    )
+    item_rows: Result[int, int, int, int] = db.execute(
+        select(
+            _ITEMS.c.family_id,
+            _ITEMS.c.item_id,
+            *(_ITEMS.c[field] for field in ITEM_FIELDS),
+        )
+    )
+    return Totals(
+        weeks={(r[0], r[1]): tuple(r[2:]) for r in week_rows if any(r[2:])},
+        items={(r[0], r[1]): tuple(r[2:]) for r in item_rows if any(r[2:])},
+    )
+
+
+def _differences(
+    name: str, fields: Sequence[str], want: Mapping, have: Mapping
+) -> List[str]:
+    zeros = (0,) * len(fields)
+    return [
+        f"{name} {key}: stored {dict(zip(fields, have.get(key, zeros)))}, "
+        f"expected {dict(zip(fields, want.get(key, zeros)))}"
+        for key in sorted(want.keys() | have.keys())
+        if want.get(key, zeros) != have.get(key, zeros)
+    ]
+
+
+def check(db: Session) -> List[str]:
+    """Differences between the summary tables and a full recompute; empty when
+    they agree."""
+    expected, actual = recompute(db), stored(db)
+    return _differences(
+        "week", WEEK_FIELDS, expected.weeks, actual.weeks
+    ) + _differences("item", ITEM_FIELDS, expected.items, actual.items)
+
+
+def backfill(db: Session) -> bool:
+    """Seed empty summary tables from the source tables; True if it did.
+
+    Only meant for databases created before the summaries existed: once the
+    tables hold rows, writes keep them current and this does nothing.
+    """
+    if db.execute(select(_WEEKS.c.family_id).limit(1)).first() is not None:
+        return False
+    if db.execute(select(_GROCERIES.c.id).limit(1)).first() is None:
+        return False
+    totals = recompute(db)
+    db.execute(delete(_ITEMS))
+    db.execute(
+        insert(_WEEKS),
+        [
+            {"family_id": family_id, "week": week, **dict(zip(WEEK_FIELDS, values))}
+            for (family_id, week), values in totals.weeks.items()
+        ],
+    )
+    if totals.items:
+        db.execute(
+            insert(_ITEMS),
+            [
+                {
+                    "family_id": family_id,
+                    "item_id": item_id,
+                    **dict(zip(ITEM_FIELDS, values)),
+                }
+                for (family_id, item_id), values in totals.items.items()
+            ],
+        )
+    db.commit()
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the family summary tables with a full recompute."
+    )
+    parser.parse_args()
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        problems = check(db)
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} mismatch(es)" if problems else "Summaries are consistent")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
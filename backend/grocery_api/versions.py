@@ -0,0 +1,38 @@
+import hashlib
+from typing import Any, Optional
+
+from sqlalchemy import column, func, select, table
+from sqlalchemy.sql.elements import ColumnElement
+
+# Row versions come from the table itself: every insert or update sets the row
+# to one past the table's current maximum, inside the writing statement. SQLite
+# serializes writers, so a write always lands above every version committed
+# before it, whichever process made it and whatever the clocks say.
+
+
+def next_version(table_name: str) -> ColumnElement[int]:
+    """SQL for a version greater than any `table_name` currently holds."""
+    # Aliased and never correlated, so inside an UPDATE of the same table the
+    # maximum is taken over the whole table rather than the row being written
+    latest = table(table_name, column("version")).alias("latest")
+    return (
+        select(func.coalesce(func.max(latest.c.version), 0) + 1)
+        .correlate(None)
+        .scalar_subquery()
+    )
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the validator parts of a response (never its body)."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -1,25 +1,63 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
+from datetime import date
+from typing import Any, Literal, Optional, Set
 
+import orjson
 from dotenv import load_dotenv
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
+from fastapi import (
+    APIRouter,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
 
 load_dotenv()
 
-from grocery_api import crud, database, models, schemas
-from grocery_api.seed import seed_item_types_and_items
+from grocery_api import (
+    admission,
+    changes,
+    compression,
+    crud_async,
+    database,
+    export,
+    idempotency,
+    imports,
+    metrics,
+    recurrences,
+    schemas,
+    startup,
+)
+from grocery_api.database import DbSession
+from grocery_api.load_profiles import parse_expand, resolve_expand
+from grocery_api.pagination import Page
+from grocery_api.versions import etag_matches, make_etag
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    models.Base.metadata.create_all(bind=database.engine)
+    # One marker read when the database is already current; otherwise schema,
+    # seed and backfill run once, under a lock shared by every worker.
+    app.state.startup = startup.prepare(database.engine)
+    database.log_sqlite_settings()
     with database.SessionLocal() as db:
-        seed_item_types_and_items(db)
+        changes.prune(db)
+        idempotency.prune(db)
+    scheduler = None
+    if recurrences.INTERVAL > 0:
+        scheduler = asyncio.get_running_loop().create_task(recurrences.run_forever())
     yield
+    if scheduler is not None:
+        scheduler.cancel()
 
 
 # --------------------------------------------------------------------
@@ -38,6 +76,14 @@ app = FastAPI(
 )
 api_v1 = APIRouter(prefix="/api/v1")
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Inside CORS, so replayed responses carry its headers too
+app.add_middleware(idempotency.IdempotencyMiddleware)
+# Outside the idempotency store, whose claims hit the database too; inside
+# CORS so that browsers can read a 503's Retry-After
+app.add_middleware(admission.AdmissionMiddleware)
+
 # Enable CORS for frontend access (restricted for production)
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 app.add_middleware(
@@ -46,11 +92,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER,
+        "ETag",
+        "Retry-After",
+        idempotency.REPLAYED_HEADER,
+    ],
 )
+# Outside CORS and everything else that writes bodies
+app.add_middleware(compression.CompressionMiddleware)
+# Catalog pages by ETag, serialized and compressed once per catalog version
+catalog_responses = compression.PrecompressedCache()
 
 
 # Dependency for DB session
-def get_db():
+async def get_db():
+    if database.AsyncSessionLocal is not None:
+        async with database.AsyncSessionLocal() as async_db:
+            yield async_db
+        return
     db = database.SessionLocal()
     try:
         yield db
@@ -63,6 +123,106 @@ def _normalize_pagination(limit: int) -> int:
     return max(1, min(limit, 100))
 
 
+def _expand_for(profile: str):
+    """Build a dependency that validates `expand` against a load profile."""
+
+    def dependency(
+        expand: Optional[str] = Query(
+            default=None,
+            description="Comma-separated relationships to embed "
+            "(e.g. `grocery_items.item.item_type`); empty embeds only required ones.",
+        ),
+    ) -> Optional[Set[str]]:
+        requested = parse_expand(expand)
+        try:
+            resolve_expand(profile, requested)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return requested
+
+    return dependency
+
+
+def _cursor_param(
+    cursor: Optional[str] = Query(
+        default=None,
+        description=f"Opaque keyset cursor from a previous `{NEXT_CURSOR_HEADER}` "
+        "response header; replaces `skip` for stable, constant-cost paging.",
+    ),
+) -> Optional[str]:
+    return cursor
+
+
+def _grocery_filters(
+    family_id: Optional[int] = Query(default=None, ge=1),
+    date_from: Optional[date] = Query(
+        default=None, description="Earliest grocery_date to include."
+    ),
+    date_to: Optional[date] = Query(
+        default=None, description="Latest grocery_date to include."
+    ),
+    purchased: Optional[bool] = Query(
+        default=None,
+        description="Grocery lines in this purchased state; for /groceries, "
+        "lists holding at least one such line.",
+    ),
+) -> schemas.GroceryFilters:
+    return schemas.GroceryFilters(
+        family_id=family_id,
+        date_from=date_from,
+        date_to=date_to,
+        purchased=purchased,
+    )
+
+
+def _page_items(page: Page, response: Response) -> list:
+    """Surface the page's keyset cursor as a header and return its rows."""
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+def _json_page(page: Page, response: Response) -> Response:
+    """Encode a page of plain dicts straight to JSON bytes.
+
+    Used by the hot list endpoints to skip response_model validation; the rows
+    are keyed in schema field order, so the bytes match what FastAPI would send.
+    """
+    items = _page_items(page, response)
+    json_response = Response(orjson.dumps(items), media_type="application/json")
+    json_response.headers.raw.extend(response.headers.raw)
+    return json_response
+
+
+def _cache_catalog_response(
+    rows: list, response: Response
+) -> compression.Precompressed:
+    """Keep a catalog response under its ETag, which the catalog stamp feeds.
+
+    The rows are catalog payloads keyed in schema field order, so their JSON
+    matches what response_model would send.
+    """
+    return catalog_responses.put(
+        response.headers["ETag"], orjson.dumps(rows), response.headers.raw
+    )
+
+
+def _not_modified(
+    request: Request, response: Response, *validators: Any
+) -> Optional[Response]:
+    """Tag the response with an ETag over the URL and the data's `validators`.
+
+    Returns a bare 304 when the client already holds that ETag, so the caller
+    can skip loading and serializing the body altogether.
+    """
+    etag = make_etag(request.url.path, request.url.query, *validators)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 def _handle_integrity_error(
     exc: IntegrityError, conflict_detail: str, bad_request_detail: str
 ) -> None:
@@ -73,17 +233,19 @@ def _handle_integrity_error(
 
 
 # --------------------------------------------------------------------
-# GLOBAL ERROR HANDLER
+# METRICS AND GLOBAL ERROR HANDLER
 # --------------------------------------------------------------------
-@app.middleware("http")
-async def catch_exceptions_middleware(request: Request, call_next):
-    try:
-        return await call_next(request)
-    except Exception as e:
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "detail": "Internal Server Error"},
-        )
+# Outermost, so its latency covers CORS and every other layer. Pure ASGI: a
+# BaseHTTPMiddleware would add a task and a stream per request.
+app.add_middleware(metrics.MetricsMiddleware, enabled=metrics.ENABLED)
+if metrics.ENABLED:
+    metrics.instrument(database.request_engine)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    # On the event loop, where every observation is made, so never mid-update
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # --------------------------------------------------------------------
@@ -94,22 +256,51 @@ def root():
     return {"message": "Grocery API is running"}
 
 
+@app.get("/ready", include_in_schema=False)
+async def read_readiness(request: Request):
+    """Ready once startup finished and the database answers with current
+    markers; load balancers should route here, `/` only says the process runs."""
+    report = getattr(request.app.state, "startup", None)
+    current = report is not None and await run_in_threadpool(
+        startup.is_current, database.engine
+    )
+    body = {
+        "status": "ready" if current else "not ready",
+        "worker": os.getpid(),
+        "startup": report._asdict() if report else None,
+    }
+    return JSONResponse(body, status_code=200 if current else 503)
+
+
 # --------------------------------------------------------------------
 # ITEM TYPES
 # --------------------------------------------------------------------
 @api_v1.get("/item_types", response_model=list[schemas.ItemType], tags=["Item Types"])
-def read_item_types(
+async def read_item_types(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(default=50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
 ):
-    return crud.get_item_types(db, skip=skip, limit=_normalize_pagination(limit))
+    not_modified = _not_modified(request, response, await crud_async.catalog_stamp(db))
+    if not_modified:
+        return not_modified
+    cached = catalog_responses.get(response.headers["ETag"])
+    if cached is None:
+        item_types = await crud_async.get_item_types(
+            db, skip=skip, limit=_normalize_pagination(limit)
+        )
+        cached = _cache_catalog_response(item_types, response)
+    return await catalog_responses.respond(cached, request)
 
 
 @api_v1.post("/item_types", response_model=schemas.ItemType, tags=["Item Types"])
-def create_item_type(item_type: schemas.ItemTypeCreate, db: Session = Depends(get_db)):
+async def create_item_type(
+    item_type: schemas.ItemTypeCreate, db: DbSession = Depends(get_db)
+):
     try:
-        return crud.create_item_type(db, item_type)
+        return await crud_async.create_item_type(db, item_type)
     except IntegrityError as exc:
         _handle_integrity_error(
             exc,
@@ -122,20 +313,58 @@ def create_item_type(item_type: schemas.ItemTypeCreate, db: Session = Depends(ge
 # ITEMS
 # --------------------------------------------------------------------
 @api_v1.get("/items", response_model=list[schemas.Item], tags=["Items"])
-def read_items(
+async def read_items(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(default=50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Depends(_cursor_param),
+    expand: Optional[Set[str]] = Depends(_expand_for("catalog")),
+    db: DbSession = Depends(get_db),
 ):
-    return crud.get_items(db, skip=skip, limit=_normalize_pagination(limit))
+    not_modified = _not_modified(request, response, await crud_async.catalog_stamp(db))
+    if not_modified:
+        return not_modified
+    cached = catalog_responses.get(response.headers["ETag"])
+    if cached is None:
+        try:
+            page = await crud_async.get_items(
+                db,
+                skip=skip,
+                limit=_normalize_pagination(limit),
+                cursor=cursor,
+                expand=expand,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        cached = _cache_catalog_response(_page_items(page, response), response)
+    return await catalog_responses.respond(cached, request)
+
+
+@api_v1.get("/items/search", response_model=list[schemas.Item], tags=["Items"])
+async def search_items(
+    request: Request,
+    response: Response,
+    q: str = Query(min_length=1, max_length=100, description="Text typed so far."),
+    limit: int = Query(default=10, ge=1, le=50),
+    item_type_id: Optional[int] = Query(default=None, ge=1),
+    expand: Optional[Set[str]] = Depends(_expand_for("catalog")),
+    db: DbSession = Depends(get_db),
+):
+    """Prefix matches first, then word-prefix and fuzzy (typo-tolerant) ones."""
+    not_modified = _not_modified(request, response, await crud_async.catalog_stamp(db))
+    if not_modified:
+        return not_modified
+    items = await crud_async.search_items(
+        db, q, limit=limit, item_type_id=item_type_id, expand=expand
+    )
+    return _json_page(Page(items), response)
 
 
 @api_v1.post("/items", response_model=schemas.Item, tags=["Items"])
-def create_item(item: schemas.ItemCreate, db: Session = Depends(get_db)):
+async def create_item(item: schemas.ItemCreate, db: DbSession = Depends(get_db)):
     try:
-        return crud.create_item(db, item)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return await crud_async.create_item(db, item)
     except IntegrityError as exc:
         _handle_integrity_error(
             exc,
@@ -148,28 +377,68 @@ def create_item(item: schemas.ItemCreate, db: Session = Depends(get_db)):
 # GROCERIES
 # --------------------------------------------------------------------
 @api_v1.get("/groceries", response_model=list[schemas.Grocery], tags=["Groceries"])
-def read_groceries(
+async def read_groceries(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(default=50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Depends(_cursor_param),
+    expand: Optional[Set[str]] = Depends(_expand_for("grocery-detail")),
+    filters: schemas.GroceryFilters = Depends(_grocery_filters),
+    db: DbSession = Depends(get_db),
 ):
-    return crud.get_groceries(db, skip=skip, limit=_normalize_pagination(limit))
+    try:
+        validator = await crud_async.groceries_validator(
+            db,
+            skip=skip,
+            limit=_normalize_pagination(limit),
+            cursor=cursor,
+            filters=filters,
+        )
+        not_modified = _not_modified(request, response, validator)
+        if not_modified:
+            return not_modified
+        page = await crud_async.get_grocery_rows(
+            db,
+            skip=skip,
+            limit=_normalize_pagination(limit),
+            cursor=cursor,
+            expand=expand,
+            filters=filters,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return _json_page(page, response)
 
 
 @api_v1.get(
     "/groceries/{grocery_id}", response_model=schemas.Grocery, tags=["Groceries"]
 )
-def read_grocery(grocery_id: int, db: Session = Depends(get_db)):
-    grocery = crud.get_grocery_by_id(db, grocery_id)
+async def read_grocery(
+    request: Request,
+    response: Response,
+    grocery_id: int,
+    expand: Optional[Set[str]] = Depends(_expand_for("grocery-detail")),
+    db: DbSession = Depends(get_db),
+):
+    version = await crud_async.grocery_version(db, grocery_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Grocery not found")
+    not_modified = _not_modified(request, response, version)
+    if not_modified:
+        return not_modified
+    grocery = await crud_async.get_grocery_by_id(db, grocery_id, expand=expand)
     if not grocery:
         raise HTTPException(status_code=404, detail="Grocery not found")
     return grocery
 
 
 @api_v1.post("/groceries", response_model=schemas.Grocery, tags=["Groceries"])
-def create_grocery(grocery: schemas.GroceryCreate, db: Session = Depends(get_db)):
+async def create_grocery(
+    grocery: schemas.GroceryCreate, db: DbSession = Depends(get_db)
+):
     try:
-        return crud.create_grocery(db, grocery)
+        return await crud_async.create_grocery(db, grocery)
     except IntegrityError as exc:
         _handle_integrity_error(
             exc,
@@ -181,35 +450,150 @@ def create_grocery(grocery: schemas.GroceryCreate, db: Session = Depends(get_db)
 @api_v1.put(
     "/groceries/{grocery_id}", response_model=schemas.Grocery, tags=["Groceries"]
 )
-def update_grocery(
-    grocery_id: int, grocery: schemas.GroceryUpdate, db: Session = Depends(get_db)
+async def update_grocery(
+    grocery_id: int, grocery: schemas.GroceryUpdate, db: DbSession = Depends(get_db)
 ):
-    updated = crud.update_grocery(db, grocery_id, grocery)
+    try:
+        updated = await crud_async.update_grocery(db, grocery_id, grocery)
+    except IntegrityError as exc:
+        _handle_integrity_error(
+            exc,
+            conflict_detail="Conflicting grocery data.",
+            bad_request_detail="Invalid grocery update.",
+        )
     if not updated:
         raise HTTPException(status_code=404, detail="Grocery not found")
     return updated
 
 
 @api_v1.delete("/groceries/{grocery_id}", tags=["Groceries"])
-def delete_grocery(grocery_id: int, db: Session = Depends(get_db)):
-    deleted = crud.delete_grocery(db, grocery_id)
+async def delete_grocery(grocery_id: int, db: DbSession = Depends(get_db)):
+    deleted = await crud_async.delete_grocery(db, grocery_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Grocery not found")
     return {"status": "deleted"}
 
 
+@api_v1.get(
+    "/groceries/{grocery_id}/suggestions",
+    response_model=list[schemas.ItemSuggestion],
+    tags=["Groceries"],
+)
+async def read_grocery_suggestions(
+    grocery_id: int,
+    limit: int = Query(default=10, ge=1, le=50),
+    db: DbSession = Depends(get_db),
+):
+    """Items frequently bought together with the ones on this list, best first."""
+    suggestions = await crud_async.get_grocery_suggestions(db, grocery_id, limit=limit)
+    if suggestions is None:
+        raise HTTPException(status_code=404, detail="Grocery not found")
+    return suggestions
+
+
+@api_v1.post(
+    "/groceries/{grocery_id}/clone",
+    response_model=schemas.Grocery,
+    tags=["Groceries"],
+)
+async def clone_grocery(
+    grocery_id: int, clone: schemas.GroceryClone, db: DbSession = Depends(get_db)
+):
+    """Copy a list and its lines to a new date in one server-side write."""
+    try:
+        cloned = await crud_async.clone_grocery(db, grocery_id, clone)
+    except IntegrityError as exc:
+        _handle_integrity_error(
+            exc,
+            conflict_detail="Conflicting grocery data.",
+            bad_request_detail="Invalid grocery clone.",
+        )
+    if cloned is None:
+        raise HTTPException(status_code=404, detail="Grocery not found")
+    return cloned
+
+
+@api_v1.get(
+    "/groceries/{grocery_id}/recurrence",
+    response_model=schemas.GroceryRecurrence,
+    tags=["Groceries"],
+)
+async def read_grocery_recurrence(grocery_id: int, db: DbSession = Depends(get_db)):
+    recurrence = await crud_async.get_grocery_recurrence(db, grocery_id)
+    if recurrence is None:
+        raise HTTPException(status_code=404, detail="Recurrence not found")
+    return recurrence
+
+
+@api_v1.put(
+    "/groceries/{grocery_id}/recurrence",
+    response_model=schemas.GroceryRecurrence,
+    tags=["Groceries"],
+)
+async def set_grocery_recurrence(
+    grocery_id: int,
+    recurrence: schemas.GroceryRecurrenceSet,
+    db: DbSession = Depends(get_db),
+):
+    """Clone this list every `every_days` days, starting on `next_date`."""
+    try:
+        saved = await crud_async.set_grocery_recurrence(db, grocery_id, recurrence)
+    except IntegrityError as exc:
+        _handle_integrity_error(
+            exc,
+            conflict_detail="Conflicting recurrence data.",
+            bad_request_detail="Invalid recurrence.",
+        )
+    if saved is None:
+        raise HTTPException(status_code=404, detail="Grocery not found")
+    return saved
+
+
+@api_v1.delete("/groceries/{grocery_id}/recurrence", tags=["Groceries"])
+async def delete_grocery_recurrence(grocery_id: int, db: DbSession = Depends(get_db)):
+    if not await crud_async.delete_grocery_recurrence(db, grocery_id):
+        raise HTTPException(status_code=404, detail="Recurrence not found")
+    return {"status": "deleted"}
+
+
 # --------------------------------------------------------------------
 # GROCERY ITEMS
 # --------------------------------------------------------------------
 @api_v1.get(
     "/grocery_items", response_model=list[schemas.GroceryItem], tags=["Grocery Items"]
 )
-def read_grocery_items(
+async def read_grocery_items(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(default=50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Depends(_cursor_param),
+    expand: Optional[Set[str]] = Depends(_expand_for("grocery-line")),
+    filters: schemas.GroceryFilters = Depends(_grocery_filters),
+    db: DbSession = Depends(get_db),
 ):
-    return crud.get_grocery_items(db, skip=skip, limit=_normalize_pagination(limit))
+    try:
+        validator = await crud_async.grocery_items_validator(
+            db,
+            skip=skip,
+            limit=_normalize_pagination(limit),
+            cursor=cursor,
+            filters=filters,
+        )
+        not_modified = _not_modified(request, response, validator)
+        if not_modified:
+            return not_modified
+        page = await crud_async.get_grocery_item_rows(
+            db,
+            skip=skip,
+            limit=_normalize_pagination(limit),
+            cursor=cursor,
+            expand=expand,
+            filters=filters,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return _json_page(page, response)
 
 
 @api_v1.get(
@@ -217,8 +601,19 @@ def read_grocery_items(
     response_model=list[schemas.GroceryItem],
     tags=["Grocery Items"],
 )
-def read_grocery_items_by_grocery(grocery_id: int, db: Session = Depends(get_db)):
-    return crud.get_grocery_items_by_grocery(db, grocery_id)
+async def read_grocery_items_by_grocery(
+    request: Request,
+    response: Response,
+    grocery_id: int,
+    expand: Optional[Set[str]] = Depends(_expand_for("grocery-line")),
+    db: DbSession = Depends(get_db),
+):
+    # Line writes bump the parent list's version, so it covers every line
+    version = await crud_async.grocery_version(db, grocery_id)
+    not_modified = _not_modified(request, response, version)
+    if not_modified:
+        return not_modified
+    return await crud_async.get_grocery_items_by_grocery(db, grocery_id, expand=expand)
 
 
 @api_v1.post(
@@ -226,26 +621,64 @@ def read_grocery_items_by_grocery(grocery_id: int, db: Session = Depends(get_db)
     response_model=schemas.GroceryItem,
     tags=["Grocery Items"],
 )
-def create_grocery_item(
-    grocery_id: int, item: schemas.GroceryItemCreate, db: Session = Depends(get_db)
+async def create_grocery_item(
+    grocery_id: int, item: schemas.GroceryItemCreate, db: DbSession = Depends(get_db)
 ):
     try:
-        return crud.create_grocery_item(db, grocery_id, item)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return await crud_async.create_grocery_item(db, grocery_id, item)
+    except IntegrityError as exc:
+        _handle_integrity_error(
+            exc,
+            conflict_detail="Grocery already contains that item.",
+            bad_request_detail="Invalid grocery or item reference.",
+        )
+
+
+@api_v1.post(
+    "/groceries/{grocery_id}/items:batch",
+    response_model=schemas.GroceryItemBatchResult,
+    tags=["Grocery Items"],
+)
+async def batch_grocery_items_for_grocery(
+    grocery_id: int, batch: schemas.GroceryItemBatch, db: DbSession = Depends(get_db)
+):
+    try:
+        results = await crud_async.apply_grocery_item_batch(db, batch, grocery_id)
     except IntegrityError as exc:
         _handle_integrity_error(
             exc,
             conflict_detail="Grocery already contains that item.",
             bad_request_detail="Invalid grocery or item reference.",
         )
+    if results is None:
+        raise HTTPException(status_code=404, detail="Grocery not found")
+    return {"results": results}
 
 
-def _update_grocery_item(
-    grocery_item_id: int, item: schemas.GroceryItemUpdate, db: Session
+@api_v1.patch(
+    "/grocery_items:batch",
+    response_model=schemas.GroceryItemBatchResult,
+    tags=["Grocery Items"],
+)
+async def batch_grocery_items(
+    batch: schemas.GroceryItemBatchPatch, db: DbSession = Depends(get_db)
+):
+    try:
+        results = await crud_async.apply_grocery_item_batch(db, batch)
+    except IntegrityError as exc:
+        _handle_integrity_error(
+            exc,
+            conflict_detail="Grocery already contains that item.",
+            bad_request_detail="Invalid grocery item update.",
+        )
+    return {"results": results}
+
+
+async def _update_grocery_item(
+    grocery_item_id: int, item: schemas.GroceryItemUpdate, db: DbSession
 ) -> schemas.GroceryItem:
     try:
-        updated = crud.update_grocery_item(db, grocery_item_id, item)
+        updated = await crud_async.update_grocery_item(db, grocery_item_id, item)
     except IntegrityError as exc:
         _handle_integrity_error(
             exc,
@@ -262,10 +695,12 @@ def _update_grocery_item(
     response_model=schemas.GroceryItem,
     tags=["Grocery Items"],
 )
-def update_grocery_item(
-    grocery_item_id: int, item: schemas.GroceryItemUpdate, db: Session = Depends(get_db)
+async def update_grocery_item(
+    grocery_item_id: int,
+    item: schemas.GroceryItemUpdate,
+    db: DbSession = Depends(get_db),
 ):
-    return _update_grocery_item(grocery_item_id, item, db)
+    return await _update_grocery_item(grocery_item_id, item, db)
 
 
 @api_v1.patch(
@@ -273,18 +708,133 @@ def update_grocery_item(
     response_model=schemas.GroceryItem,
     tags=["Grocery Items"],
 )
-def patch_grocery_item(
-    grocery_item_id: int, item: schemas.GroceryItemUpdate, db: Session = Depends(get_db)
+async def patch_grocery_item(
+    grocery_item_id: int,
+    item: schemas.GroceryItemUpdate,
+    db: DbSession = Depends(get_db),
 ):
-    return _update_grocery_item(grocery_item_id, item, db)
+    return await _update_grocery_item(grocery_item_id, item, db)
 
 
 @api_v1.delete("/grocery_items/{grocery_item_id}", tags=["Grocery Items"])
-def delete_grocery_item(grocery_item_id: int, db: Session = Depends(get_db)):
-    deleted = crud.delete_grocery_item(db, grocery_item_id)
+async def delete_grocery_item(grocery_item_id: int, db: DbSession = Depends(get_db)):
+    deleted = await crud_async.delete_grocery_item(db, grocery_item_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Grocery item not found")
     return {"status": "deleted"}
 
 
+# --------------------------------------------------------------------
+# FAMILIES
+# --------------------------------------------------------------------
+@api_v1.get(
+    "/families/{family_id}/summary",
+    response_model=schemas.FamilySummary,
+    tags=["Families"],
+)
+async def read_family_summary(
+    family_id: int,
+    weeks: int = Query(default=12, ge=0, le=520, description="Latest weeks to list."),
+    top: int = Query(default=10, ge=0, le=100, description="Most frequent items."),
+    db: DbSession = Depends(get_db),
+):
+    summary = await crud_async.get_family_summary(db, family_id, weeks=weeks, top=top)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Family not found")
+    return summary
+
+
+# --------------------------------------------------------------------
+# EXPORT
+# --------------------------------------------------------------------
+@api_v1.get("/export/groceries", tags=["Export"], response_class=StreamingResponse)
+async def export_groceries(
+    family_id: Optional[int] = Query(default=None, ge=1),
+    date_from: Optional[date] = Query(
+        default=None, description="Earliest grocery_date to include."
+    ),
+    date_to: Optional[date] = Query(
+        default=None, description="Latest grocery_date to include."
+    ),
+    format: Literal["ndjson", "csv"] = Query(
+        default="ndjson",
+        description="`ndjson`: one list per line with its lines nested; "
+        "`csv`: one row per line (lists without lines get one empty row).",
+    ),
+):
+    filters = schemas.GroceryFilters(
+        family_id=family_id, date_from=date_from, date_to=date_to
+    )
+    return StreamingResponse(
+        export.stream(filters, format),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="groceries.{format}"'},
+    )
+
+
+# --------------------------------------------------------------------
+# IMPORT
+# --------------------------------------------------------------------
+@api_v1.post(
+    "/import/groceries",
+    response_model=schemas.GroceryImportResult,
+    tags=["Import"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {
+                        "type": "string",
+                        "description": "One GroceryCreate per line; a line may "
+                        "give `item_name` instead of `item_id`.",
+                    }
+                }
+            },
+        }
+    },
+)
+async def import_groceries(
+    request: Request,
+    chunk_size: int = Query(
+        default=imports.CHUNK_SIZE,
+        ge=1,
+        le=5000,
+        description="Lists written per transaction.",
+    ),
+    db: DbSession = Depends(get_db),
+):
+    return await imports.import_groceries(db, request.stream(), chunk_size)
+
+
+# --------------------------------------------------------------------
+# CHANGES
+# --------------------------------------------------------------------
+@api_v1.get("/changes/stream", tags=["Changes"], response_class=StreamingResponse)
+async def stream_changes(
+    last_event_id: Optional[int] = Header(
+        default=None,
+        ge=0,
+        description="Resume after this event id; sent by EventSource on reconnect.",
+    ),
+    since: Optional[int] = Query(
+        default=None,
+        ge=0,
+        description="Same as `Last-Event-ID`, for a first connection that cannot "
+        "set headers. The header wins when both are present.",
+    ),
+    follow: bool = Query(
+        default=True,
+        description="Keep the stream open for new changes; `false` replays the "
+        "backlog after the given id and closes.",
+    ),
+):
+    start = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        changes.stream(changes.get_hub(), start, follow=follow),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 app.include_router(api_v1)
@@ -1,2 +1,3 @@
 #!/bin/sh
-uvicorn main:app --host 0.0.0.0 --port 8000
+# WEB_CONCURRENCY sets the number of worker processes (default 1)
+exec python -m grocery_api.server --host 0.0.0.0 --port 8000
@@ -1,19 +1,50 @@
 import os
 from collections.abc import Generator
 from pathlib import Path
+from typing import Any, List, Tuple
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--async-db",
+        action="store_true",
+        help="Run the suite against the aiosqlite engine and async request path.",
+    )
+    parser.addoption(
+        "--slow",
+        action="store_true",
+        help="Also run tests marked slow (million-row data sets).",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "slow: needs --slow; takes a minute or more")
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: List[pytest.Item]
+) -> None:
+    if config.getoption("--slow"):
+        return
+    skip = pytest.mark.skip(reason="slow; run with --slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
 
 
 @pytest.fixture(scope="session")
 def test_database(
-    tmp_path_factory: pytest.TempPathFactory,
+    tmp_path_factory: pytest.TempPathFactory, pytestconfig: pytest.Config
 ) -> Generator[Path, None, None]:
     """Provide an isolated SQLite database file for tests."""
     data_dir = tmp_path_factory.mktemp("data")
     db_path = data_dir / "test_grocery.db"
-    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    driver = "sqlite+aiosqlite" if pytestconfig.getoption("--async-db") else "sqlite"
+    os.environ["DATABASE_URL"] = f"{driver}:///{db_path}"
     os.environ.setdefault("ALLOWED_ORIGINS", "http://testserver")
     yield db_path
     if db_path.exists():
@@ -27,3 +58,25 @@ def client(test_database: Path) -> Generator[TestClient, None, None]:
 
     with TestClient(app) as test_client:
         yield test_client
+
+
+@pytest.fixture
+def captured_sql(
+    client: TestClient,
+) -> Generator[List[Tuple[str, Any]], None, None]:
+    """Record every (statement, parameters) pair the app executes during a test."""
+    from grocery_api import database
+
+    statements: List[Tuple[str, Any]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    # Streaming endpoints (export, the change feed) run on the sync engine even
+    # when requests use the async one
+    engines = {database.engine, database.request_engine}
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", record)
@@ -1,8 +1,13 @@
+import json
+import threading
 import uuid
+from contextlib import contextmanager, suppress
 from datetime import date, timedelta
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 
 
 def test_root_endpoint_returns_service_health(client: TestClient) -> None:
@@ -194,3 +199,2157 @@ def test_items_endpoint_should_respect_limit(client: TestClient) -> None:
     response = client.get("/api/v1/items", params={"limit": 1})
     assert response.status_code == 200
     assert len(response.json()) <= 1
+
+
+def test_item_search_should_autocomplete_by_prefix_word_and_typo(
+    client: TestClient,
+) -> None:
+    """User types part of an item name, or misspells it, and gets suggestions."""
+    import random
+    import string
+
+    tag = "".join(random.choices(string.ascii_lowercase, k=10))
+    types = [t["id"] for t in client.get("/api/v1/item_types").json()[:2]]
+
+    def create(name: str, item_type_id: int) -> int:
+        response = client.post(
+            "/api/v1/items", json={"name": name, "item_type_id": item_type_id}
+        )
+        assert response.status_code == 200
+        return response.json()["id"]
+
+    apples = create(f"{tag.title()} apples", types[0])
+    green = create(f"Green {tag}", types[1])
+    jam = create(f"{tag}berry jam", types[1])
+
+    def search(q: str, **params: Any) -> List[int]:
+        response = client.get("/api/v1/items/search", params={"q": q, **params})
+        assert response.status_code == 200
+        return [item["id"] for item in response.json()]
+
+    # Whole-name prefixes in name order, then names with a later matching word
+    assert search(tag[:5]) == [apples, jam, green]
+    assert search(f"APP {tag[:5]}") == [apples]
+    assert search(tag[:5], item_type_id=types[1]) == [jam, green]
+    assert search(tag[:5], limit=1) == [apples]
+    typo = tag[:4] + ("a" if tag[4] != "a" else "b") + tag[5:]
+    assert {apples, green} <= set(search(typo))
+    assert search(f"{typo} apples") == [apples]
+
+    response = client.get("/api/v1/items/search", params={"q": tag})
+    assert response.json()[0] == {
+        "name": f"{tag.title()} apples",
+        "item_type_id": types[0],
+        "id": apples,
+        "created_at": response.json()[0]["created_at"],
+        "item_type": client.get("/api/v1/item_types").json()[0],
+    }
+    etag = response.headers["etag"]
+    cached = client.get(
+        "/api/v1/items/search", params={"q": tag}, headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+
+    # A new item is searchable at once, and the old ETag no longer matches
+    zest = create(f"{tag} zest", types[0])
+    assert search(tag) == [apples, zest, jam, green]
+    assert (
+        client.get("/api/v1/items/search", params={"q": "q", "limit": 0}).status_code
+        == 422
+    )
+
+
+def test_catalog_endpoints_should_not_load_purchase_history(
+    client: TestClient, captured_sql: List[Tuple[str, Any]]
+) -> None:
+    """User browses the catalog without the API touching grocery history."""
+    assert client.get("/api/v1/items").status_code == 200
+    assert client.get("/api/v1/item_types").status_code == 200
+
+    statements = [statement for statement, _ in captured_sql]
+    assert not any("grocery_items" in statement for statement in statements)
+    assert not any("groceries" in statement for statement in statements)
+
+
+def test_catalog_reads_should_be_served_from_the_snapshot(
+    client: TestClient, captured_sql: List[Tuple[str, Any]]
+) -> None:
+    """User browses the catalog repeatedly without any database round trips."""
+    client.get("/api/v1/items")
+    captured_sql.clear()
+
+    items = client.get("/api/v1/items", params={"expand": ""}).json()
+    item_types = client.get("/api/v1/item_types").json()
+
+    assert captured_sql == []
+    assert items[0]["item_type"] is None
+    assert {t["id"] for t in item_types} >= {item["item_type_id"] for item in items}
+
+
+def test_catalog_snapshot_should_pick_up_new_items_and_other_workers_changes(
+    client: TestClient,
+) -> None:
+    """User adds an item and sees it, even if another worker wrote the catalog."""
+    from grocery_api import catalog, database, invalidation, models
+
+    type_id = client.get("/api/v1/item_types").json()[0]["id"]
+    name = f"Kombucha-{uuid.uuid4()}"
+    created = client.post("/api/v1/items", json={"name": name, "item_type_id": type_id})
+    assert created.status_code == 200
+    assert created.json()["item_type"]["id"] == type_id
+
+    def all_item_names() -> List[str]:
+        names: List[str] = []
+        cursor = None
+        while True:
+            params: Dict[str, Any] = {"limit": 100, "expand": ""}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/v1/items", params=params)
+            names.extend(item["name"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return names
+
+    assert name in all_item_names()
+
+    # Simulate another worker: write behind this process's back, then signal.
+    other_name = f"Kefir-{uuid.uuid4()}"
+    with database.SessionLocal() as db:
+        db.add(models.Item(name=other_name, item_type_id=type_id))
+        db.commit()
+    assert other_name not in all_item_names()
+    invalidation.bump(catalog.CHANNEL)
+    assert other_name in all_item_names()
+
+
+def test_grocery_expand_should_embed_nested_objects_only_on_request(
+    client: TestClient,
+) -> None:
+    """User gets nested item types by default and can trim the embedding."""
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    grocery: Dict[str, Any] = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [{"item_id": item_id, "quantity": 1, "purchased": False}],
+        },
+    ).json()
+    url = f"/api/v1/groceries/{grocery['id']}"
+
+    default_line = client.get(url).json()["grocery_items"][0]
+    assert default_line["item"]["id"] == item_id
+    assert default_line["item"]["item_type"]["id"] > 0
+
+    items_only = client.get(url, params={"expand": "grocery_items.item"})
+    assert items_only.json()["grocery_items"][0]["item"]["item_type"] is None
+
+    bare = client.get(url, params={"expand": ""}).json()
+    assert len(bare["grocery_items"]) == 1
+    assert bare["grocery_items"][0]["item"] is None
+
+
+def test_unknown_expand_path_should_return_bad_request(client: TestClient) -> None:
+    """User asks to embed a relationship the endpoint does not offer."""
+    response = client.get("/api/v1/items", params={"expand": "grocery_items"})
+
+    assert response.status_code == 400
+    assert "Unknown expand path" in response.json()["detail"]
+
+
+def test_cursor_pagination_should_walk_every_grocery_exactly_once(
+    client: TestClient,
+) -> None:
+    """User pages through groceries by cursor and sees each list once, in order."""
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    same_day = (date.today() + timedelta(days=30)).isoformat()
+    for _ in range(5):
+        client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": 1,
+                "grocery_date": same_day,
+                "grocery_items": [
+                    {"item_id": item_id, "quantity": 1, "purchased": False}
+                ],
+            },
+        )
+
+    seen: List[Tuple[str, int]] = []
+    cursor = None
+    while True:
+        params: Dict[str, Any] = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/groceries", params=params)
+        assert response.status_code == 200
+        seen.extend((g["grocery_date"], g["id"]) for g in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert seen == sorted(seen)
+    by_offset = client.get("/api/v1/groceries", params={"limit": 100}).json()
+    assert seen == [(g["grocery_date"], g["id"]) for g in by_offset]
+
+
+def test_cursor_pagination_should_reject_malformed_cursor(
+    client: TestClient,
+) -> None:
+    """User sends a tampered cursor and gets a 400 instead of a server error."""
+    response = client.get("/api/v1/grocery_items", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor."
+
+
+def test_grocery_filters_should_return_only_matching_lists(client: TestClient) -> None:
+    """User narrows groceries to one household, a date range and open lines."""
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    family_id = 7_000 + uuid.uuid4().int % 1_000
+    trip_day = date(2023, 3, 14)
+
+    def create(day: date, purchased: bool) -> int:
+        return client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": family_id,
+                "grocery_date": day.isoformat(),
+                "grocery_items": [
+                    {"item_id": item_id, "quantity": 1, "purchased": purchased}
+                ],
+            },
+        ).json()["id"]
+
+    open_trip = create(trip_day, purchased=False)
+    done_trip = create(trip_day, purchased=True)
+    create(trip_day - timedelta(days=60), purchased=False)
+
+    params = {
+        "family_id": family_id,
+        "date_from": (trip_day - timedelta(days=7)).isoformat(),
+        "date_to": trip_day.isoformat(),
+    }
+    in_range = client.get("/api/v1/groceries", params=params).json()
+    assert [g["id"] for g in in_range] == [open_trip, done_trip]
+
+    still_open = client.get(
+        "/api/v1/groceries", params={**params, "purchased": "false"}
+    ).json()
+    assert [g["id"] for g in still_open] == [open_trip]
+
+    open_lines = client.get(
+        "/api/v1/grocery_items", params={**params, "purchased": "false"}
+    ).json()
+    assert [line["grocery_id"] for line in open_lines] == [open_trip]
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/api/v1/groceries", {"family_id": 1}),
+        ("/api/v1/groceries", {"date_from": "2023-01-01", "date_to": "2023-12-31"}),
+        ("/api/v1/groceries", {"purchased": "false"}),
+        ("/api/v1/grocery_items", {"family_id": 1}),
+        ("/api/v1/grocery_items", {"date_from": "2023-01-01"}),
+        ("/api/v1/grocery_items", {"purchased": "true"}),
+    ],
+)
+def test_grocery_filters_should_be_served_by_indexes(
+    client: TestClient,
+    captured_sql: List[Tuple[str, Any]],
+    path: str,
+    params: Dict[str, Any],
+) -> None:
+    """Every filter is answered through an index, never a full table scan."""
+    from grocery_api import database
+
+    assert client.get(path, params=params).status_code == 200
+
+    executed = list(captured_sql)
+    assert executed
+    tables = set(database.Base.metadata.tables)
+    with database.engine.connect() as conn:
+        for statement, parameters in executed:
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            ).all()
+            for detail in (row[-1] for row in plan):
+                # Scanning a LIMITed subquery (e.g. a page validator) is bounded
+                scans_table = detail.split(" ")[1] in tables
+                is_full_scan = detail.startswith("SCAN ") and " USING " not in detail
+                assert not (scans_table and is_full_scan), f"{detail} in {statement}"
+
+
+def test_sqlite_connections_should_use_the_production_profile(
+    client: TestClient,
+) -> None:
+    """Every pooled connection runs with WAL, FK enforcement and a busy timeout."""
+    from grocery_api import database
+
+    settings = database.sqlite_settings(database.engine)
+
+    assert settings["journal_mode"] == "wal"
+    assert settings["foreign_keys"] == 1
+    assert settings["synchronous"] == 1
+    assert settings["busy_timeout"] == 5000
+
+
+def test_create_grocery_with_unknown_item_should_return_bad_request(
+    client: TestClient,
+) -> None:
+    """User submits a list referencing a missing product and the FK rejects it."""
+    response = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [{"item_id": 999_999, "quantity": 1, "purchased": False}],
+        },
+    )
+
+    assert response.status_code == 400
+    assert "invalid products" in response.json()["detail"]
+
+
+def test_batch_endpoints_should_apply_lines_in_one_commit_and_report_each(
+    client: TestClient, captured_sql: List[Tuple[str, Any]]
+) -> None:
+    """User checks off a whole trip in one request and gets per-line results."""
+    item_ids = [item["id"] for item in client.get("/api/v1/items").json()[:3]]
+    grocery: Dict[str, Any] = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [{"item_id": item_ids[0], "quantity": 1}],
+        },
+    ).json()
+    existing_line = grocery["grocery_items"][0]["id"]
+
+    from grocery_api import database
+
+    commits: List[int] = []
+
+    def record_commit(conn) -> None:
+        commits.append(1)
+
+    event.listen(database.request_engine, "commit", record_commit)
+    captured_sql.clear()
+    created = client.post(
+        f"/api/v1/groceries/{grocery['id']}/items:batch",
+        json={
+            "create": [
+                {"item_id": item_ids[1], "quantity": 2},
+                {"item_id": 999_999},
+                {"item_id": item_ids[2], "purchased": True},
+            ],
+            "update": [{"id": existing_line, "quantity": 5}],
+        },
+    )
+    assert created.status_code == 200
+    results = created.json()["results"]
+    assert [(r["op"], r["index"], r["status"]) for r in results] == [
+        ("create", 0, "created"),
+        ("create", 1, "invalid"),
+        ("create", 2, "created"),
+        ("update", 0, "updated"),
+    ]
+    assert results[0]["grocery_item"]["item"]["id"] == item_ids[1]
+    assert results[3]["grocery_item"]["quantity"] == 5
+    event.remove(database.request_engine, "commit", record_commit)
+    assert len(commits) == 1
+    # Statement count is fixed per batch, not per line
+    assert len(captured_sql) <= 12
+
+    new_lines = [r["id"] for r in results if r["status"] == "created"]
+    patched = client.patch(
+        "/api/v1/grocery_items:batch",
+        json={
+            "update": [{"id": line_id, "purchased": True} for line_id in new_lines],
+            "delete": [existing_line, 999_999],
+        },
+    )
+    assert patched.status_code == 200
+    statuses = [(r["op"], r["status"]) for r in patched.json()["results"]]
+    assert statuses == [
+        ("update", "updated"),
+        ("update", "updated"),
+        ("delete", "deleted"),
+        ("delete", "not_found"),
+    ]
+
+    lines = client.get(f"/api/v1/groceries/{grocery['id']}/items").json()
+    assert sorted(line["id"] for line in lines) == sorted(new_lines)
+    assert all(line["purchased"] for line in lines)
+
+
+def test_batch_for_missing_grocery_should_return_not_found(client: TestClient) -> None:
+    """User posts a batch to a list that no longer exists."""
+    response = client.post(
+        "/api/v1/groceries/999999/items:batch", json={"create": [{"item_id": 1}]}
+    )
+
+    assert response.status_code == 404
+
+
+def test_unchanged_grocery_should_return_not_modified(
+    client: TestClient, captured_sql: List[Tuple[str, Any]]
+) -> None:
+    """User revalidates a list and only re-downloads it once a line changed."""
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    grocery: Dict[str, Any] = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [{"item_id": item_id, "quantity": 1, "purchased": False}],
+        },
+    ).json()
+    url = f"/api/v1/groceries/{grocery['id']}"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert etag.startswith('"')
+
+    captured_sql.clear()
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    # Only the version lookup ran; the list and its lines were never loaded
+    assert len(captured_sql) == 1
+
+    line_id = grocery["grocery_items"][0]["id"]
+    client.patch(f"/api/v1/grocery_items/{line_id}", json={"purchased": True})
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["grocery_items"][0]["purchased"] is True
+
+    expanded = client.get(url, params={"expand": ""})
+    assert expanded.headers["ETag"] != changed.headers["ETag"]
+
+
+def test_collection_etags_should_follow_page_contents(client: TestClient) -> None:
+    """User revalidates list pages and item lines after edits elsewhere."""
+    family_id = 700_000 + uuid.uuid4().int % 100_000
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+
+    def create_list() -> Dict[str, Any]:
+        return client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": family_id,
+                "grocery_date": date.today().isoformat(),
+                "grocery_items": [{"item_id": item_id}],
+            },
+        ).json()
+
+    grocery = create_list()
+    params = {"family_id": family_id}
+    etag = client.get("/api/v1/groceries", params=params).headers["ETag"]
+    lines_etag = client.get("/api/v1/grocery_items", params=params).headers["ETag"]
+
+    headers = {"If-None-Match": etag}
+    assert (
+        client.get("/api/v1/groceries", params=params, headers=headers).status_code
+        == 304
+    )
+
+    create_list()
+    grown = client.get("/api/v1/groceries", params=params, headers=headers)
+    assert grown.status_code == 200
+    assert len(grown.json()) == 2
+    etag = grown.headers["ETag"]
+
+    line_id = grocery["grocery_items"][0]["id"]
+    client.patch(
+        "/api/v1/grocery_items:batch",
+        json={"update": [{"id": line_id, "quantity": 3}]},
+    )
+    edited = client.get(
+        "/api/v1/groceries", params=params, headers={"If-None-Match": etag}
+    )
+    assert edited.status_code == 200
+    lines = client.get(
+        "/api/v1/grocery_items", params=params, headers={"If-None-Match": lines_etag}
+    )
+    assert lines.status_code == 200
+
+    client.delete(f"/api/v1/groceries/{grocery['id']}")
+    shrunk = client.get(
+        "/api/v1/groceries",
+        params=params,
+        headers={"If-None-Match": edited.headers["ETag"]},
+    )
+    assert shrunk.status_code == 200
+    assert len(shrunk.json()) == 1
+
+
+def test_catalog_etag_should_change_when_items_are_added(client: TestClient) -> None:
+    """User's cached catalog stays valid until someone adds a product."""
+    etag = client.get("/api/v1/items").headers["ETag"]
+    headers = {"If-None-Match": etag}
+    assert client.get("/api/v1/items", headers=headers).status_code == 304
+
+    item_type_id = client.get("/api/v1/item_types").json()[0]["id"]
+    client.post(
+        "/api/v1/items",
+        json={"name": f"Etag-{uuid.uuid4()}", "item_type_id": item_type_id},
+    )
+    assert client.get("/api/v1/items", headers=headers).status_code == 200
+
+
+def test_ensure_schema_should_add_version_columns_to_existing_tables(
+    tmp_path,
+) -> None:
+    """Databases created before row versions existed are upgraded in place."""
+    from sqlalchemy import create_engine, inspect
+
+    from grocery_api.migrations import ensure_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE groceries (id INTEGER PRIMARY KEY, family_id INTEGER "
+            "NOT NULL, grocery_date DATE NOT NULL, created_at DATETIME NOT NULL)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO groceries VALUES (1, 1, '2024-01-01', '2024-01-01 00:00:00')"
+        )
+
+    ensure_schema(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("groceries")}
+    assert {"version", "updated_at"} <= columns
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT version FROM groceries").scalar() == 0
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "expand", [None, "", "grocery_items.item.item_type", "grocery_items"]
+)
+def test_grocery_list_fast_path_should_match_response_model_bytes(
+    client: TestClient, expand: Any
+) -> None:
+    """User gets byte-identical list JSON from the Core/orjson read path."""
+    from pydantic import TypeAdapter
+
+    from grocery_api import crud, database, schemas
+
+    family_id = 800_000 + uuid.uuid4().int % 100_000
+    item_ids = [item["id"] for item in client.get("/api/v1/items").json()[:3]]
+    for offset in range(3):
+        client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": family_id,
+                "grocery_date": (date.today() + timedelta(days=offset)).isoformat(),
+                "grocery_items": [
+                    {"item_id": item_id, "quantity": offset + 1, "purchased": True}
+                    for item_id in item_ids[offset:]
+                ],
+            },
+        )
+    params: Dict[str, Any] = {"family_id": family_id, "limit": 2}
+    if expand is not None:
+        params["expand"] = expand
+    filters = schemas.GroceryFilters(family_id=family_id)
+    expand_set = None if expand is None else {p for p in expand.split(",") if p}
+
+    groceries = client.get("/api/v1/groceries", params=params)
+    lines = client.get(
+        "/api/v1/grocery_items",
+        params={**params, "expand": "item" if expand else ""},
+    )
+
+    def reference(read, schema, **kwargs) -> Tuple[bytes, Any]:
+        # What FastAPI does with a response_model: validate, then dump. Each
+        # read gets a fresh session so nothing loaded earlier leaks in.
+        adapter = TypeAdapter(list[schema])
+        with database.SessionLocal() as db:
+            page = read(db, limit=2, filters=filters, **kwargs)
+            return adapter.dump_json(adapter.validate_python(page.items)), page
+
+    expected, grocery_page = reference(
+        crud.get_groceries, schemas.Grocery, expand=expand_set
+    )
+    expected_lines, line_page = reference(
+        crud.get_grocery_items,
+        schemas.GroceryItem,
+        expand={"item"} if expand else set(),
+    )
+    assert groceries.headers["content-type"] == "application/json"
+    assert groceries.content == expected
+    assert groceries.headers["X-Next-Cursor"] == grocery_page.next_cursor
+    assert lines.content == expected_lines
+    assert lines.headers["X-Next-Cursor"] == line_page.next_cursor
+
+
+def _line_body(item_id: int, **fields: Any) -> Dict[str, Any]:
+    return {"item_id": item_id, "quantity": 1, "purchased": False, **fields}
+
+
+# (method, path, body, statements) with the list's id as {grocery}, its first
+# line's as {line}, its family's as {family}, a list with a recurrence as
+# {recurring}, the change log head before the list was created as {since} and
+# catalog item ids as {items}. A body returning bytes is sent as NDJSON. Every write that changes a
+# row includes one INSERT into the change log, and writes that change what a
+# family bought one upsert per summary table they shift. Writes that read the
+# rows they replace first take the write lock with one no-op UPDATE.
+QUERY_BUDGETS = [
+    ("GET", "/", None, 0),
+    ("GET", "/api/v1/item_types", None, 0),
+    ("POST", "/api/v1/item_types", lambda ids: {"name": f"T-{uuid.uuid4()}"}, 1),
+    ("GET", "/api/v1/items", None, 0),
+    ("GET", "/api/v1/items/search?q=mil", None, 0),
+    (
+        "POST",
+        "/api/v1/items",
+        lambda ids: {"name": f"I-{uuid.uuid4()}", "item_type_id": ids["item_type"]},
+        1,
+    ),
+    ("GET", "/api/v1/groceries", None, 3),
+    (
+        "POST",
+        "/api/v1/groceries",
+        lambda ids: {
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [_line_body(item_id) for item_id in ids["items"]],
+        },
+        6,
+    ),
+    ("GET", "/api/v1/groceries/{grocery}", None, 5),
+    ("PUT", "/api/v1/groceries/{grocery}", lambda ids: {"family_id": 2}, 7),
+    ("DELETE", "/api/v1/groceries/{grocery}", None, 7),
+    ("GET", "/api/v1/groceries/{grocery}/suggestions", None, 3),
+    (
+        "POST",
+        "/api/v1/groceries/{grocery}/clone",
+        lambda ids: {"grocery_date": date.today().isoformat()},
+        6,
+    ),
+    (
+        "PUT",
+        "/api/v1/groceries/{grocery}/recurrence",
+        lambda ids: {"next_date": date.today().isoformat()},
+        2,
+    ),
+    ("GET", "/api/v1/groceries/{recurring}/recurrence", None, 1),
+    ("DELETE", "/api/v1/groceries/{recurring}/recurrence", None, 1),
+    ("GET", "/api/v1/grocery_items", None, 2),
+    ("GET", "/api/v1/groceries/{grocery}/items", None, 4),
+    (
+        "POST",
+        "/api/v1/groceries/{grocery}/items",
+        lambda ids: _line_body(ids["items"][1]),
+        7,
+    ),
+    (
+        "POST",
+        "/api/v1/groceries/{grocery}/items:batch",
+        lambda ids: {
+            "create": [_line_body(item_id) for item_id in ids["items"]],
+            "update": [{"id": ids["line"], "quantity": 2}],
+        },
+        12,
+    ),
+    (
+        "PATCH",
+        "/api/v1/grocery_items:batch",
+        lambda ids: {"update": [{"id": ids["line"], "purchased": True}]},
+        7,
+    ),
+    ("PUT", "/api/v1/grocery_items/{line}", lambda ids: {"quantity": 3}, 7),
+    ("PATCH", "/api/v1/grocery_items/{line}", lambda ids: {"purchased": True}, 6),
+    ("DELETE", "/api/v1/grocery_items/{line}", None, 7),
+    ("GET", "/api/v1/families/{family}/summary", None, 2),
+    ("GET", "/api/v1/export/groceries?family_id={family}", None, 1),
+    (
+        "POST",
+        "/api/v1/import/groceries",
+        lambda ids: json.dumps(
+            {
+                "family_id": ids["family"],
+                "grocery_date": date.today().isoformat(),
+                "grocery_items": [_line_body(ids["items"][0])],
+            }
+        ).encode(),
+        7,
+    ),
+    ("GET", "/api/v1/changes/stream?follow=false&since={since}", None, 2),
+]
+
+
+@pytest.mark.parametrize(
+    "method, path, body, statements",
+    QUERY_BUDGETS,
+    ids=[f"{method} {path}" for method, path, _, _ in QUERY_BUDGETS],
+)
+def test_every_endpoint_should_stay_within_its_query_budget(
+    client: TestClient,
+    captured_sql: List[Tuple[str, Any]],
+    method: str,
+    path: str,
+    body: Any,
+    statements: int,
+) -> None:
+    """Each request issues a fixed number of statements, whatever the data size."""
+    items = client.get("/api/v1/items").json()[:3]
+    family_id = uuid.uuid4().int % 10**9 + 1000
+    since = _change_head()
+    grocery: Dict[str, Any] = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": family_id,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [_line_body(items[0]["id"])],
+        },
+    ).json()
+    ids: Dict[str, Any] = {
+        "grocery": grocery["id"],
+        "line": grocery["grocery_items"][0]["id"],
+        "family": family_id,
+        "since": since,
+        "items": [item["id"] for item in items],
+        "item_type": items[0]["item_type_id"],
+    }
+    if "{recurring}" in path:
+        ids["recurring"] = client.post(
+            f"/api/v1/groceries/{grocery['id']}/clone",
+            json={"grocery_date": date.today().isoformat()},
+        ).json()["id"]
+        client.put(
+            f"/api/v1/groceries/{ids['recurring']}/recurrence",
+            json={"next_date": (date.today() + timedelta(days=7)).isoformat()},
+        ).raise_for_status()
+
+    payload = body(ids) if body else None
+    captured_sql.clear()
+    if isinstance(payload, bytes):
+        response = client.request(
+            method,
+            path.format(**ids),
+            content=payload,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    else:
+        response = client.request(method, path.format(**ids), json=payload)
+
+    assert response.status_code == 200, response.text
+    executed = [statement for statement, _ in captured_sql]
+    assert len(executed) == statements, executed
+
+
+def test_every_endpoint_should_have_a_query_budget(client: TestClient) -> None:
+    """A new route fails here until it is added to QUERY_BUDGETS."""
+    from fastapi.routing import APIRoute
+
+    from main import api_v1
+
+    budgeted = [
+        (method, path.split("?")[0].format(grocery=1, line=1, family=1, recurring=1))
+        for method, path, _, _ in QUERY_BUDGETS
+    ]
+    missing = [
+        f"{method} {route.path}"
+        for route in api_v1.routes
+        if isinstance(route, APIRoute)
+        for method in sorted(route.methods or ())
+        if not any(
+            budget_method == method and route.path_regex.match(budget_path)
+            for budget_method, budget_path in budgeted
+        )
+    ]
+    assert missing == []
+
+
+def test_unchanged_write_should_keep_the_version(client: TestClient) -> None:
+    """User re-sends a line's current state and cached copies stay valid."""
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    grocery: Dict[str, Any] = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [_line_body(item_id)],
+        },
+    ).json()
+    url = f"/api/v1/groceries/{grocery['id']}"
+    etag = client.get(url).headers["ETag"]
+    line_id = grocery["grocery_items"][0]["id"]
+
+    unchanged = client.patch(f"/api/v1/grocery_items/{line_id}", json={"quantity": 1})
+    assert unchanged.status_code == 200
+    assert unchanged.json()["quantity"] == 1
+    assert client.put(url, json={"family_id": 1}).status_code == 200
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    bad_update = client.put(url, json={"family_id": None})
+    assert bad_update.status_code == 400
+    missing_line = client.patch("/api/v1/grocery_items/999999", json={"quantity": 2})
+    assert missing_line.status_code == 404
+
+
+def test_writes_should_take_versions_above_every_existing_row(
+    client: TestClient,
+) -> None:
+    """User edits an old list and its version still moves past every other list."""
+    from grocery_api import crud, database, models
+
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    first, second = (
+        client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": 1,
+                "grocery_date": date.today().isoformat(),
+                "grocery_items": [_line_body(item_id)],
+            },
+        ).json()
+        for _ in range(2)
+    )
+
+    def version(grocery_id: int) -> Optional[int]:
+        with database.SessionLocal() as db:
+            return crud.grocery_version(db, grocery_id)
+
+    before, after = version(first["id"]), version(second["id"])
+    assert before is not None and after is not None and after > before
+
+    # Versions come from the table, not a clock: they go past whatever is there
+    with database.SessionLocal() as db:
+        db.query(models.Grocery).filter(models.Grocery.id == second["id"]).update(
+            {"version": 10**15}, synchronize_session=False
+        )
+        db.commit()
+    line_id = first["grocery_items"][0]["id"]
+    assert (
+        client.patch(f"/api/v1/grocery_items/{line_id}", json={"quantity": 3})
+    ).status_code == 200
+    assert version(first["id"]) == 10**15 + 1
+
+
+def _summary_problems() -> List[str]:
+    from grocery_api import database, summaries
+
+    with database.SessionLocal() as db:
+        return summaries.check(db)
+
+
+def test_family_summary_should_track_every_write_incrementally(
+    client: TestClient,
+) -> None:
+    """Household views its shopping report as lists and lines change."""
+    family_id = uuid.uuid4().int % 10**9 + 1000
+    item_ids = [item["id"] for item in client.get("/api/v1/items").json()[:3]]
+    monday = date(2024, 5, 6)
+    assert client.get(f"/api/v1/families/{family_id}/summary").status_code == 404
+
+    first = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": family_id,
+            "grocery_date": (monday + timedelta(days=2)).isoformat(),
+            "grocery_items": [
+                {"item_id": item_ids[0], "quantity": 2, "purchased": True},
+                {"item_id": item_ids[1], "quantity": 1, "purchased": False},
+            ],
+        },
+    ).json()
+    second = client.post(
+        "/api/v1/groceries",
+        json={"family_id": family_id, "grocery_date": monday.isoformat()},
+    ).json()
+    client.post(
+        f"/api/v1/groceries/{second['id']}/items",
+        json=_line_body(item_ids[0], quantity=3),
+    )
+    line_id = first["grocery_items"][1]["id"]
+    client.patch(f"/api/v1/grocery_items/{line_id}", json={"purchased": True})
+    client.post(
+        f"/api/v1/groceries/{second['id']}/items:batch",
+        json={"create": [_line_body(item_ids[2])]},
+    )
+    assert _summary_problems() == []
+
+    summary = client.get(f"/api/v1/families/{family_id}/summary").json()
+    assert summary["groceries"] == 2
+    assert summary["lines"] == 4
+    assert summary["purchased_lines"] == 2
+    assert summary["quantity"] == 7
+    assert summary["items_per_trip"] == 2.0
+    assert summary["completion_rate"] == 0.5
+    assert summary["top_items"][0] == {
+        "item_id": item_ids[0],
+        "name": client.get("/api/v1/items").json()[0]["name"],
+        "lines": 2,
+        "quantity": 5,
+    }
+    assert [week["week"] for week in summary["weeks"]] == [monday.isoformat()]
+
+    # Moving a list to another week and deleting rows adjusts the same totals
+    next_week = (monday + timedelta(days=7)).isoformat()
+    client.put(f"/api/v1/groceries/{second['id']}", json={"grocery_date": next_week})
+    client.delete(f"/api/v1/grocery_items/{first['grocery_items'][0]['id']}")
+    assert _summary_problems() == []
+    summary = client.get(f"/api/v1/families/{family_id}/summary?weeks=1").json()
+    assert (summary["groceries"], summary["lines"], summary["quantity"]) == (2, 3, 5)
+    assert [week["week"] for week in summary["weeks"]] == [next_week]
+
+    client.delete(f"/api/v1/groceries/{first['id']}")
+    client.delete(f"/api/v1/groceries/{second['id']}")
+    assert _summary_problems() == []
+    assert client.get(f"/api/v1/families/{family_id}/summary").status_code == 404
+
+
+@contextmanager
+def _concurrent_write_after(prefix: str, write: Callable[[], Any]) -> Iterator[None]:
+    """Run `write` on another thread right after this thread issues a statement
+    starting with `prefix`, and let it commit (if it can) before going on."""
+    from grocery_api import database
+
+    caller = threading.get_ident()
+    threads: List[threading.Thread] = []
+
+    def interleave(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() != caller or threads:
+            return
+        if statement.startswith(prefix):
+            threads.append(threading.Thread(target=write))
+            threads[0].start()
+            # Returns at once unless this thread holds the write lock
+            threads[0].join(timeout=0.5)
+
+    event.listen(database.engine, "after_cursor_execute", interleave)
+    try:
+        yield
+    finally:
+        event.remove(database.engine, "after_cursor_execute", interleave)
+        for thread in threads:
+            thread.join()
+    assert threads, f"no statement started with {prefix!r}"
+
+
+def test_summaries_should_stay_exact_when_writes_interleave(
+    client: TestClient,
+) -> None:
+    """Two users edit the same line at once and the report still adds up."""
+    from grocery_api import crud, database, schemas
+
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    grocery = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": uuid.uuid4().int % 10**9 + 1000,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [_line_body(item_id)],
+        },
+    ).json()
+    line_id = grocery["grocery_items"][0]["id"]
+
+    def set_quantity(quantity: int) -> None:
+        with database.SessionLocal() as db:
+            update = schemas.GroceryItemUpdate(quantity=quantity)
+            crud.update_grocery_item(db, line_id, update)
+
+    # The other update lands between this one reading the line and writing it
+    with _concurrent_write_after(
+        "SELECT grocery_items.item_id", lambda: set_quantity(2)
+    ):
+        set_quantity(3)
+
+    assert _summary_problems() == []
+    lines = client.get(f"/api/v1/groceries/{grocery['id']}").json()["grocery_items"]
+    assert [line["quantity"] for line in lines] == [2]
+
+
+def test_summary_backfill_should_seed_tables_from_existing_lists(
+    client: TestClient,
+) -> None:
+    """Databases that predate the summaries get them filled in once at startup."""
+    from sqlalchemy import delete
+
+    from grocery_api import database, models, summaries
+
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [_line_body(item_id)],
+        },
+    )
+    with database.SessionLocal() as db:
+        db.execute(delete(models.FamilySummary))
+        db.commit()
+        assert summaries.check(db) != []
+        assert summaries.backfill(db) is True
+        assert summaries.check(db) == []
+        # Populated tables are left to the incremental updates
+        assert summaries.backfill(db) is False
+
+
+def test_suggestions_should_follow_co_occurrence_through_every_write(
+    client: TestClient,
+) -> None:
+    """Shopper is offered what is usually bought with the items on their list."""
+    from sqlalchemy import delete
+
+    from grocery_api import cooccurrence, database, models
+
+    def pairs_problems() -> List[str]:
+        with database.SessionLocal() as db:
+            return cooccurrence.check(db)
+
+    def suggested(grocery_id: int) -> List[Tuple[int, float]]:
+        response = client.get(f"/api/v1/groceries/{grocery_id}/suggestions")
+        assert response.status_code == 200
+        return [(s["item_id"], s["score"]) for s in response.json()]
+
+    type_id = client.get("/api/v1/items").json()[0]["item_type_id"]
+    a, b, c, d = [
+        client.post(
+            "/api/v1/items",
+            json={"name": f"Pair {name} {uuid.uuid4()}", "item_type_id": type_id},
+        ).json()["id"]
+        for name in "ABCD"
+    ]
+
+    def new_list(*item_ids: int) -> Dict[str, Any]:
+        return client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": 1,
+                "grocery_date": date.today().isoformat(),
+                "grocery_items": [_line_body(item_id) for item_id in item_ids],
+            },
+        ).json()
+
+    first, second, third = new_list(a, b, c), new_list(a, b), new_list(a, d)
+    target = new_list(a)
+    assert suggested(target["id"]) == [(b, 0.5), (c, 0.25), (d, 0.25)]
+    assert client.get("/api/v1/groceries/999999999/suggestions").status_code == 404
+    assert suggested(new_list()["id"]) == []
+
+    # Lines change items, repeat one, come and go: the matrix follows each write
+    line_d = third["grocery_items"][1]["id"]
+    client.patch(f"/api/v1/grocery_items/{line_d}", json={"item_id": c})
+    client.delete(f"/api/v1/grocery_items/{first['grocery_items'][1]['id']}")
+    client.post(f"/api/v1/groceries/{second['id']}/items", json=_line_body(a))
+    client.post(
+        f"/api/v1/groceries/{target['id']}/items:batch",
+        json={"create": [_line_body(d)]},
+    )
+    assert pairs_problems() == []
+    # a: 4 lists (b 1, c 2, d 1); d: 1 list (a 1)
+    assert suggested(target["id"]) == [(c, 0.25), (b, 0.125)]
+
+    client.delete(f"/api/v1/groceries/{first['id']}")
+    assert pairs_problems() == []
+
+    # Databases that predate the matrix get it filled in once at startup
+    with database.SessionLocal() as db:
+        db.execute(delete(models.ItemPair))
+        db.commit()
+        assert cooccurrence.check(db) != []
+        assert cooccurrence.backfill(db) is True
+        assert cooccurrence.check(db) == []
+        assert cooccurrence.backfill(db) is False
+
+
+def test_co_occurrence_should_stay_exact_when_a_line_lands_during_a_delete(
+    client: TestClient,
+) -> None:
+    """A line added while its list is being deleted leaves no pair counts behind."""
+    from sqlalchemy.exc import IntegrityError
+
+    from grocery_api import cooccurrence, crud, database, schemas
+
+    first, second = [item["id"] for item in client.get("/api/v1/items").json()[:2]]
+    grocery = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [_line_body(first)],
+        },
+    ).json()
+
+    def add_line() -> None:
+        with database.SessionLocal() as db:
+            try:
+                crud.create_grocery_item(
+                    db, grocery["id"], schemas.GroceryItemCreate(**_line_body(second))
+                )
+            except IntegrityError:
+                pass  # the list was deleted first
+
+    # The line is added between the delete reading the list and removing it
+    with _concurrent_write_after("SELECT groceries.family_id", add_line):
+        with database.SessionLocal() as db:
+            assert crud.delete_grocery(db, grocery["id"]) == grocery["id"]
+
+    with database.SessionLocal() as db:
+        assert cooccurrence.check(db) == []
+    assert _summary_problems() == []
+
+
+def test_clone_should_copy_lines_server_side_and_keep_summaries(
+    client: TestClient,
+) -> None:
+    """Household copies last week's list instead of re-entering every line."""
+    family_id = uuid.uuid4().int % 10**9 + 1000
+    item_ids = [item["id"] for item in client.get("/api/v1/items").json()[:3]]
+    source = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": family_id,
+            "grocery_date": "2024-05-06",
+            "grocery_items": [
+                _line_body(item_ids[0], quantity=2, purchased=True),
+                _line_body(item_ids[1]),
+                _line_body(item_ids[2], quantity=3, purchased=True),
+            ],
+        },
+    ).json()
+
+    cloned = client.post(
+        f"/api/v1/groceries/{source['id']}/clone", json={"grocery_date": "2024-05-13"}
+    )
+    assert cloned.status_code == 200
+    copy = cloned.json()
+    assert copy["id"] != source["id"]
+    assert (copy["family_id"], copy["grocery_date"]) == (family_id, "2024-05-13")
+    assert [
+        (line["item_id"], line["quantity"], line["purchased"], line["item"]["id"])
+        for line in copy["grocery_items"]
+    ] == [
+        (item_ids[0], 2, False, item_ids[0]),
+        (item_ids[1], 1, False, item_ids[1]),
+        (item_ids[2], 3, False, item_ids[2]),
+    ]
+    assert client.get(f"/api/v1/groceries/{copy['id']}").json() == copy
+
+    kept = client.post(
+        f"/api/v1/groceries/{source['id']}/clone",
+        json={"grocery_date": "2024-05-20", "family_id": 2, "reset_purchased": False},
+    ).json()
+    assert kept["family_id"] == 2
+    assert [line["purchased"] for line in kept["grocery_items"]] == [True, False, True]
+    assert _summary_problems() == []
+    assert client.get(f"/api/v1/families/{family_id}/summary").json()["lines"] == 6
+
+    missing = client.post(
+        "/api/v1/groceries/999999999/clone", json={"grocery_date": "2024-05-13"}
+    )
+    assert missing.status_code == 404
+
+
+def test_recurring_list_should_be_cloned_once_per_occurrence(
+    client: TestClient,
+) -> None:
+    """A weekly template turns into one new list per week, whoever runs it."""
+    from grocery_api import crud, database
+
+    family_id = uuid.uuid4().int % 10**9 + 1000
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    template = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": family_id,
+            "grocery_date": "2024-05-06",
+            "grocery_items": [_line_body(item_id, purchased=True)],
+        },
+    ).json()
+    url = f"/api/v1/groceries/{template['id']}/recurrence"
+    assert client.get(url).status_code == 404
+    assert (
+        client.put(
+            "/api/v1/groceries/999999999/recurrence", json={"next_date": "2024-05-13"}
+        ).status_code
+        == 404
+    )
+    assert client.put(url, json={"next_date": "2024-05-13"}).json() == {
+        "grocery_id": template["id"],
+        "every_days": 7,
+        "next_date": "2024-05-13",
+        "reset_purchased": True,
+    }
+
+    def lists() -> List[Tuple[str, bool]]:
+        rows = client.get(f"/api/v1/groceries?family_id={family_id}").json()
+        return [
+            (row["grocery_date"], row["grocery_items"][0]["purchased"]) for row in rows
+        ]
+
+    with database.SessionLocal() as db:
+        assert crud.run_due_recurrences(db, date(2024, 5, 12)) == []
+        assert len(crud.run_due_recurrences(db, date(2024, 5, 13))) == 1
+        # Already cloned for this week
+        assert crud.run_due_recurrences(db, date(2024, 5, 19)) == []
+    assert lists() == [("2024-05-06", True), ("2024-05-13", False)]
+    assert client.get(url).json()["next_date"] == "2024-05-20"
+
+    # After a gap, only the latest occurrence is created
+    with database.SessionLocal() as db:
+        assert len(crud.run_due_recurrences(db, date(2024, 6, 5))) == 1
+    assert lists()[-1] == ("2024-06-03", False)
+    assert client.get(url).json()["next_date"] == "2024-06-10"
+
+    changed = client.put(url, json={"next_date": "2024-07-01", "every_days": 14})
+    assert changed.json()["every_days"] == 14
+    assert client.delete(url).json() == {"status": "deleted"}
+    assert client.delete(url).status_code == 404
+    with database.SessionLocal() as db:
+        assert crud.run_due_recurrences(db, date(2024, 7, 1)) == []
+
+
+def test_idempotency_key_should_replay_retries_without_creating_duplicates(
+    client: TestClient,
+) -> None:
+    """A phone on a flaky network retries its POST; only one list is created."""
+    family_id = uuid.uuid4().int % 10**9 + 1000
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    body = {
+        "family_id": family_id,
+        "grocery_date": "2024-05-06",
+        "grocery_items": [_line_body(item_id, quantity=2)],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    first = client.post("/api/v1/groceries", json=body, headers=headers)
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    retry = client.post("/api/v1/groceries", json=body, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.content == first.content
+    assert retry.headers["content-type"] == first.headers["content-type"]
+    assert len(client.get(f"/api/v1/groceries?family_id={family_id}").json()) == 1
+
+    # The same key on a different request is a client bug, not a retry
+    changed = client.post(
+        "/api/v1/groceries", json={**body, "family_id": 2}, headers=headers
+    )
+    assert changed.status_code == 422
+    elsewhere = client.post(
+        f"/api/v1/groceries/{first.json()['id']}/items",
+        json=_line_body(item_id),
+        headers=headers,
+    )
+    assert elsewhere.status_code == 422
+
+    # Errors from validation are replayed too; a fresh key runs the route again
+    line_headers = {"Idempotency-Key": str(uuid.uuid4())}
+    url = f"/api/v1/groceries/{first.json()['id']}/items"
+    bad = client.post(url, json={"quantity": 1}, headers=line_headers)
+    assert bad.status_code == 422
+    assert client.post(url, json={"quantity": 1}, headers=line_headers).content == (
+        bad.content
+    )
+    assert (
+        client.post("/api/v1/groceries", json=body).json()["id"] != first.json()["id"]
+    )
+
+    assert (
+        client.post(
+            "/api/v1/groceries", json=body, headers={"Idempotency-Key": "x" * 256}
+        ).status_code
+        == 400
+    )
+
+
+def test_idempotency_key_should_coalesce_concurrent_requests(
+    client: TestClient,
+) -> None:
+    """Retries fired before the first request answers wait for it instead of
+    creating their own list."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    family_id = uuid.uuid4().int % 10**9 + 1000
+    item_ids = [item["id"] for item in client.get("/api/v1/items").json()[:3]]
+    body = {
+        "family_id": family_id,
+        "grocery_date": "2024-05-06",
+        "grocery_items": [_line_body(item_id) for item_id in item_ids],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(
+            pool.map(
+                lambda _: client.post("/api/v1/groceries", json=body, headers=headers),
+                range(8),
+            )
+        )
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    assert sum("idempotent-replayed" not in r.headers for r in responses) == 1
+    assert len(client.get(f"/api/v1/groceries?family_id={family_id}").json()) == 1
+    assert _summary_problems() == []
+
+
+def test_idempotency_store_should_expire_and_bound_its_keys(
+    client: TestClient,
+) -> None:
+    from grocery_api import database, idempotency
+
+    prefix = str(uuid.uuid4())
+    with database.SessionLocal() as db:
+        idempotency.prune(db, ttl=0)
+        for n in range(5):
+            assert (
+                idempotency.claim(db, f"{prefix}-{n}", "POST /x?", 1000.0 + n) is None
+            )
+            idempotency.complete(
+                db, f"{prefix}-{n}", "hash", 200, None, b"{}", 1000.0 + n
+            )
+        # Taken: the stored outcome comes back instead of a new claim
+        stored = idempotency.claim(db, f"{prefix}-4", "POST /x?", 1004.5)
+        assert stored is not None and stored.status == 200
+
+        assert idempotency.prune(db, now=1005.0, ttl=100, max_keys=3) == 2
+        assert idempotency.lookup(db, f"{prefix}-1") is None
+        assert idempotency.lookup(db, f"{prefix}-2") is not None
+        assert idempotency.prune(db, now=1103.5, ttl=100) == 2
+        assert idempotency.lookup(db, f"{prefix}-4") is not None
+
+        # An expired key is claimed afresh
+        assert idempotency.claim(db, f"{prefix}-4", "POST /y?", 1200.0, ttl=100) is None
+        renewed = idempotency.lookup(db, f"{prefix}-4")
+        assert renewed is not None
+        assert (renewed.request, renewed.status) == ("POST /y?", None)
+        # ...and released when its request fails, so a retry can run
+        idempotency.release(db, f"{prefix}-4")
+        assert idempotency.lookup(db, f"{prefix}-4") is None
+
+
+def test_synthetic_generator_should_be_deterministic_per_seed(
+    client: TestClient,
+) -> None:
+    """Developer generates the same data twice from one seed, summaries included."""
+    from sqlalchemy import select
+    from sqlalchemy.engine import Result
+
+    from grocery_api import database, models
+    from grocery_api.seed import SyntheticPlan, generate
+
+    def lines_of(first_family_id: int) -> List[Tuple[Any, ...]]:
+        with database.SessionLocal() as db:
+            rows: Result[int, date, int, int, bool] = db.execute(
+                select(
+                    models.Grocery.family_id,
+                    models.Grocery.grocery_date,
+                    models.GroceryItem.item_id,
+                    models.GroceryItem.quantity,
+                    models.GroceryItem.purchased,
+                )
+                .join(models.GroceryItem)
+                .where(
+                    models.Grocery.family_id.between(
+                        first_family_id, first_family_id + 2
+                    )
+                )
+                .order_by(models.Grocery.id, models.GroceryItem.id)
+            )
+            return [(row[0] - first_family_id, *row[1:]) for row in rows]
+
+    plan = SyntheticPlan(
+        families=3, groceries_per_family=4, lines_per_grocery=3, chunk_size=5, seed=7
+    )
+    runs = []
+    for first_family_id in (7_000_000, 7_000_100):
+        with database.SessionLocal() as db:
+            report = generate(db, plan._replace(first_family_id=first_family_id))
+        assert report["groceries"] == 12
+        assert report["grocery_items"] == len(lines_of(first_family_id))
+        runs.append(lines_of(first_family_id))
+    assert runs[0] == runs[1]
+    assert _summary_problems() == []
+
+
+def test_benchmarks_should_cover_every_crud_function_and_flag_regressions(
+    client: TestClient,
+) -> None:
+    """Maintainer adds a crud function and the benchmark suite insists on a case."""
+    from benchmarks.common import compare
+    from benchmarks.crud import build_cases, missing_cases
+    from grocery_api import database
+
+    with database.SessionLocal() as db:
+        assert missing_cases(build_cases(db, repeat=0)) == []
+
+    baseline = {"get": {"p95_ms": 10.0, "throughput_rps": 100.0, "error_rate": 0.0}}
+    steady = {"get": {"p95_ms": 11.0, "throughput_rps": 95.0, "error_rate": 0.001}}
+    worse = {"get": {"p95_ms": 20.0, "throughput_rps": 50.0, "error_rate": 0.05}}
+    assert compare(steady, baseline, tolerance=0.15) == []
+    assert compare(worse, baseline, tolerance=0.15) == [
+        "get.error_rate: 0.0 -> 0.05",
+        "get.p95_ms: 10.0 -> 20.0",
+        "get.throughput_rps: 100.0 -> 50.0",
+    ]
+
+
+def _metric(body: str, sample: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_should_report_route_latency_and_queries_per_request(
+    client: TestClient,
+) -> None:
+    """Operator scrapes /metrics and sees per-route traffic with its query cost."""
+    from grocery_api import metrics
+
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    grocery = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [{"item_id": item_id}],
+        },
+    ).json()
+    metrics.reset()
+    for _ in range(2):
+        assert client.get(f"/api/v1/groceries/{grocery['id']}").status_code == 200
+    assert client.get("/api/v1/no-such-route").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    route = 'method="GET",route="/api/v1/groceries/{grocery_id}"'
+    assert _metric(body, f'http_requests_total{{{route},status="200"}}') == 2
+    assert _metric(body, f"http_request_duration_seconds_count{{{route}}}") == 2
+    assert (
+        _metric(body, f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}') == 2
+    )
+    # Same statements the query budget pins for the detail endpoint
+    assert _metric(body, f"db_queries_per_request_sum{{{route}}}") == 2 * 5
+    assert _metric(body, f"db_query_seconds_per_request_sum{{{route}}}") > 0
+    unmatched = 'method="GET",route="unmatched",status="404"'
+    assert _metric(body, f"http_requests_total{{{unmatched}}}") == 1
+    # The scrape itself is still being served
+    assert _metric(body, 'http_requests_in_flight{method="GET"}') == 1
+
+
+def test_metrics_middleware_should_answer_unhandled_errors_with_json_500() -> None:
+    """A bug in an endpoint still produces the JSON error body, and is counted."""
+    from grocery_api import metrics
+
+    async def broken_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    metrics.reset()
+    response = TestClient(metrics.MetricsMiddleware(broken_app)).get("/anything")
+    assert response.status_code == 500
+    assert response.json() == {"error": "boom", "detail": "Internal Server Error"}
+    assert metrics.REQUESTS.values == {("GET", "unmatched", "500"): 1}
+
+
+def test_admission_should_shed_writes_over_the_limit_with_fast_503s() -> None:
+    """A burst of writes gets a bounded wait and then a 503, not a pile-up."""
+    import asyncio
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from grocery_api import admission, metrics
+
+    released = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        if scope["path"] == "/hold":
+            await released.wait()
+        elif scope["path"] == "/release":
+            released.set()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    gate = admission.AdmissionMiddleware(
+        app, read_limit=4, write_limit=1, write_queue=1, queue_timeout=0.3
+    )
+
+    def wait_for(condition: Any) -> None:
+        deadline = time.monotonic() + 5
+        while not condition():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    metrics.reset()
+    with TestClient(gate) as client, ThreadPoolExecutor(max_workers=3) as pool:
+        holder = pool.submit(client.post, "/hold")
+        wait_for(lambda: gate.writes.in_flight == 1)
+        queued = pool.submit(client.post, "/write")
+        wait_for(lambda: gate.writes.queued == 1)
+
+        full = client.post("/write")
+        assert full.status_code == 503
+        assert full.headers["retry-after"] == "1"
+        # Reads have their own slots
+        assert client.get("/read").status_code == 200
+
+        started = time.monotonic()
+        timed_out = queued.result()
+        assert timed_out.status_code == 503
+        assert "Timed out" in timed_out.json()["detail"]
+        assert time.monotonic() - started < 1
+
+        # A released slot goes to the next waiter in line
+        handed_over = pool.submit(client.post, "/write")
+        wait_for(lambda: gate.writes.queued == 1)
+        assert client.get("/release").status_code == 200
+        assert holder.result().status_code == 200
+        assert handed_over.result().status_code == 200
+
+    assert (gate.writes.in_flight, gate.writes.queued) == (0, 0)
+    assert metrics.ADMISSION_REJECTED.values == {
+        ("write", "queue_full"): 1,
+        ("write", "timeout"): 1,
+    }
+    body = metrics.render().decode()
+    assert _metric(body, 'admission_queue_depth{class="write"}') == 0
+    assert _metric(body, 'admission_in_flight{class="write"}') == 0
+
+
+def _raw_get(
+    client: TestClient, url: str, accept_encoding: str, **headers: str
+) -> Tuple[Any, bytes]:
+    """Response headers and the body as sent, before any decoding."""
+    with client.stream(
+        "GET", url, headers={"Accept-Encoding": accept_encoding, **headers}
+    ) as response:
+        return response.headers, b"".join(response.iter_raw())
+
+
+def test_compression_should_follow_accept_encoding_and_size(
+    client: TestClient,
+) -> None:
+    """A phone on a slow link downloads a compressed grocery page."""
+    import gzip
+    import json
+
+    from grocery_api import compression
+
+    family_id = uuid.uuid4().int % 10**9 + 1000
+    item_ids = [item["id"] for item in client.get("/api/v1/items").json()[:5]]
+    for day in ("2024-05-06", "2024-05-13", "2024-05-20"):
+        client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": family_id,
+                "grocery_date": day,
+                "grocery_items": [_line_body(item_id) for item_id in item_ids],
+            },
+        )
+    url = f"/api/v1/groceries?family_id={family_id}&limit=100"
+
+    plain_headers, plain = _raw_get(client, url, "identity")
+    assert "content-encoding" not in plain_headers
+    assert plain_headers["vary"].lower().count("accept-encoding") == 1
+    gzip_headers, compressed = _raw_get(client, url, "gzip")
+    assert gzip_headers["content-encoding"] == "gzip"
+    assert int(gzip_headers["content-length"]) == len(compressed) < len(plain) / 3
+    assert gzip.decompress(compressed) == plain
+    # Different bytes, so a weak validator that still revalidates
+    assert gzip_headers["etag"] == f"W/{plain_headers['etag']}"
+    revalidated = client.get(url, headers={"If-None-Match": gzip_headers["etag"]})
+    assert revalidated.status_code == 304
+
+    refused, _ = _raw_get(client, url, "gzip;q=0, identity")
+    assert "content-encoding" not in refused
+    small, _ = _raw_get(client, "/", "gzip")
+    assert "content-encoding" not in small
+
+    # Streamed exports are compressed chunk by chunk
+    export_headers, exported = _raw_get(
+        client, f"/api/v1/export/groceries?family_id={family_id}", "gzip"
+    )
+    assert export_headers["content-encoding"] == "gzip"
+    assert "content-length" not in export_headers
+    lines = gzip.decompress(exported).decode().splitlines()
+    assert [json.loads(line)["grocery_date"] for line in lines] == [
+        "2024-05-06",
+        "2024-05-13",
+        "2024-05-20",
+    ]
+
+    assert compression.negotiate("gzip;q=0.5, br") == (
+        "br" if "br" in compression.CODECS else "gzip"
+    )
+    assert compression.negotiate("*") == next(iter(compression.CODECS))
+    assert compression.negotiate("identity, deflate") is None
+    assert compression.negotiate("GZIP;q=0.1") == "gzip"
+
+
+def test_catalog_responses_should_be_compressed_once_per_catalog_version(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Every client loads the catalog; the server compresses it once."""
+    import gzip
+
+    from grocery_api import compression
+    from main import catalog_responses
+
+    codec = compression.CODECS["gzip"]
+    calls: List[int] = []
+    original = codec._compress
+
+    def counting(data: bytes, level: int) -> bytes:
+        calls.append(level)
+        return original(data, level)
+
+    monkeypatch.setattr(codec, "_compress", counting)
+    catalog_responses.clear()
+    url = "/api/v1/items?limit=100"
+
+    first_headers, first = _raw_get(client, url, "gzip")
+    assert first_headers["content-encoding"] == "gzip"
+    for _ in range(3):
+        assert _raw_get(client, url, "gzip")[1] == first
+    assert calls == [codec.best]
+    plain_headers, plain = _raw_get(client, url, "identity")
+    assert gzip.decompress(first) == plain
+    assert plain == client.get(url, params={"expand": "item_type"}).content
+    assert plain_headers["etag"] == first_headers["etag"].removeprefix("W/")
+
+    # A new catalog version is a new ETag, and so a new body
+    compressed = len(calls)
+    type_id = client.get("/api/v1/item_types").json()[0]["id"]
+    client.post(
+        "/api/v1/items", json={"name": f"item-{uuid.uuid4()}", "item_type_id": type_id}
+    )
+    changed_headers, changed = _raw_get(client, url, "gzip")
+    assert changed_headers["etag"] != first_headers["etag"]
+    assert len(calls) == compressed + 1
+
+    catalog_responses.max_entries = 1
+    try:
+        _raw_get(client, "/api/v1/item_types", "gzip")
+        assert len(catalog_responses) == 1
+    finally:
+        catalog_responses.max_entries = compression.CACHE_ENTRIES
+
+
+def test_startup_should_check_markers_with_one_query_when_current(
+    client: TestClient,
+) -> None:
+    """Restarting a worker on an up-to-date database does no setup work."""
+    from grocery_api import database, startup
+
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        report = startup.prepare(database.engine)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+
+    assert report.ran is False
+    assert len(statements) == 1 and "schema_markers" in statements[0]
+    ready = client.get("/ready")
+    assert ready.status_code == 200
+    assert ready.json()["status"] == "ready"
+
+
+def test_startup_should_run_once_when_workers_race_on_stale_markers(
+    client: TestClient,
+) -> None:
+    """Workers starting together after a deploy seed the database exactly once."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from sqlalchemy import text
+
+    from grocery_api import database, startup
+
+    with database.engine.begin() as conn:
+        conn.execute(
+            text("UPDATE schema_markers SET value = 'stale' WHERE name = 'seed'")
+        )
+    assert client.get("/ready").status_code == 503
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        reports = list(pool.map(lambda _: startup.prepare(database.engine), range(4)))
+
+    assert sum(report.ran for report in reports) == 1
+    assert startup.is_current(database.engine)
+    assert client.get("/ready").status_code == 200
+
+
+def test_invalidation_stamp_should_change_when_inode_and_mtime_collide(
+    client: TestClient,
+) -> None:
+    """Two bumps within one mtime tick on a reused inode still differ."""
+    import os
+
+    from grocery_api import invalidation
+
+    invalidation.bump("collide")
+    path = invalidation._stamp_path("collide")
+    assert path is not None
+    first = invalidation.current("collide")
+    before = os.stat(path)
+    path.write_text("12345")  # same inode; then put the old mtime back
+    os.utime(path, ns=(before.st_atime_ns, before.st_mtime_ns))
+
+    second = invalidation.current("collide")
+    assert second[:2] == first[:2]
+    assert second != first
+
+
+def test_multi_worker_server_should_show_writes_in_other_workers_caches(
+    tmp_path,
+) -> None:
+    """Item added through one worker shows up in another worker's cached catalog."""
+    import os
+    import subprocess
+    import sys
+    import time
+    from pathlib import Path
+
+    import httpx
+
+    from benchmarks.common import free_port
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "grocery_api.server", "--workers", "2"]
+        + ["--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parent.parent,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'workers.db'}"},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    clients: List[httpx.Client] = []
+    try:
+        # A keep-alive connection stays with the worker that accepted it; open
+        # connections until both workers hold one, warming each one's catalog.
+        by_worker: Dict[int, httpx.Client] = {}
+        deadline = time.monotonic() + 30
+        while len(by_worker) < 2:
+            assert time.monotonic() < deadline, "both workers never answered"
+            http = httpx.Client(base_url=base_url, timeout=5.0)
+            clients.append(http)
+            try:
+                worker = http.get("/ready").json()["worker"]
+            except httpx.TransportError:
+                time.sleep(0.1)
+                continue
+            assert http.get("/api/v1/items", params={"limit": 100}).status_code == 200
+            by_worker.setdefault(worker, http)
+        writer, reader = by_worker.values()
+        etag = reader.get("/api/v1/items", params={"limit": 100}).headers["ETag"]
+        type_id = writer.get("/api/v1/item_types").json()[0]["id"]
+
+        name = f"Worker-{uuid.uuid4()}"
+        created = writer.post(
+            "/api/v1/items", json={"name": name, "item_type_id": type_id}
+        )
+        assert created.status_code == 200
+
+        # Coherence is checked on every lookup, so the very next read sees it
+        response = reader.get(
+            "/api/v1/items", params={"limit": 100}, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert name in {item["name"] for item in response.json()}
+    finally:
+        for http in clients:
+            http.close()
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def test_export_should_stream_history_as_ndjson_and_csv(client: TestClient) -> None:
+    """Household downloads its whole history in one request, in either format."""
+    import csv
+    import io
+    import json
+
+    family_id = 900_000 + uuid.uuid4().int % 50_000
+    items = client.get("/api/v1/items").json()[:3]
+    created = [
+        client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": family_id,
+                "grocery_date": day,
+                "grocery_items": lines,
+            },
+        ).json()
+        for day, lines in [
+            ("2024-03-02", [{"item_id": items[0]["id"], "quantity": 2}]),
+            ("2024-03-01", []),
+            (
+                "2024-03-01",
+                [
+                    {"item_id": items[1]["id"], "purchased": True},
+                    {"item_id": items[2]["id"], "quantity": 3},
+                ],
+            ),
+        ]
+    ]
+    in_order = [created[1], created[2], created[0]]  # grocery_date, then id
+
+    response = client.get("/api/v1/export/groceries", params={"family_id": family_id})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [grocery["id"] for grocery in exported] == [g["id"] for g in in_order]
+    assert exported[0]["grocery_items"] == []
+    assert exported[1]["grocery_items"] == [
+        {
+            "id": line["id"],
+            "item_id": line["item_id"],
+            "item_name": line["item"]["name"],
+            "quantity": line["quantity"],
+            "purchased": line["purchased"],
+        }
+        for line in in_order[1]["grocery_items"]
+    ]
+
+    response = client.get(
+        "/api/v1/export/groceries",
+        params={"family_id": family_id, "date_from": "2024-03-02", "format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    line = created[0]["grocery_items"][0]
+    assert rows == [
+        {
+            "grocery_id": str(created[0]["id"]),
+            "family_id": str(family_id),
+            "grocery_date": "2024-03-02",
+            "grocery_item_id": str(line["id"]),
+            "item_id": str(line["item_id"]),
+            "item_name": items[0]["name"],
+            "quantity": "2",
+            "purchased": "false",
+        }
+    ]
+
+
+@pytest.mark.slow
+def test_export_should_keep_server_memory_flat_for_a_million_lines() -> None:
+    """A million-line history streams out without the server buffering it."""
+    from benchmarks.export import run_export
+
+    result = run_export(1_000_000, "csv")
+
+    assert result["records"] > 990_000
+    # Heap growth is one batch plus encoder buffers, whatever the history size
+    assert result["peak_growth_mb"] < 20, result
+
+
+@pytest.mark.slow
+def test_item_search_should_answer_within_a_millisecond_at_100k_items() -> None:
+    """Autocomplete stays interactive on a catalog of a hundred thousand items."""
+    from benchmarks.search import run_search
+
+    result = run_search(100_000, repeat=200)
+
+    assert result["queries"]["typo_multi_word"]["hits"] == 10
+    assert result["max_p99_us"] < 1000, result
+
+
+def test_import_should_write_valid_lines_and_report_rejected_ones(
+    client: TestClient, captured_sql: List[Tuple[str, Any]]
+) -> None:
+    """A streamed NDJSON import keeps the good lists and names the bad lines."""
+    import json
+
+    family_id = 950_000 + uuid.uuid4().int % 50_000
+    items = client.get("/api/v1/items").json()[:2]
+
+    def grocery(day: str, *lines: Dict[str, Any]) -> str:
+        return json.dumps(
+            {"family_id": family_id, "grocery_date": day, "grocery_items": lines}
+        )
+
+    body = "\n".join(
+        [
+            grocery("2024-05-01", {"item_id": items[0]["id"], "quantity": 2}),
+            "",
+            grocery(
+                "2024-05-02",
+                {"item_name": items[1]["name"], "purchased": True},
+                {"item_id": items[0]["id"], "item_name": "ignored"},
+            ),
+            "{not json",
+            grocery("2024-05-03", {"item_name": "no such item"}),
+            grocery("2024-13-01"),
+            "[]",
+            grocery("2024-05-04", {"item_id": 999_999_999}),
+            grocery("2024-05-05"),
+        ]
+    ).encode()
+    # Split mid-line, as a network would, to exercise the line reassembly
+    pieces = (body[i : i + 7] for i in range(0, len(body), 7))
+
+    start = _change_head()
+    captured_sql.clear()
+    response = client.post(
+        "/api/v1/import/groceries",
+        params={"chunk_size": 2},
+        content=pieces,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["accepted"] == 3
+    assert result["rejected"] == 5
+    assert result["grocery_items"] == 3
+    assert [error["line"] for error in result["errors"]] == [4, 5, 6, 7, 8]
+    assert "unknown item 'no such item'" in result["errors"][1]["detail"]
+    assert result["errors"][2]["detail"].startswith("grocery_date:")
+    assert "unknown item 999999999" in result["errors"][4]["detail"]
+    # Two chunks, each a fixed handful of statements whatever its size
+    inserts = [s for s, _ in captured_sql if s.startswith("INSERT INTO groceries ")]
+    assert len(inserts) == 2
+
+    exported = [
+        json.loads(line)
+        for line in client.get(
+            "/api/v1/export/groceries", params={"family_id": family_id}
+        ).text.splitlines()
+    ]
+    assert [
+        (
+            g["grocery_date"],
+            [(i["item_id"], i["quantity"], i["purchased"]) for i in g["grocery_items"]],
+        )
+        for g in exported
+    ] == [
+        ("2024-05-01", [(items[0]["id"], 2, False)]),
+        ("2024-05-02", [(items[1]["id"], 1, True), (items[0]["id"], 1, False)]),
+        ("2024-05-05", []),
+    ]
+    summary = client.get(f"/api/v1/families/{family_id}/summary").json()
+    assert (summary["groceries"], summary["lines"], summary["quantity"]) == (3, 3, 4)
+
+    # Subscribers see the same events as for lists created one at a time
+    events = _parse_events(
+        client.get(
+            "/api/v1/changes/stream", params={"follow": "false", "since": start}
+        ).content
+    )
+    expected = []
+    for g in exported:
+        expected.append(("grocery", "created", g["id"], g["id"]))
+        expected.extend(
+            ("grocery_item", "created", i["id"], g["id"]) for i in g["grocery_items"]
+        )
+    assert [
+        (e["entity"], e["op"], e["entity_id"], e["grocery_id"]) for e in events
+    ] == expected
+
+
+def _change_head() -> int:
+    from grocery_api import changes, database
+
+    with database.SessionLocal() as db:
+        return changes.head(db)
+
+
+def _parse_events(body: bytes) -> List[Dict[str, Any]]:
+    import json
+
+    events = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line
+        )
+        if fields.get("event") == "change":
+            event = json.loads(fields["data"])
+            assert int(fields["id"]) == event["id"]
+            events.append(event)
+    return events
+
+
+def test_change_stream_should_replay_every_write_from_last_event_id(
+    client: TestClient,
+) -> None:
+    """User's client reconnects and receives every change it missed, in order."""
+    item_ids = [item["id"] for item in client.get("/api/v1/items").json()[:2]]
+    start = _change_head()
+
+    grocery: Dict[str, Any] = client.post(
+        "/api/v1/groceries",
+        json={
+            "family_id": 1,
+            "grocery_date": date.today().isoformat(),
+            "grocery_items": [_line_body(item_ids[0])],
+        },
+    ).json()
+    first_line = grocery["grocery_items"][0]["id"]
+    bad = client.post(
+        f"/api/v1/groceries/{grocery['id']}/items", json={"item_id": 999_999}
+    )
+    assert bad.status_code == 400
+    second_line = client.post(
+        f"/api/v1/groceries/{grocery['id']}/items", json=_line_body(item_ids[1])
+    ).json()["id"]
+    client.patch(f"/api/v1/grocery_items/{first_line}", json={"purchased": True})
+    client.patch(f"/api/v1/grocery_items/{first_line}", json={"purchased": True})
+    client.delete(f"/api/v1/grocery_items/{second_line}")
+    client.delete(f"/api/v1/groceries/{grocery['id']}")
+
+    response = client.get(
+        "/api/v1/changes/stream",
+        params={"follow": "false"},
+        headers={"Last-Event-ID": str(start)},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_events(response.content)
+    assert [(e["entity"], e["op"], e["entity_id"]) for e in events] == [
+        ("grocery", "created", grocery["id"]),
+        ("grocery_item", "created", first_line),
+        ("grocery_item", "created", second_line),
+        ("grocery_item", "updated", first_line),
+        ("grocery_item", "deleted", second_line),
+        ("grocery", "deleted", grocery["id"]),
+    ]
+    assert all(e["grocery_id"] == grocery["id"] for e in events)
+
+    resumed = client.get(
+        "/api/v1/changes/stream",
+        params={"follow": "false", "since": events[2]["id"]},
+    )
+    assert _parse_events(resumed.content) == events[3:]
+
+
+def test_change_hub_should_serve_idle_subscribers_from_one_read_per_poll(
+    client: TestClient,
+) -> None:
+    """Hundreds of open streams cost one log read per poll, not one each."""
+    import asyncio
+
+    from grocery_api import changes
+
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+
+    async def scenario() -> None:
+        hub = changes.ChangeHub(poll_interval=3600)
+        subscribers = [await hub.subscribe() for _ in range(500)]
+        # Stop the hub's own poll loop so every poll below is one made here
+        task = hub._task
+        assert task is not None
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        reads = hub.reads
+
+        await hub.poll()  # nothing new: only a stat() of the stamp file
+        assert hub.reads == reads
+        await asyncio.to_thread(
+            client.post,
+            "/api/v1/groceries",
+            json={
+                "family_id": 1,
+                "grocery_date": date.today().isoformat(),
+                "grocery_items": [_line_body(item_id) for _ in range(3)],
+            },
+        )
+        await hub.poll()
+        assert hub.reads == reads + 1
+        assert all(s.queue.qsize() == 4 for s in subscribers)
+        await hub.poll()
+        assert hub.reads == reads + 1
+        for subscriber in subscribers:
+            hub.unsubscribe(subscriber)
+
+    asyncio.run(scenario())
+
+
+def test_change_stream_should_catch_up_from_the_log_when_its_buffer_overflows(
+    client: TestClient,
+) -> None:
+    """A slow client loses its buffer, not its events."""
+    import asyncio
+
+    from grocery_api import changes
+
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+
+    async def scenario() -> List[Dict[str, Any]]:
+        hub = changes.ChangeHub(poll_interval=3600, buffer_size=2)
+        stream = changes.stream(hub, heartbeat=0.05)
+        assert await anext(stream) == b"retry: 2000\n\n"
+        subscriber = next(iter(hub.subscribers))
+        grocery = await asyncio.to_thread(
+            client.post,
+            "/api/v1/groceries",
+            json={
+                "family_id": 1,
+                "grocery_date": date.today().isoformat(),
+                "grocery_items": [_line_body(item_id) for _ in range(4)],
+            },
+        )
+        await hub.poll()
+        assert subscriber.overflowed
+
+        received: List[Dict[str, Any]] = []
+
+        async def drain() -> None:
+            while len(received) < 5:
+                received.extend(_parse_events(await anext(stream)))
+
+        # A lost event would leave the stream on keep-alives; fail, don't hang
+        await asyncio.wait_for(drain(), timeout=10)
+        assert await asyncio.wait_for(anext(stream), 10) == b": keep-alive\n\n"
+        await stream.aclose()
+        assert not hub.subscribers
+        assert received[0]["entity_id"] == grocery.json()["id"]
+        return received
+
+    events = asyncio.run(scenario())
+    assert [e["entity"] for e in events] == ["grocery"] + ["grocery_item"] * 4
+    assert [e["id"] for e in events] == sorted({e["id"] for e in events})
+
+
+def test_pruned_change_log_should_tell_stale_clients_to_reset(
+    client: TestClient,
+) -> None:
+    """A client resuming from before the retention window is told to refetch."""
+    from grocery_api import changes, database
+
+    item_id = client.get("/api/v1/items").json()[0]["id"]
+    start = _change_head()
+    for _ in range(3):
+        client.post(
+            "/api/v1/groceries",
+            json={
+                "family_id": 1,
+                "grocery_date": date.today().isoformat(),
+                "grocery_items": [_line_body(item_id)],
+            },
+        )
+    with database.SessionLocal() as db:
+        assert changes.prune(db, keep=2) > 0
+        assert changes.oldest(db) == changes.head(db) - 1
+
+    response = client.get(
+        "/api/v1/changes/stream",
+        params={"follow": "false"},
+        headers={"Last-Event-ID": str(start)},
+    )
+    assert response.content.startswith(b"id: %d\nevent: reset\n" % _change_head())
+    assert _parse_events(response.content) == []
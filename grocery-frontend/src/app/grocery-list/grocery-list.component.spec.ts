@@ -18,6 +18,7 @@ describe('GroceryListComponent', () => {
             getItems: () => of([]),
             addItem: () => of({} as any),
             updateGroceryItem: () => of({} as any),
+            batchUpdateGroceryItems: () => of([]),
             deleteGroceryItem: () => of(undefined),
             deleteGrocery: () => of(undefined),
           },
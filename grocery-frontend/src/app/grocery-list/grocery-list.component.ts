@@ -10,6 +10,7 @@ import {
 import { finalize } from 'rxjs/operators';
 import {
   Grocery,
+  GroceryFilters,
   GroceryItem,
   GroceryItemPayload,
   Item,
@@ -21,6 +22,13 @@ type AddItemFormGroup = FormGroup<{
   quantity: FormControl<number>;
 }>;
 
+type FilterFormGroup = FormGroup<{
+  family_id: FormControl<number | null>;
+  date_from: FormControl<string>;
+  date_to: FormControl<string>;
+  open_only: FormControl<boolean>;
+}>;
+
 @Component({
   selector: 'app-grocery-list',
   standalone: true,
@@ -37,6 +45,7 @@ export class GroceryListComponent implements OnInit {
   activeAddFor: number | null = null;
   newItemForm: AddItemFormGroup;
   addingItemPending = false;
+  filterForm: FilterFormGroup;
 
   private itemBusy = new Set<number>();
   private groceryBusy = new Set<number>();
@@ -53,6 +62,14 @@ export class GroceryListComponent implements OnInit {
         validators: [Validators.required, Validators.min(1)],
       }),
     });
+    this.filterForm = this.fb.group({
+      family_id: this.fb.control<number | null>(null, {
+        validators: [Validators.min(1)],
+      }),
+      date_from: this.fb.control(''),
+      date_to: this.fb.control(''),
+      open_only: this.fb.control(false),
+    });
   }
 
   ngOnInit(): void {
@@ -64,7 +81,7 @@ export class GroceryListComponent implements OnInit {
     this.loading = true;
     this.errorMessage = '';
 
-    this.groceryService.getGroceries().subscribe({
+    this.groceryService.getGroceries(this.currentFilters()).subscribe({
       next: (data) => {
         this.groceries = data;
         this.loading = false;
@@ -77,6 +94,19 @@ export class GroceryListComponent implements OnInit {
     });
   }
 
+  applyFilters(): void {
+    if (this.filterForm.invalid) {
+      this.filterForm.markAllAsTouched();
+      return;
+    }
+    this.loadGroceries();
+  }
+
+  clearFilters(): void {
+    this.filterForm.reset();
+    this.loadGroceries();
+  }
+
   loadItems(): void {
     this.groceryService.getItems().subscribe({
       next: (data) => (this.availableItems = data),
@@ -215,6 +245,43 @@ export class GroceryListComponent implements OnInit {
       });
   }
 
+  hasOpenItems(grocery: Grocery): boolean {
+    return grocery.grocery_items.some((gi) => !gi.purchased);
+  }
+
+  /** Check off every open line of a list with a single batch request. */
+  markAllPurchased(grocery: Grocery): void {
+    const open = grocery.grocery_items.filter((gi) => !gi.purchased);
+    if (!open.length || this.isGroceryProcessing(grocery.id)) {
+      return;
+    }
+    this.groceryBusy.add(grocery.id);
+    this.errorMessage = '';
+    this.groceryService
+      .batchUpdateGroceryItems({
+        update: open.map((gi) => ({ id: gi.id, purchased: true })),
+      })
+      .pipe(finalize(() => this.groceryBusy.delete(grocery.id)))
+      .subscribe({
+        next: (results) => {
+          for (const result of results) {
+            if (result.grocery_item) {
+              this.replaceItemInGrocery(grocery, result.grocery_item);
+            }
+          }
+          if (results.some((result) => !result.grocery_item)) {
+            this.errorMessage =
+              'Some items could not be checked off. Refresh and try again.';
+          }
+        },
+        error: (err) => {
+          console.error('Failed to check off grocery list', err);
+          this.errorMessage =
+            'Could not check off that grocery list. Please retry.';
+        },
+      });
+  }
+
   deleteGrocery(grocery: Grocery): void {
     if (
       !confirm(
@@ -245,6 +312,25 @@ export class GroceryListComponent implements OnInit {
     return this.availableItems.filter((item) => !presentIds.has(item.id));
   }
 
+  /** Filters go to the API so only matching lists are downloaded. */
+  private currentFilters(): GroceryFilters {
+    const value = this.filterForm.getRawValue();
+    const filters: GroceryFilters = {};
+    if (value.family_id) {
+      filters.family_id = Number(value.family_id);
+    }
+    if (value.date_from) {
+      filters.date_from = value.date_from;
+    }
+    if (value.date_to) {
+      filters.date_to = value.date_to;
+    }
+    if (value.open_only) {
+      filters.purchased = false;
+    }
+    return filters;
+  }
+
   private replaceItemInGrocery(grocery: Grocery, updated: GroceryItem): void {
     grocery.grocery_items = grocery.grocery_items.map((gi) =>
       gi.id === updated.id ? updated : gi,
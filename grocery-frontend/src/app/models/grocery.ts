@@ -40,6 +40,27 @@ export interface Grocery {
   grocery_items: GroceryItem[];
 }
 
+export interface GroceryItemBatchPatch {
+  update?: (UpdateGroceryItemPayload & { id: number })[];
+  delete?: number[];
+}
+
+export interface GroceryItemBatchLine {
+  op: 'create' | 'update' | 'delete';
+  index: number;
+  status: 'created' | 'updated' | 'deleted' | 'not_found' | 'invalid';
+  id?: number | null;
+  detail?: string | null;
+  grocery_item?: GroceryItem | null;
+}
+
+export interface GroceryFilters {
+  family_id?: number;
+  date_from?: string;
+  date_to?: string;
+  purchased?: boolean;
+}
+
 export interface GroceryItemFormValue {
   item_id: number;
   quantity: number;
@@ -1,12 +1,15 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { map } from 'rxjs/operators';
 import { environment } from '../../environments/environment';
 import {
   CreateGroceryPayload,
   Grocery,
+  GroceryFilters,
   GroceryItem,
+  GroceryItemBatchLine,
+  GroceryItemBatchPatch,
   GroceryItemPayload,
   Item,
   UpdateGroceryItemPayload,
@@ -22,8 +25,14 @@ export class GroceryService {
     return this.http.get<Item[]>(`${this.apiUrl}/items`);
   }
 
-  getGroceries(): Observable<Grocery[]> {
-    return this.http.get<Grocery[]>(`${this.apiUrl}/groceries`);
+  getGroceries(filters: GroceryFilters = {}): Observable<Grocery[]> {
+    let params = new HttpParams();
+    for (const [key, value] of Object.entries(filters)) {
+      if (value !== undefined && value !== null) {
+        params = params.set(key, String(value));
+      }
+    }
+    return this.http.get<Grocery[]>(`${this.apiUrl}/groceries`, { params });
   }
 
   addGrocery(grocery: CreateGroceryPayload): Observable<Grocery> {
@@ -44,6 +53,12 @@ export class GroceryService {
     );
   }
 
+  batchUpdateGroceryItems(batch: GroceryItemBatchPatch): Observable<GroceryItemBatchLine[]> {
+    return this.http
+      .patch<{ results: GroceryItemBatchLine[] }>(`${this.apiUrl}/grocery_items:batch`, batch)
+      .pipe(map((response) => response.results));
+  }
+
   deleteGroceryItem(groceryItemId: number): Observable<void> {
     return this.http
       .delete<{ status: string }>(`${this.apiUrl}/grocery_items/${groceryItemId}`)